@@ -261,25 +261,28 @@ class PropertyAdmin(LeafletGeoAdminMixin, admin.ModelAdmin[Property]):
     def send_authorization_email(self, request, queryset):
         """Send email to property owners to ask for authorization for this season"""
 
-        num_sent = 0
-        for p in queryset:
+        emails = []
+        for p in queryset.select_related('owner__person', 'owner__organization__contact_person'):
             recipient = p.email_recipient
             if recipient is None:
                 messages.error(request, f"Could not find a recipient for {p}.")
                 continue
 
-            if Email.objects.create(
-                recipient=recipient,
-                type=EmailType.SEASON_AUTHORIZATION,
-            ).send(data=dict(EmailPropertySerializer(p).data)):
-                num_sent += 1
-            else:
-                messages.error(
-                    request, f"Could not send authorization email to {recipient.email}."
+            emails.append(
+                Email(
+                    recipient=recipient,
+                    type=EmailType.SEASON_AUTHORIZATION,
+                    data=dict(EmailPropertySerializer(p).data),
                 )
-
-        if num_sent > 1:
-            messages.info(request, f"Sent authorization emails to {num_sent} owners!")
+            )
+
+        if emails:
+            num_queued = Email.send_in_background(emails)
+            messages.info(
+                request,
+                f"Queued authorization emails to {num_queued} owners, delivered in the "
+                "background: follow their progress in the Emails list.",
+            )
 
     actions = [
         reset_authorize,
@@ -3,12 +3,14 @@ from django.contrib import messages
 from django_filters.rest_framework import DjangoFilterBackend
 from django.utils.translation import gettext_lazy as _
 from django.urls import reverse_lazy
+from django.db import transaction
+from django.db.models import F
 from django.http import HttpResponseRedirect
 from rest_framework import generics, status, viewsets
 from rest_framework.filters import SearchFilter
 from rest_framework.decorators import action
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
-from typing import Dict
 
 from harvest.filters import (
     HarvestFilter,
@@ -18,29 +20,35 @@ from harvest.filters import (
 from harvest.models import (
     Equipment,
     Harvest,
-    HarvestYield,
     Property,
     RequestForParticipation as RFP,
-    TreeType,
 )
 from harvest.serializers import (
-    HarvestSerializer,
     HarvestListSerializer,
     HarvestDetailSerializer,
     HarvestMapSerializer,
+    HarvestMarkerSerializer,
+    HarvestNearbyOrganizationSerializer,
     PropertyListSerializer,
     PropertySerializer,
     PropertyMapSerializer,
+    PropertyMarkerSerializer,
     EquipmentSerializer,
     RequestForParticipationSerializer,
 )
-from harvest.utils import sum_harvest_yields
-from member.models import Organization, Neighborhood, Person
+from harvest.stats import HarvestStats, SeasonStats
+from member.models import Organization
 from member.permissions import (
     IsCoreOrAdmin,
     IsPickLeaderOrCoreOrAdmin,
 )
-from member.utils import get_available_equipment_points
+from member.utils import (
+    get_nearest_beneficiaries,
+    get_nearest_equipment_points,
+    reserve_equipment_point,
+)
+from saskatoon.fieldsets import SparseFieldsViewsetMixin
+from saskatoon.maps import MapViewMixin
 from sitebase.models import Email, EmailType
 from sitebase.serializers import EmailPropertySerializer
 from sitebase.utils import (
@@ -49,7 +57,9 @@ from sitebase.utils import (
 )
 
 
-class HarvestViewset(LoginRequiredMixin, viewsets.ModelViewSet[Harvest]):
+class HarvestViewset(
+    LoginRequiredMixin, SparseFieldsViewsetMixin, MapViewMixin, viewsets.ModelViewSet[Harvest]
+):
     """Harvest viewset"""
 
     permission_classes = [IsPickLeaderOrCoreOrAdmin]
@@ -65,6 +75,9 @@ class HarvestViewset(LoginRequiredMixin, viewsets.ModelViewSet[Harvest]):
         'property__street',
         'property__street_number',
     ]
+    map_location_prefix = 'property__'
+    nearest_limit = 5
+    max_nearest_limit = 50
 
     def list(self, request, *args, **kwargs):
         self.template_name = 'app/list_views/harvest/view.html'
@@ -90,13 +103,17 @@ class HarvestViewset(LoginRequiredMixin, viewsets.ModelViewSet[Harvest]):
             }
         )
 
+    def get_map_status(self):
+        return F('status')
+
     def map_marker_info(self, request, pk=None):
         """Harvest details displayed in map pop-up window"""
 
         self.template_name = 'app/list_views/harvest/marker.html'
+        self.serializer_class = HarvestMarkerSerializer
         harvest = self.get_object()
 
-        serialized = HarvestSerializer(harvest)
+        serialized = self.get_serializer(harvest)
         return Response(serialized.data)
 
     def map(self, request, *args, **kwargs):
@@ -105,14 +122,12 @@ class HarvestViewset(LoginRequiredMixin, viewsets.ModelViewSet[Harvest]):
         self.serializer_class = HarvestMapSerializer
         self.template_name = 'app/list_views/harvest/map.html'
         self.pagination_class = None
-        response = super().list(request, *args, **kwargs)
-
         if renderer_format_needs_json_response(request):
-            return response
+            return self.map_list(request)
 
+        # the map fetches the markers of its visible bounds
         return Response(
             {
-                "data": response.data,
                 'filter': get_filter_context(self, 'harvest'),
                 'new': {
                     'url': reverse_lazy('harvest-create'),
@@ -132,9 +147,12 @@ class HarvestViewset(LoginRequiredMixin, viewsets.ModelViewSet[Harvest]):
     def make_reservation(self, request, pk=None):
         try:
             org: int = int(request.data.get('org'))
-        except ValueError:
+        except (TypeError, ValueError):
             messages.error(request, _("Missing Organization id"))
             return HttpResponseRedirect(request.META.get('HTTP_REFERER'))
+
+        try:
+            equipment_point = Organization.objects.get(actor_id=org, is_equipment_point=True)
         except Organization.DoesNotExist:
             messages.error(request, _("Organization does not exist"))
             return HttpResponseRedirect(request.META.get('HTTP_REFERER'))
@@ -145,21 +163,54 @@ class HarvestViewset(LoginRequiredMixin, viewsets.ModelViewSet[Harvest]):
             messages.error(request, _("Harvest does not exist"))
             return HttpResponseRedirect(request.META.get('HTTP_REFERER'))
 
-        try:
-            available = get_available_equipment_points(
-                harvest.start_date, harvest.end_date, harvest
-            ).get(actor_id=org)
+        if harvest.start_date is None or harvest.end_date is None:
+            messages.error(
+                request, _("Please set the harvest start and end dates before reserving equipment")
+            )
+            return HttpResponseRedirect(request.META.get('HTTP_REFERER'))
 
-            harvest.equipment_reserved.set(Equipment.objects.filter(owner=available))
-            harvest.save()
+        with transaction.atomic():
+            conflict = reserve_equipment_point(harvest, equipment_point)
+            if conflict is None:
+                harvest.save()
+
+        if conflict is None:
             messages.success(request, _("Your reservation was successful!"))
-        except Organization.DoesNotExist:
+        else:
             messages.error(request, _("Sorry, this equipment point is no longer available"))
 
         return HttpResponseRedirect(request.META.get('HTTP_REFERER'))
 
+    @action(
+        methods=['get'],
+        detail=True,
+        permission_classes=[IsPickLeaderOrCoreOrAdmin],
+        renderer_classes=[JSONRenderer],
+    )
+    def nearest_organizations(self, request, pk=None):
+        """Available equipment points and beneficiaries closest to the harvest's property"""
+        harvest = self.get_object()
+        try:
+            limit = int(request.query_params.get('limit', self.nearest_limit))
+        except ValueError:
+            limit = self.nearest_limit
+        limit = max(1, min(limit, self.max_nearest_limit))
+
+        return Response(
+            {
+                'equipment_points': HarvestNearbyOrganizationSerializer(
+                    get_nearest_equipment_points(harvest, limit), many=True
+                ).data,
+                'beneficiaries': HarvestNearbyOrganizationSerializer(
+                    get_nearest_beneficiaries(harvest, limit), many=True
+                ).data,
+            }
+        )
+
 
-class PropertyViewset(LoginRequiredMixin, viewsets.ModelViewSet[Property]):
+class PropertyViewset(
+    LoginRequiredMixin, SparseFieldsViewsetMixin, MapViewMixin, viewsets.ModelViewSet[Property]
+):
     """Property viewset"""
 
     permission_classes = [IsPickLeaderOrCoreOrAdmin]
@@ -202,13 +253,17 @@ class PropertyViewset(LoginRequiredMixin, viewsets.ModelViewSet[Property]):
             }
         )
 
+    def get_map_status(self):
+        return Property.status_expression()
+
     def map_marker_info(self, request, pk=None):
         """Property details displayed in map pop-up window"""
 
         self.template_name = 'app/list_views/property/marker.html'
+        self.serializer_class = PropertyMarkerSerializer
         property = self.get_object()
 
-        serialized = PropertySerializer(property)
+        serialized = self.get_serializer(property)
         return Response(serialized.data)
 
     def partial_update(self, request, pk=None):
@@ -254,14 +309,12 @@ class PropertyViewset(LoginRequiredMixin, viewsets.ModelViewSet[Property]):
         self.serializer_class = PropertyMapSerializer
         self.template_name = 'app/list_views/property/map.html'
         self.pagination_class = None
-        response = super().list(request, *args, **kwargs)
-
         if renderer_format_needs_json_response(request):
-            return response
+            return self.map_list(request)
 
+        # the map fetches the markers of its visible bounds
         return Response(
             {
-                "data": response.data,
                 'filter': get_filter_context(self, 'property'),
                 'new': {
                     'url': reverse_lazy('property-create'),
@@ -271,7 +324,9 @@ class PropertyViewset(LoginRequiredMixin, viewsets.ModelViewSet[Property]):
         )
 
 
-class EquipmentViewset(LoginRequiredMixin, viewsets.ModelViewSet[Equipment]):
+class EquipmentViewset(
+    LoginRequiredMixin, SparseFieldsViewsetMixin, viewsets.ModelViewSet[Equipment]
+):
     """Equipment viewset"""
 
     permission_classes = [IsPickLeaderOrCoreOrAdmin]
@@ -343,134 +398,35 @@ class StatsView(LoginRequiredMixin, generics.ListAPIView[Harvest]):
     filterset_class = HarvestFilter
     filterset_fields = ('status', 'season')
 
+    def get_stats(self) -> HarvestStats:
+        """Reads the season rollup tables unless the harvests are filtered further"""
+        params = set(self.request.query_params.keys()) - {'format'}
+        season = self.request.query_params.get('season')
+
+        if not params:
+            return SeasonStats()
+        if params == {'season'} and season in [
+            str(choice[0]) for choice in Harvest.SEASON_CHOICES
+        ]:
+            return SeasonStats(int(season))
+        return HarvestStats(self.filter_queryset(self.get_queryset()))
+
     def list(self, request, format="html", *args, **kwargs) -> Response:
         """Returns statistics on harvests for all seasons or a specific season"""
 
-        self.harvest_qs = self.filter_queryset(self.get_queryset())
-        self.harvest_yield_qs = HarvestYield.objects.filter(harvest__in=self.harvest_qs)
+        stats = self.get_stats()
 
-        if not self.harvest_qs:
+        if stats.is_empty():
             messages.error(request, _("No harvests found for the selected season(s)"))
 
         return Response(
             {
                 "season": self.request.query_params.get('season'),
                 "seasons": [choice[0] for choice in Harvest.SEASON_CHOICES],
-                "highlights": self.get_highlights(),
-                "total_fruit": self.get_total_weight_harvest_per_fruit(request.LANGUAGE_CODE),
-                "total_neighborhood": self.get_total_weight_harvest_per_neighborhood(),
-                "total_beneficiary": self.get_total_weight_harvest_per_beneficiary(),
-                "total_picker": self.get_total_weight_harvest_per_picker(),
+                "highlights": stats.get_highlights(),
+                "total_fruit": stats.get_total_weight_harvest_per_fruit(request.LANGUAGE_CODE),
+                "total_neighborhood": stats.get_total_weight_harvest_per_neighborhood(),
+                "total_beneficiary": stats.get_total_weight_harvest_per_beneficiary(),
+                "total_picker": stats.get_total_weight_harvest_per_picker(),
             }
         )
-
-    def get_highlights(self) -> Dict[str, int]:
-        """Returns general statistics of harvests"""
-        total_weight = 0
-        if self.harvest_qs:
-            total_weight = sum_harvest_yields(self.harvest_yield_qs) or 0
-
-        return {
-            "total_beneficiaries": self.get_total_number_beneficiaries(),
-            "total_pickers": self.harvest_yield_qs.values("recipient").distinct().count(),
-            "total_weight": total_weight,
-            "total_harvests": self.harvest_qs.count(),
-        }
-
-    def get_total_number_beneficiaries(self) -> int:
-        """Returns total number of beneficiary organizations"""
-        if not self.harvest_qs:
-            return 0
-
-        total_number_beneficiaries = 0
-        for org in Organization.objects.all():
-            if self.harvest_yield_qs.filter(recipient=org).exists():
-                total_number_beneficiaries += 1
-
-        return total_number_beneficiaries
-
-    def get_total_weight_harvest_per_fruit(self, lang='fr'):
-        """Returns total number of harvests and weight per fruit"""
-        if not self.harvest_qs:
-            return []
-
-        total_weight_harvests_per_fruit = []
-
-        for tree in TreeType.objects.all():
-            total_weight = sum_harvest_yields(self.harvest_yield_qs.filter(tree=tree))
-
-            if total_weight is not None:
-                total_harvests = self.harvest_qs.filter(trees__in=[tree]).count()
-                total_weight_harvests_per_fruit.append(
-                    (tree.get_fruit_name(lang), total_harvests, total_weight)
-                )
-
-        return total_weight_harvests_per_fruit
-
-    def get_total_weight_harvest_per_neighborhood(self):
-        """Returns total number of harvests and weight per neighborhood"""
-        if not self.harvest_qs:
-            return []
-
-        total_weight_harvests_per_neighborhood = []
-        for neighborhood in Neighborhood.objects.all().order_by("name"):
-            total_weight = sum_harvest_yields(
-                self.harvest_yield_qs.filter(harvest__property__neighborhood=neighborhood)
-            )
-            if total_weight is not None:
-                total_harvests = self.harvest_qs.filter(
-                    property__neighborhood=neighborhood
-                ).count()
-                total_weight_harvests_per_neighborhood.append(
-                    (neighborhood, total_harvests, total_weight)
-                )
-
-        return total_weight_harvests_per_neighborhood
-
-    def get_total_weight_harvest_per_beneficiary(self):
-        """Returns total number of harvests and weight per beneficiary organization"""
-        if not self.harvest_qs:
-            return []
-
-        total_weight_harvests_per_beneficiary = []
-
-        for beneficiary in Organization.objects.filter(is_beneficiary=True):
-            total_weight = sum_harvest_yields(self.harvest_yield_qs.filter(recipient=beneficiary))
-            if total_weight is not None:
-                total_harvests = self.harvest_yield_qs.filter(recipient=beneficiary).count()
-                total_weight_harvests_per_beneficiary.append(
-                    (beneficiary, total_harvests, total_weight)
-                )
-
-        return total_weight_harvests_per_beneficiary
-
-    def get_total_weight_harvest_per_picker(self):
-        """Returns total number of harvests and weight per picker"""
-        if not self.harvest_qs:
-            return []
-
-        pickers = Person.objects.all().order_by("first_name")
-        total_weight_harvests_per_picker = []
-
-        for p in pickers:
-            total_weight = sum_harvest_yields(self.harvest_yield_qs.filter(recipient=p))
-            total_harvests_leader = self.harvest_qs.filter(pick_leader__person=p).count()
-            total_harvests_rfp = RFP.objects.filter(person=p).count()
-            total_harvests_accepted = RFP.objects.filter(
-                person=p, status=RFP.Status.ACCEPTED
-            ).count()
-            total_harvests_recipient = self.harvest_yield_qs.filter(recipient=p).count()
-
-            if total_weight is not None:
-                total_weight_harvests_per_picker.append(
-                    (
-                        p,
-                        total_harvests_leader,
-                        total_harvests_rfp,
-                        total_harvests_accepted,
-                        total_harvests_recipient,
-                        total_weight,
-                    )
-                )
-
-        return total_weight_harvests_per_picker
@@ -3,6 +3,7 @@ from datetime import datetime
 from dal import autocomplete
 from django import forms
 from django.contrib.auth.models import Group
+from django.db import transaction
 from django.db.models import QuerySet
 from django.utils.translation import gettext_lazy as _
 from phone_field.forms import PhoneFormField
@@ -15,9 +16,8 @@ from typing_extensions import Self
 
 from member.forms import validate_email
 from member.models import AuthUser, Organization, Person
-from member.utils import is_equipment_point_available
+from member.utils import is_equipment_point_available, reserve_equipment_point
 from sitebase.models import Email, EmailType
-from sitebase.serializers import EmailRFPSerializer
 from sitebase.utils import is_quill_html_empty
 from harvest.models import (
     Comment,
@@ -92,14 +92,9 @@ class RFPForm(forms.ModelForm[RFP]):
 
         group, __ = Group.objects.get_or_create(name='volunteer')
         auth_user.groups.add(group)
+        # the pick leader is notified on save, see notify_new_request_for_participation
         instance.save()
 
-        Email(
-            recipient=instance.harvest.pick_leader.person,
-            type=EmailType.NEW_HARVEST_RFP,
-            harvest=instance.harvest,
-        ).send(data=dict(EmailRFPSerializer(instance).data))
-
         return instance
 
 
@@ -653,19 +648,29 @@ class HarvestForm(forms.ModelForm[Harvest]):
         Convert list of autocomplete equipment points into all equipment
         owned by said equipment points. i.e. Reserving an equipment point
         will reserve all its equipment for the duration of the harvest.
-        """
-        # Instance must have an id before we can assign ManyToMany relationships
-        instance = super().save(commit=True)
 
-        equipment_point = self.cleaned_data['equipment_point']
-        if equipment_point is not None:
-            # To keep things simple, pick leaders must reserve entire equipment points.
-            # But in the interest of allowing a more granular system in the future,
-            # the harvest model still has a list of reserved equipment. This means that
-            # any equipment reservation for a harvest will make that entire equipment
-            # point reserved, even if part of it's equipment has not been added to the harvest
-            instance.equipment_reserved.set(Equipment.objects.filter(owner=equipment_point))
-            instance.save()
+        Raises a ValidationError, and saves nothing, if the equipment point
+        got booked since the form was validated.
+        """
+        with transaction.atomic():
+            # Instance must have an id before we can assign ManyToMany relationships
+            instance = super().save(commit=True)
+
+            equipment_point = self.cleaned_data['equipment_point']
+            if equipment_point is not None:
+                # To keep things simple, pick leaders must reserve entire equipment points.
+                # But in the interest of allowing a more granular system in the future,
+                # the harvest model still has a list of reserved equipment. This means that
+                # any equipment reservation for a harvest will make that entire equipment
+                # point reserved, even if part of it's equipment has not been added to the
+                # harvest
+                if reserve_equipment_point(instance, equipment_point) is not None:
+                    raise forms.ValidationError(
+                        _("The {} equipment point is no longer available.").format(
+                            equipment_point.civil_name
+                        )
+                    )
+                instance.save()
 
         return instance
 
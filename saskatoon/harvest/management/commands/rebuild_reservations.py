@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from harvest.models import EquipmentReservation
+
+
+class Command(BaseCommand):
+    help = "Rebuild the equipment reservations from the harvests and verify them"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help="Only verify the reservations against a full recomputation, without rebuilding",
+        )
+
+    def handle(self, *args, **options):
+        if not options['check']:
+            count = EquipmentReservation.rebuild()
+            self.stdout.write(f"Rebuilt {count} equipment reservations")
+
+        outdated = EquipmentReservation.verify()
+        if outdated:
+            self.stderr.write(self.style.ERROR(f"{len(outdated)} outdated reservations:"))
+            for harvest, equipment, _point, start, end in outdated:
+                self.stderr.write(
+                    f"  - harvest: {harvest}, equipment: {equipment}, from {start} to {end}"
+                )
+            self.stderr.write("Please run 'manage.py rebuild_reservations'.")
+            raise SystemExit(1)
+
+        self.stdout.write(self.style.SUCCESS("Equipment reservations are up to date."))
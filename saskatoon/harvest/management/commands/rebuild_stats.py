@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from harvest.models import SEASON_ROLLUPS
+
+
+class Command(BaseCommand):
+    help = "Rebuild the season statistics tables from scratch and verify them"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help="Only verify the tables against a full recomputation, without rebuilding",
+        )
+
+    def handle(self, *args, **options):
+        ok = True
+
+        for rollup in SEASON_ROLLUPS:
+            name = rollup._meta.verbose_name_plural
+
+            if not options['check']:
+                count = rollup.rebuild()
+                self.stdout.write(f"Rebuilt {count} rows of {name}")
+
+            outdated = rollup.verify()
+            if outdated:
+                ok = False
+                self.stderr.write(self.style.ERROR(f"{len(outdated)} outdated rows of {name}:"))
+                for season, key in outdated:
+                    self.stderr.write(f"  - season: {season}, {rollup.KEY}: {key}")
+
+        if not ok:
+            self.stderr.write("Please run 'manage.py rebuild_stats'.")
+            raise SystemExit(1)
+
+        self.stdout.write(self.style.SUCCESS("Season statistics are up to date."))
@@ -0,0 +1,90 @@
+# Generated by Django 4.2.30 on 2026-10-17 17:16
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('member', '0021_alter_person_family_name'),
+        ('harvest', '0024_alter_property_coordinates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TreeSeasonStats',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('season', models.PositiveSmallIntegerField(null=True, verbose_name='Season')),
+                ('harvests', models.PositiveIntegerField(default=0, verbose_name='Harvests')),
+                ('yields', models.PositiveIntegerField(default=0, verbose_name='Yields')),
+                ('weight', models.FloatField(default=0, verbose_name='Weight (lb)')),
+                ('tree', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='season_stats', to='harvest.treetype', verbose_name='Tree')),
+            ],
+            options={
+                'verbose_name': 'tree season statistics',
+                'verbose_name_plural': 'tree season statistics',
+            },
+        ),
+        migrations.CreateModel(
+            name='RecipientSeasonStats',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('season', models.PositiveSmallIntegerField(null=True, verbose_name='Season')),
+                ('yields', models.PositiveIntegerField(default=0, verbose_name='Yields')),
+                ('weight', models.FloatField(default=0, verbose_name='Weight (lb)')),
+                ('recipient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recipient_season_stats', to='member.actor', verbose_name='Recipient')),
+            ],
+            options={
+                'verbose_name': 'recipient season statistics',
+                'verbose_name_plural': 'recipient season statistics',
+            },
+        ),
+        migrations.CreateModel(
+            name='PersonSeasonStats',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('season', models.PositiveSmallIntegerField(null=True, verbose_name='Season')),
+                ('harvests_led', models.PositiveIntegerField(default=0, verbose_name='Harvests led')),
+                ('requests', models.PositiveIntegerField(default=0, verbose_name='Requests')),
+                ('requests_accepted', models.PositiveIntegerField(default=0, verbose_name='Accepted requests')),
+                ('person', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='season_stats', to='member.person', verbose_name='Person')),
+            ],
+            options={
+                'verbose_name': 'person season statistics',
+                'verbose_name_plural': 'person season statistics',
+            },
+        ),
+        migrations.CreateModel(
+            name='NeighborhoodSeasonStats',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('season', models.PositiveSmallIntegerField(null=True, verbose_name='Season')),
+                ('harvests', models.PositiveIntegerField(default=0, verbose_name='Harvests')),
+                ('yields', models.PositiveIntegerField(default=0, verbose_name='Yields')),
+                ('weight', models.FloatField(default=0, verbose_name='Weight (lb)')),
+                ('neighborhood', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='season_stats', to='member.neighborhood', verbose_name='Borough')),
+            ],
+            options={
+                'verbose_name': 'borough season statistics',
+                'verbose_name_plural': 'borough season statistics',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='treeseasonstats',
+            constraint=models.UniqueConstraint(fields=('season', 'tree'), name='unique_tree_season_stats'),
+        ),
+        migrations.AddConstraint(
+            model_name='recipientseasonstats',
+            constraint=models.UniqueConstraint(fields=('season', 'recipient'), name='unique_recipient_season_stats'),
+        ),
+        migrations.AddConstraint(
+            model_name='personseasonstats',
+            constraint=models.UniqueConstraint(fields=('season', 'person'), name='unique_person_season_stats'),
+        ),
+        migrations.AddConstraint(
+            model_name='neighborhoodseasonstats',
+            constraint=models.UniqueConstraint(fields=('season', 'neighborhood'), name='unique_neighborhood_season_stats'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-17 17:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('harvest', '0025_season_stats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='harvest',
+            index=models.Index(fields=['start_date', 'end_date'], name='harvest_har_start_d_cd4bdc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='harvest',
+            index=models.Index(fields=['status', 'start_date'], name='harvest_har_status_6d625b_idx'),
+        ),
+    ]
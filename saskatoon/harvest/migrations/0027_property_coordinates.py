@@ -0,0 +1,38 @@
+# Generated by Django 4.2.30 on 2026-10-17 17:49
+
+from django.db import migrations, models
+
+
+def backfill_coordinates(apps, _schema_editor):
+    Property = apps.get_model('harvest', 'Property')
+    entries = []
+    for entry in Property.objects.exclude(geom__isnull=True).only('geom'):
+        if entry.geom and entry.geom.get('type') == 'Point':
+            entry.longitude, entry.latitude = entry.geom['coordinates'][:2]
+            entries.append(entry)
+    Property.objects.bulk_update(entries, ['latitude', 'longitude'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('harvest', '0026_harvest_date_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='property',
+            name='latitude',
+            field=models.FloatField(blank=True, editable=False, null=True, verbose_name='Latitude'),
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='longitude',
+            field=models.FloatField(blank=True, editable=False, null=True, verbose_name='Longitude'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(fields=['latitude', 'longitude'], name='harvest_pro_latitud_f85f50_idx'),
+        ),
+        migrations.RunPython(backfill_coordinates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 4.2.30 on 2026-10-17 17:56
+
+from datetime import timedelta
+from django.db import migrations, models
+import django.db.models.deletion
+
+from saskatoon.settings import DEFAULT_RESERVATION_BUFFER
+
+
+def backfill_reservations(apps, _schema_editor):
+    Harvest = apps.get_model('harvest', 'Harvest')
+    EquipmentReservation = apps.get_model('harvest', 'EquipmentReservation')
+    buffer = timedelta(hours=DEFAULT_RESERVATION_BUFFER)
+    reserved = Harvest.equipment_reserved.through.objects.filter(
+        harvest__status__in=['ready', 'scheduled', 'succeeded'],
+        harvest__start_date__isnull=False,
+        harvest__end_date__isnull=False,
+    ).values_list(
+        'harvest_id',
+        'equipment_id',
+        'equipment__owner_id',
+        'harvest__start_date',
+        'harvest__end_date',
+    )
+    EquipmentReservation.objects.bulk_create(
+        [
+            EquipmentReservation(
+                harvest_id=harvest,
+                equipment_id=equipment,
+                equipment_point_id=owner,
+                start_date=start - buffer,
+                end_date=end + buffer,
+            )
+            for harvest, equipment, owner, start, end in reserved
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('member', '0022_organization_coordinates'),
+        ('harvest', '0027_property_coordinates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EquipmentReservation',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_date', models.DateTimeField(verbose_name='Start date')),
+                ('end_date', models.DateTimeField(verbose_name='End date')),
+                ('equipment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='harvest.equipment', verbose_name='Equipment')),
+                ('equipment_point', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='member.actor', verbose_name='Equipment point')),
+                ('harvest', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='harvest.harvest', verbose_name='Harvest')),
+            ],
+            options={
+                'verbose_name': 'equipment reservation',
+                'verbose_name_plural': 'equipment reservations',
+                'indexes': [models.Index(fields=['start_date', 'end_date'], name='harvest_equ_start_d_a3ef6f_idx'), models.Index(fields=['equipment_point', 'start_date', 'end_date'], name='harvest_equ_equipme_0402e7_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_reservations, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,101 @@
+# Generated by Django 4.2.30 on 2026-10-17 18:40
+
+from collections import defaultdict
+from django.db import migrations
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import ExtractYear
+
+
+def build_rows(model, key_field, groups):
+    """Rows of a season rollup, from its (queryset, key, harvest lookup, aggregates)
+    groups, as SeasonRollup.build computes them"""
+    rows = defaultdict(dict)
+    for qs, key, harvest, aggregates in groups:
+        for row in (
+            qs.values(key, season=ExtractYear(f"{harvest}start_date"))
+            .annotate(**aggregates)
+            .order_by()
+        ):
+            rows[(row['season'], row[key])].update((name, row[name]) for name in aggregates)
+
+    return [
+        model(season=season, **{f"{key_field}_id": key}, **values)
+        for (season, key), values in rows.items()
+    ]
+
+
+def backfill_season_stats(apps, _schema_editor):
+    Harvest = apps.get_model('harvest', 'Harvest')
+    HarvestYield = apps.get_model('harvest', 'HarvestYield')
+    RequestForParticipation = apps.get_model('harvest', 'RequestForParticipation')
+
+    harvests = Harvest.objects.all()
+    succeeded = harvests.filter(status='succeeded')
+    yields = HarvestYield.objects.filter(harvest__in=succeeded)
+    yield_aggregates = {'yields': Count('id'), 'weight': Sum('total_in_lb')}
+
+    rollups = [
+        (
+            'TreeSeasonStats',
+            'tree',
+            [
+                (yields, 'tree', 'harvest__', yield_aggregates),
+                (
+                    Harvest.trees.through.objects.filter(harvest__in=succeeded),
+                    'treetype',
+                    'harvest__',
+                    {'harvests': Count('harvest', distinct=True)},
+                ),
+            ],
+        ),
+        (
+            'NeighborhoodSeasonStats',
+            'neighborhood',
+            [
+                (yields, 'harvest__property__neighborhood', 'harvest__', yield_aggregates),
+                (succeeded, 'property__neighborhood', '', {'harvests': Count('id')}),
+            ],
+        ),
+        (
+            'RecipientSeasonStats',
+            'recipient',
+            [(yields, 'recipient', 'harvest__', yield_aggregates)],
+        ),
+        (
+            'PersonSeasonStats',
+            'person',
+            [
+                (
+                    succeeded.filter(pick_leader__person__isnull=False),
+                    'pick_leader__person',
+                    '',
+                    {'harvests_led': Count('id')},
+                ),
+                (
+                    RequestForParticipation.objects.filter(harvest__in=harvests),
+                    'person',
+                    'harvest__',
+                    {
+                        'requests': Count('id'),
+                        'requests_accepted': Count('id', filter=Q(status='accepted')),
+                    },
+                ),
+            ],
+        ),
+    ]
+
+    for model_name, key_field, groups in rollups:
+        model = apps.get_model('harvest', model_name)
+        model.objects.all().delete()
+        model.objects.bulk_create(build_rows(model, key_field, groups), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('harvest', '0028_equipment_reservations'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_season_stats, migrations.RunPython.noop),
+    ]
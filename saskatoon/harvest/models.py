@@ -1,22 +1,35 @@
+from collections import defaultdict
 from crequest.middleware import CrequestMiddleware
-from datetime import datetime
+from datetime import datetime, timedelta
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django_quill.fields import QuillField
-from django.db import models
-from django.db.models.signals import pre_save
+from django.db import IntegrityError, OperationalError, models, transaction
+from django.db.models import Case, Count, OuterRef, Prefetch, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, ExtractYear
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
 from django.dispatch import receiver
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone as tz
 from djgeojson.fields import PointField
 from phone_field import PhoneField
-from typing import Optional
+from typing import Any, DefaultDict, Dict, Iterable, List, Optional, Set, Tuple, Type
 from enum import Enum
+from logging import getLogger
 from typeguard import typechecked
 from sys import float_info
 from types import SimpleNamespace
 
-from sitebase.utils import local_datetime, to_datetime, is_quill_html_empty, local_today
+from sitebase.utils import (
+    get_point_coordinates,
+    is_quill_html_empty,
+    local_datetime,
+    local_today,
+    to_datetime,
+)
 from sitebase.validators import validate_is_not_nan
+from saskatoon.settings import DEFAULT_RESERVATION_BUFFER
+
+logger = getLogger('saskatoon')
 
 
 class TreeType(models.Model):
@@ -132,6 +145,9 @@ class Property(models.Model):
         ordering = [
             '-id',
         ]
+        indexes = [
+            models.Index(fields=['latitude', 'longitude']),
+        ]
 
     class Status(models.TextChoices, Enum):
         INACTIVE = 'inactive', _("Inactive")
@@ -210,6 +226,13 @@ and needs to be validated by an administrator"
 
     geom = PointField(null=True, blank=True)
 
+    # copied from geom on save, to filter and sort by location in the database
+    latitude = models.FloatField(verbose_name=_("Latitude"), null=True, blank=True, editable=False)
+
+    longitude = models.FloatField(
+        verbose_name=_("Longitude"), null=True, blank=True, editable=False
+    )
+
     trees: models.ManyToManyField[TreeType, models.Model] = models.ManyToManyField(
         'TreeType',
         verbose_name=_("Fruit tree/vine type(s)"),
@@ -387,6 +410,51 @@ Unknown fruit type or colour can be mentioned in the additional comments at the
         """Next harvest for this property"""
         return self.harvests.count()
 
+    @classmethod
+    def with_map_state(
+        cls, properties: 'models.QuerySet[Property]'
+    ) -> 'models.QuerySet[Property]':
+        """Annotates the number of harvests and the status of the next
+        and last harvests, see get_map_state"""
+        today = local_today()
+        harvests = Harvest.objects.filter(property=OuterRef('pk'))
+        return properties.annotate(
+            harvests_count=Coalesce(
+                Subquery(
+                    harvests.order_by()
+                    .values('property')
+                    .annotate(count=Count('pk'))
+                    .values('count')
+                ),
+                0,
+            ),
+            next_harvest_status=Subquery(
+                harvests.filter(end_date__gte=today).order_by('start_date').values('status')[:1]
+            ),
+            last_harvest_status=Subquery(
+                harvests.filter(end_date__lt=today).order_by('-start_date').values('status')[:1]
+            ),
+        )
+
+    def get_map_state(self) -> Tuple[int, Optional[str], Optional[str]]:
+        """Number of harvests and status of the next and last harvests,
+        taken from the with_map_state annotations when present"""
+        harvests_count = getattr(self, 'harvests_count', None)
+        if harvests_count is not None:
+            return (
+                harvests_count,
+                getattr(self, 'next_harvest_status', None),
+                getattr(self, 'last_harvest_status', None),
+            )
+
+        next_harvest = self.next_harvest
+        last_harvest = self.last_harvest
+        return (
+            self.nb_harvests,
+            next_harvest.status if next_harvest is not None else None,
+            last_harvest.status if last_harvest is not None else None,
+        )
+
     def get_owner_subclass(self):
         if self.owner:
             if self.owner.is_person:
@@ -446,20 +514,6 @@ Unknown fruit type or colour can be mentioned in the additional comments at the
             > self.harvests.filter(start_date__year=tz.now().date().year).count()
         )
 
-    @property
-    def latitude(self):
-        if self.geom is not None and self.geom['type'] == "Point":
-            return self.geom['coordinates'][1]
-
-        return None
-
-    @property
-    def longitude(self):
-        if self.geom is not None and self.geom['type'] == "Point":
-            return self.geom['coordinates'][0]
-
-        return None
-
     @property
     def status(self):
         if not self.is_active:
@@ -476,10 +530,29 @@ Unknown fruit type or colour can be mentioned in the additional comments at the
 
         return Property.Status.AUTHORIZED
 
+    @staticmethod
+    def status_expression() -> Case:
+        """`status`, computed by the database"""
+        return Case(
+            When(is_active=False, then=Value(Property.Status.INACTIVE)),
+            When(pending=True, then=Value(Property.Status.PENDING)),
+            When(authorized__isnull=True, then=Value(Property.Status.VALIDATED)),
+            When(authorized=False, then=Value(Property.Status.UNAUTHORIZED)),
+            default=Value(Property.Status.AUTHORIZED),
+            output_field=models.CharField(),
+        )
+
     def __str__(self):
         number = self.street_number if self.street_number else ""
         return "%s %s %s %s" % (self.owner_name, _("at"), number, self.street)
 
+    def save(self, *args, **kwargs):
+        self.latitude, self.longitude = get_point_coordinates(self.geom)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'geom' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'latitude', 'longitude'}
+        super().save(*args, **kwargs)
+
 
 class Equipment(models.Model):
     """Equipment model"""
@@ -547,6 +620,10 @@ class Harvest(models.Model):
         verbose_name = _("harvest")
         verbose_name_plural = _("harvests")
         ordering = ['-start_date']
+        indexes = [
+            models.Index(fields=['start_date', 'end_date']),
+            models.Index(fields=['status', 'start_date']),
+        ]
 
     class Status(models.TextChoices, Enum):
         ORPHAN = 'orphan', _("Orphan")
@@ -660,6 +737,10 @@ class Harvest(models.Model):
     def get_local_end(self) -> Optional[datetime]:
         return local_datetime(self.end_date)
 
+    def get_season(self) -> Optional[int]:
+        start = self.get_local_start()
+        return start.year if start is not None else None
+
     def get_date_range(self) -> str:
         start = self.get_local_start()
         end = self.get_local_end()
@@ -677,7 +758,57 @@ class Harvest(models.Model):
     def get_local_publish_date(self) -> Optional[datetime]:
         return local_datetime(self.publication_date)
 
+    @staticmethod
+    def get_volunteers_annotation(status: 'RequestForParticipation.Status') -> str:
+        return f"volunteers_{status}"
+
+    @classmethod
+    def with_volunteers_count(
+        cls, harvests: 'models.QuerySet[Harvest]'
+    ) -> 'models.QuerySet[Harvest]':
+        """Annotates the number of volunteers of each request status,
+        see get_volunteers_count"""
+        return harvests.annotate(
+            **dict(
+                (
+                    cls.get_volunteers_annotation(status),
+                    Coalesce(
+                        Subquery(
+                            RequestForParticipation.objects.filter(
+                                harvest=OuterRef('pk'), status=status
+                            )
+                            .values('harvest')
+                            .annotate(total=Sum('number_of_pickers'))
+                            .values('total')
+                        ),
+                        0,
+                    ),
+                )
+                for status in RequestForParticipation.Status
+            )
+        )
+
+    @classmethod
+    def with_equipment_point(
+        cls, harvests: 'models.QuerySet[Harvest]'
+    ) -> 'models.QuerySet[Harvest]':
+        """Prefetches the reserved equipment along with its owner organization,
+        see get_equipment_point"""
+        return harvests.prefetch_related(
+            Prefetch(
+                'equipment_reserved',
+                queryset=Equipment.objects.select_related('owner__organization').order_by('pk'),
+            )
+        )
+
     def get_volunteers_count(self, status: Optional['RequestForParticipation.Status']) -> int:
+        counts: List[Optional[int]] = [
+            getattr(self, self.get_volunteers_annotation(s), None)
+            for s in ([status] if status is not None else RequestForParticipation.Status)
+        ]
+        if all(count is not None for count in counts):
+            return sum(count or 0 for count in counts)
+
         rfps = self.requests.get_queryset()
         if status is not None:
             rfps = rfps.filter(status=status)
@@ -751,7 +882,10 @@ class Harvest(models.Model):
         """Turn the list of reserved equipment into an equipment point.
         This assumes that all reserved equipment belongs to the same point.
         """
-        equipment = self.equipment_reserved.first()
+        if 'equipment_reserved' in getattr(self, '_prefetched_objects_cache', {}):
+            equipment = next(iter(self.equipment_reserved.all()), None)
+        else:
+            equipment = self.equipment_reserved.first()
 
         if equipment is None:
             return None
@@ -778,6 +912,143 @@ def harvest_reservation_validation(sender, instance, **kwargs) -> None:
         instance.equipment_reserved.set([])
 
 
+class EquipmentReservation(models.Model):
+    """Equipment reserved by a harvest, over the harvest's dates widened by
+    DEFAULT_RESERVATION_BUFFER hours on both sides. Derived from the harvests,
+    so that equipment point availability is an indexed range lookup."""
+
+    class Meta:
+        verbose_name = _("equipment reservation")
+        verbose_name_plural = _("equipment reservations")
+        indexes = [
+            models.Index(fields=['start_date', 'end_date']),
+            models.Index(fields=['equipment_point', 'start_date', 'end_date']),
+        ]
+
+    harvest = models.ForeignKey(
+        'Harvest',
+        verbose_name=_("Harvest"),
+        related_name='reservations',
+        on_delete=models.CASCADE,
+    )
+
+    equipment = models.ForeignKey(
+        'Equipment',
+        verbose_name=_("Equipment"),
+        related_name='reservations',
+        on_delete=models.CASCADE,
+    )
+
+    equipment_point = models.ForeignKey(
+        'member.Actor',
+        verbose_name=_("Equipment point"),
+        related_name='reservations',
+        null=True,
+        on_delete=models.CASCADE,
+    )
+
+    start_date = models.DateTimeField(verbose_name=_("Start date"))
+
+    end_date = models.DateTimeField(verbose_name=_("End date"))
+
+    @staticmethod
+    def overlap_filter(
+        start: datetime,
+        end: datetime,
+        buffer: timedelta = timedelta(hours=DEFAULT_RESERVATION_BUFFER),
+    ) -> Q:
+        """Reservations of the harvests starting or ending within `buffer` of the
+        start-end window, or surrounding it"""
+        delta = buffer - timedelta(hours=DEFAULT_RESERVATION_BUFFER)
+        return Q(start_date__lte=end + delta, end_date__gte=start - delta)
+
+    @classmethod
+    def build(cls, harvests: models.QuerySet[Harvest]) -> List['EquipmentReservation']:
+        """Computes the reservations of a set of harvests"""
+        buffer = timedelta(hours=DEFAULT_RESERVATION_BUFFER)
+        reserved = Harvest.equipment_reserved.through._default_manager.filter(
+            harvest__in=harvests.filter(
+                status__in=Harvest.CAN_RESERVE_EQUIPMENT,
+                start_date__isnull=False,
+                end_date__isnull=False,
+            )
+        ).values_list(
+            'harvest_id',
+            'equipment_id',
+            'equipment__owner_id',
+            'harvest__start_date',
+            'harvest__end_date',
+        )
+        return [
+            cls(
+                harvest_id=harvest,
+                equipment_id=equipment,
+                equipment_point_id=owner,
+                start_date=start - buffer,
+                end_date=end + buffer,
+            )
+            for harvest, equipment, owner, start, end in reserved
+        ]
+
+    @classmethod
+    def refresh(cls, harvest_ids: Iterable[int]) -> None:
+        """Recomputes the reservations of the given harvests"""
+        harvest_ids = set(harvest_ids)
+        with transaction.atomic():
+            cls._default_manager.filter(harvest_id__in=harvest_ids).delete()
+            cls._default_manager.bulk_create(cls.build(Harvest.objects.filter(id__in=harvest_ids)))
+
+    @classmethod
+    def rebuild(cls) -> int:
+        """Recomputes all reservations from scratch"""
+        with transaction.atomic():
+            cls._default_manager.all().delete()
+            return len(cls._default_manager.bulk_create(cls.build(Harvest.objects.all())))
+
+    @classmethod
+    def verify(cls) -> List[Tuple[Any, ...]]:
+        """Returns the reservations that differ from a full recomputation"""
+
+        def get_values(reservation: 'EquipmentReservation') -> Tuple[Any, ...]:
+            return (
+                reservation.harvest_id,
+                reservation.equipment_id,
+                reservation.equipment_point_id,
+                reservation.start_date,
+                reservation.end_date,
+            )
+
+        stored = set(get_values(row) for row in cls._default_manager.all())
+        expected = set(get_values(row) for row in cls.build(Harvest.objects.all()))
+        return sorted(stored ^ expected, key=str)
+
+
+@receiver(post_save, sender=Harvest)
+def harvest_reservations_saved(sender, instance, raw=False, **kwargs) -> None:
+    if not raw:
+        EquipmentReservation.refresh([instance.id])
+
+
+@receiver(m2m_changed, sender=Harvest.equipment_reserved.through)
+def harvest_equipment_reserved_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        EquipmentReservation.refresh([instance.id])
+    elif pk_set is not None:
+        EquipmentReservation.refresh(pk_set)
+    else:
+        # the reservations of the cleared equipment are still there
+        EquipmentReservation.refresh(instance.reservations.values_list('harvest_id', flat=True))
+
+
+@receiver(post_save, sender=Equipment)
+def equipment_reservations_saved(sender, instance, raw=False, **kwargs) -> None:
+    if not raw:
+        instance.reservations.update(equipment_point=instance.owner_id)
+
+
 class RequestForParticipation(models.Model):
     """Request For Participation model"""
 
@@ -960,3 +1231,502 @@ class HarvestImage(models.Model):
 
     def __str__(self):
         return self.harvest.__str__()
+
+
+Season = Optional[int]
+RollupKey = Tuple[Season, Optional[int]]
+
+
+def season_filter(season: Season, prefix: str = '') -> Q:
+    """Harvests starting in a given season, or without a start date if season is None"""
+    if season is None:
+        return Q(**{f"{prefix}start_date__isnull": True})
+    return Q(**{f"{prefix}start_date__year": season})
+
+
+def keys_filter(field: str, keys: Iterable[Optional[int]]) -> Q:
+    """Rows whose field is one of the keys, None included"""
+    keys = set(keys)
+    query = Q(**{f"{field}__in": [k for k in keys if k is not None]})
+    if None in keys:
+        query |= Q(**{f"{field}__isnull": True})
+    return query
+
+
+class SeasonRollup(models.Model):
+    """Statistics per season, denormalized for the stats page.
+
+    The rows of the keys affected by a change on a harvest, a yield or a request
+    for participation are recomputed once the change is committed (see StatsRefresh).
+    Run `manage.py rebuild_stats` to rebuild and verify all of them.
+    """
+
+    class Meta:
+        abstract = True
+
+    KEY = ''
+
+    season = models.PositiveSmallIntegerField(verbose_name=_("Season"), null=True)
+
+    def get_key(self) -> RollupKey:
+        return (self.season, getattr(self, f"{self.KEY}_id"))
+
+    def get_values(self) -> Tuple[Any, ...]:
+        return tuple(
+            round(value, 3) if isinstance(value, float) else value
+            for value in (
+                getattr(self, f.attname) for f in self._meta.concrete_fields if not f.primary_key
+            )
+        )
+
+    @classmethod
+    def get_groups(
+        cls, harvests: models.QuerySet[Harvest]
+    ) -> List[Tuple[models.QuerySet[Any], str, str, Dict[str, Any]]]:
+        """Returns the (queryset, key, harvest lookup, aggregates) groups of a set of harvests"""
+        raise NotImplementedError
+
+    @classmethod
+    def build(
+        cls, harvests: models.QuerySet[Harvest], keys: Optional[Set[Optional[int]]] = None
+    ) -> List['SeasonRollup']:
+        """Computes the rows of a set of harvests, optionally restricted to some keys"""
+        rows: DefaultDict[RollupKey, Dict[str, Any]] = defaultdict(dict)
+        for qs, key, harvest, aggregates in cls.get_groups(harvests):
+            if keys is not None:
+                qs = qs.filter(keys_filter(key, keys))
+            for row in (
+                qs.values(key, season=ExtractYear(f"{harvest}start_date"))
+                .annotate(**aggregates)
+                .order_by()
+            ):
+                rows[(row['season'], row[key])].update((name, row[name]) for name in aggregates)
+
+        return [
+            cls(season=season, **{f"{cls.KEY}_id": key}, **values)
+            for (season, key), values in rows.items()
+        ]
+
+    REFRESH_ATTEMPTS = 3
+
+    @classmethod
+    def refresh(cls, season: Season, keys: Set[Optional[int]]) -> None:
+        """Recomputes the rows of a season for the given keys.
+        A concurrent refresh of the same rows makes the insert fail on the unique
+        constraint (or deadlock): the rows are then recomputed again, from the data
+        it committed. Failures are logged rather than raised, since the change
+        triggering the refresh is already committed (see `manage.py rebuild_stats`).
+        """
+        for attempt in range(1, cls.REFRESH_ATTEMPTS + 1):
+            try:
+                with transaction.atomic():
+                    cls._default_manager.filter(keys_filter(cls.KEY, keys), season=season).delete()
+                    cls._default_manager.bulk_create(
+                        cls.build(Harvest.objects.filter(season_filter(season)), keys)
+                    )
+                return
+            except (IntegrityError, OperationalError):
+                if attempt == cls.REFRESH_ATTEMPTS:
+                    logger.exception(
+                        "Could not refresh %s of season %s", cls._meta.verbose_name, season
+                    )
+
+    @classmethod
+    def rebuild(cls) -> int:
+        """Recomputes all rows from scratch"""
+        with transaction.atomic():
+            cls._default_manager.all().delete()
+            return len(cls._default_manager.bulk_create(cls.build(Harvest.objects.all())))
+
+    @classmethod
+    def verify(cls) -> List[RollupKey]:
+        """Returns the keys of the rows that differ from a full recomputation"""
+        stored = dict((row.get_key(), row.get_values()) for row in cls._default_manager.all())
+        expected = dict(
+            (row.get_key(), row.get_values()) for row in cls.build(Harvest.objects.all())
+        )
+        return [
+            key for key in stored.keys() | expected.keys() if stored.get(key) != expected.get(key)
+        ]
+
+
+class TreeSeasonStats(SeasonRollup):
+    """Succeeded harvests and yields per season and tree type"""
+
+    class Meta:
+        verbose_name = _("tree season statistics")
+        verbose_name_plural = _("tree season statistics")
+        constraints = [
+            models.UniqueConstraint(fields=['season', 'tree'], name='unique_tree_season_stats')
+        ]
+
+    KEY = 'tree'
+
+    tree = models.ForeignKey(
+        'TreeType',
+        verbose_name=_("Tree"),
+        related_name='season_stats',
+        on_delete=models.CASCADE,
+    )
+
+    harvests = models.PositiveIntegerField(verbose_name=_("Harvests"), default=0)
+
+    yields = models.PositiveIntegerField(verbose_name=_("Yields"), default=0)
+
+    weight = models.FloatField(verbose_name=_("Weight (lb)"), default=0)
+
+    @classmethod
+    def get_groups(cls, harvests):
+        succeeded = harvests.filter(status=Harvest.Status.SUCCEEDED)
+        return [
+            (
+                HarvestYield.objects.filter(harvest__in=succeeded),
+                'tree',
+                'harvest__',
+                {'yields': Count('id'), 'weight': Sum('total_in_lb')},
+            ),
+            (
+                Harvest.trees.through.objects.filter(harvest__in=succeeded),
+                'treetype',
+                'harvest__',
+                {'harvests': Count('harvest', distinct=True)},
+            ),
+        ]
+
+
+class NeighborhoodSeasonStats(SeasonRollup):
+    """Succeeded harvests and yields per season and borough.
+    Harvests without a borough are counted in the rows without neighborhood.
+    """
+
+    class Meta:
+        verbose_name = _("borough season statistics")
+        verbose_name_plural = _("borough season statistics")
+        constraints = [
+            models.UniqueConstraint(
+                fields=['season', 'neighborhood'], name='unique_neighborhood_season_stats'
+            )
+        ]
+
+    KEY = 'neighborhood'
+
+    neighborhood = models.ForeignKey(
+        'member.Neighborhood',
+        verbose_name=_("Borough"),
+        related_name='season_stats',
+        null=True,
+        on_delete=models.CASCADE,
+    )
+
+    harvests = models.PositiveIntegerField(verbose_name=_("Harvests"), default=0)
+
+    yields = models.PositiveIntegerField(verbose_name=_("Yields"), default=0)
+
+    weight = models.FloatField(verbose_name=_("Weight (lb)"), default=0)
+
+    @classmethod
+    def get_groups(cls, harvests):
+        succeeded = harvests.filter(status=Harvest.Status.SUCCEEDED)
+        return [
+            (
+                HarvestYield.objects.filter(harvest__in=succeeded),
+                'harvest__property__neighborhood',
+                'harvest__',
+                {'yields': Count('id'), 'weight': Sum('total_in_lb')},
+            ),
+            (
+                succeeded,
+                'property__neighborhood',
+                '',
+                {'harvests': Count('id')},
+            ),
+        ]
+
+
+class RecipientSeasonStats(SeasonRollup):
+    """Yields of succeeded harvests per season and recipient"""
+
+    class Meta:
+        verbose_name = _("recipient season statistics")
+        verbose_name_plural = _("recipient season statistics")
+        constraints = [
+            models.UniqueConstraint(
+                fields=['season', 'recipient'], name='unique_recipient_season_stats'
+            )
+        ]
+
+    KEY = 'recipient'
+
+    recipient = models.ForeignKey(
+        'member.Actor',
+        verbose_name=_("Recipient"),
+        related_name='recipient_season_stats',
+        on_delete=models.CASCADE,
+    )
+
+    yields = models.PositiveIntegerField(verbose_name=_("Yields"), default=0)
+
+    weight = models.FloatField(verbose_name=_("Weight (lb)"), default=0)
+
+    @classmethod
+    def get_groups(cls, harvests):
+        return [
+            (
+                HarvestYield.objects.filter(
+                    harvest__in=harvests.filter(status=Harvest.Status.SUCCEEDED)
+                ),
+                'recipient',
+                'harvest__',
+                {'yields': Count('id'), 'weight': Sum('total_in_lb')},
+            ),
+        ]
+
+
+class PersonSeasonStats(SeasonRollup):
+    """Succeeded harvests led and requests for participation per season and person.
+    Requests are counted whatever the status of their harvest.
+    """
+
+    class Meta:
+        verbose_name = _("person season statistics")
+        verbose_name_plural = _("person season statistics")
+        constraints = [
+            models.UniqueConstraint(fields=['season', 'person'], name='unique_person_season_stats')
+        ]
+
+    KEY = 'person'
+
+    person = models.ForeignKey(
+        'member.Person',
+        verbose_name=_("Person"),
+        related_name='season_stats',
+        on_delete=models.CASCADE,
+    )
+
+    harvests_led = models.PositiveIntegerField(verbose_name=_("Harvests led"), default=0)
+
+    requests = models.PositiveIntegerField(verbose_name=_("Requests"), default=0)
+
+    requests_accepted = models.PositiveIntegerField(verbose_name=_("Accepted requests"), default=0)
+
+    @classmethod
+    def get_groups(cls, harvests):
+        return [
+            (
+                harvests.filter(
+                    status=Harvest.Status.SUCCEEDED, pick_leader__person__isnull=False
+                ),
+                'pick_leader__person',
+                '',
+                {'harvests_led': Count('id')},
+            ),
+            (
+                RequestForParticipation.objects.filter(harvest__in=harvests),
+                'person',
+                'harvest__',
+                {
+                    'requests': Count('id'),
+                    'requests_accepted': Count(
+                        'id', filter=Q(status=RequestForParticipation.Status.ACCEPTED)
+                    ),
+                },
+            ),
+        ]
+
+
+SEASON_ROLLUPS: List[Type[SeasonRollup]] = [
+    TreeSeasonStats,
+    NeighborhoodSeasonStats,
+    RecipientSeasonStats,
+    PersonSeasonStats,
+]
+
+
+class StatsRefresh:
+    """Season statistics rows to recompute once the current transaction is committed"""
+
+    def __init__(self) -> None:
+        self.keys: DefaultDict[Tuple[Type[SeasonRollup], Season], Set[Optional[int]]] = (
+            defaultdict(set)
+        )
+
+    def add(
+        self, rollup: Type[SeasonRollup], season: Season, keys: Iterable[Optional[int]]
+    ) -> 'StatsRefresh':
+        self.keys[(rollup, season)].update(keys)
+        return self
+
+    def add_harvest(self, harvest: Harvest) -> 'StatsRefresh':
+        season = harvest.get_season()
+        yields = list(harvest.yields.values_list('tree', 'recipient'))
+        neighborhood = harvest.property.neighborhood_id if harvest.property is not None else None
+        leader = harvest.pick_leader.person_id if harvest.pick_leader is not None else None
+
+        self.add(TreeSeasonStats, season, harvest.trees.values_list('id', flat=True))
+        self.add(TreeSeasonStats, season, [tree for tree, _recipient in yields])
+        self.add(NeighborhoodSeasonStats, season, [neighborhood])
+        self.add(RecipientSeasonStats, season, [recipient for _tree, recipient in yields])
+        self.add(PersonSeasonStats, season, harvest.requests.values_list('person', flat=True))
+        if leader is not None:
+            self.add(PersonSeasonStats, season, [leader])
+        return self
+
+    def add_yield(self, harvest_yield: HarvestYield) -> 'StatsRefresh':
+        harvest = (
+            Harvest.objects.filter(id=harvest_yield.harvest_id).select_related('property').first()
+        )
+        if harvest is None or harvest.status != Harvest.Status.SUCCEEDED:
+            return self
+
+        season = harvest.get_season()
+        neighborhood = harvest.property.neighborhood_id if harvest.property else None
+        self.add(TreeSeasonStats, season, [harvest_yield.tree_id])
+        self.add(NeighborhoodSeasonStats, season, [neighborhood])
+        self.add(RecipientSeasonStats, season, [harvest_yield.recipient_id])
+        return self
+
+    def add_request(self, rfp: RequestForParticipation) -> 'StatsRefresh':
+        harvest = Harvest.objects.filter(id=rfp.harvest_id).first()
+        if harvest is not None:
+            self.add(PersonSeasonStats, harvest.get_season(), [rfp.person_id])
+        return self
+
+    def schedule(self) -> None:
+        if self.keys:
+            transaction.on_commit(self.commit)
+
+    def commit(self) -> None:
+        for (rollup, season), keys in self.keys.items():
+            rollup.refresh(season, keys)
+
+
+def harvest_stats_fields(harvest: Harvest) -> Tuple[Any, ...]:
+    return (harvest.get_season(), harvest.status, harvest.property_id, harvest.pick_leader_id)
+
+
+@receiver(pre_save, sender=Harvest)
+def harvest_stats_changed(sender, instance, raw=False, **kwargs) -> None:
+    if raw or instance.id is None:
+        return
+
+    original = sender.objects.filter(id=instance.id).first()
+    if original is not None and harvest_stats_fields(original) != harvest_stats_fields(instance):
+        setattr(instance, '_stats_refresh', StatsRefresh().add_harvest(original))
+
+
+@receiver(post_save, sender=Harvest)
+def harvest_stats_saved(sender, instance, created, raw=False, **kwargs) -> None:
+    refresh = instance.__dict__.pop('_stats_refresh', None)
+    if raw or (refresh is None and not (created and instance.status == Harvest.Status.SUCCEEDED)):
+        return
+
+    (refresh or StatsRefresh()).add_harvest(instance).schedule()
+
+
+@receiver(pre_delete, sender=Harvest)
+def harvest_stats_deleting(sender, instance, **kwargs) -> None:
+    setattr(instance, '_stats_refresh', StatsRefresh().add_harvest(instance))
+
+
+@receiver(post_delete, sender=Harvest)
+def harvest_stats_deleted(sender, instance, **kwargs) -> None:
+    refresh = instance.__dict__.pop('_stats_refresh', None)
+    if refresh is not None:
+        refresh.schedule()
+
+
+@receiver(m2m_changed, sender=Harvest.trees.through)
+def harvest_trees_stats_changed(sender, instance, action, reverse, pk_set, **kwargs) -> None:
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+
+    if reverse:
+        harvests = list(
+            instance.harvest_set.all() if pk_set is None else Harvest.objects.filter(id__in=pk_set)
+        )
+        trees = [instance.id]
+    else:
+        harvests = [instance]
+        trees = list(instance.trees.values_list('id', flat=True) if pk_set is None else pk_set)
+
+    refresh = StatsRefresh()
+    for harvest in harvests:
+        if harvest.status == Harvest.Status.SUCCEEDED:
+            refresh.add(TreeSeasonStats, harvest.get_season(), trees)
+    refresh.schedule()
+
+
+@receiver(pre_save, sender=Property)
+def property_stats_changed(sender, instance, raw=False, **kwargs) -> None:
+    if raw or instance.id is None:
+        return
+
+    original = sender.objects.filter(id=instance.id).first()
+    if original is None or original.neighborhood_id == instance.neighborhood_id:
+        return
+
+    refresh = StatsRefresh()
+    for harvest in instance.harvests.filter(status=Harvest.Status.SUCCEEDED):
+        refresh.add(
+            NeighborhoodSeasonStats,
+            harvest.get_season(),
+            [original.neighborhood_id, instance.neighborhood_id],
+        )
+    setattr(instance, '_stats_refresh', refresh)
+
+
+@receiver(post_save, sender=Property)
+def property_stats_saved(sender, instance, **kwargs) -> None:
+    refresh = instance.__dict__.pop('_stats_refresh', None)
+    if refresh is not None:
+        refresh.schedule()
+
+
+@receiver(pre_save, sender=HarvestYield)
+def harvest_yield_stats_changed(sender, instance, raw=False, **kwargs) -> None:
+    if raw or instance.id is None:
+        return
+
+    original = sender.objects.filter(id=instance.id).first()
+    if original is not None:
+        setattr(instance, '_stats_refresh', StatsRefresh().add_yield(original))
+
+
+@receiver(post_save, sender=HarvestYield)
+def harvest_yield_stats_saved(sender, instance, raw=False, **kwargs) -> None:
+    refresh = instance.__dict__.pop('_stats_refresh', None)
+    if not raw:
+        (refresh or StatsRefresh()).add_yield(instance).schedule()
+
+
+@receiver(post_delete, sender=HarvestYield)
+def harvest_yield_stats_deleted(sender, instance, **kwargs) -> None:
+    StatsRefresh().add_yield(instance).schedule()
+
+
+def rfp_stats_fields(rfp: RequestForParticipation) -> Tuple[Any, ...]:
+    return (rfp.harvest_id, rfp.person_id, rfp.status)
+
+
+@receiver(pre_save, sender=RequestForParticipation)
+def rfp_stats_changed(sender, instance, raw=False, **kwargs) -> None:
+    if raw:
+        return
+
+    original = sender.objects.filter(id=instance.id).first() if instance.id else None
+    if original is None:
+        setattr(instance, '_stats_refresh', StatsRefresh())
+    elif rfp_stats_fields(original) != rfp_stats_fields(instance):
+        setattr(instance, '_stats_refresh', StatsRefresh().add_request(original))
+
+
+@receiver(post_save, sender=RequestForParticipation)
+def rfp_stats_saved(sender, instance, **kwargs) -> None:
+    refresh = instance.__dict__.pop('_stats_refresh', None)
+    if refresh is not None:
+        refresh.add_request(instance).schedule()
+
+
+@receiver(post_delete, sender=RequestForParticipation)
+def rfp_stats_deleted(sender, instance, **kwargs) -> None:
+    StatsRefresh().add_request(instance).schedule()
@@ -44,6 +44,12 @@ PERMISSIONS: Permissions = {  # pytype: disable=annotation-type-mismatch
         "view": {CORE, PICKLEADER},
         "delete": {CORE},
     },
+    "equipmentreservation": {
+        "add": set(),
+        "change": set(),
+        "view": {CORE, PICKLEADER},
+        "delete": set(),
+    },
     "treetype": {
         "add": {CORE},
         "change": {CORE},
@@ -68,4 +74,28 @@ PERMISSIONS: Permissions = {  # pytype: disable=annotation-type-mismatch
         "view": {CORE, PICKLEADER},
         "delete": {CORE},
     },
+    "treeseasonstats": {
+        "add": set(),
+        "change": set(),
+        "view": {CORE},
+        "delete": set(),
+    },
+    "neighborhoodseasonstats": {
+        "add": set(),
+        "change": set(),
+        "view": {CORE},
+        "delete": set(),
+    },
+    "recipientseasonstats": {
+        "add": set(),
+        "change": set(),
+        "view": {CORE},
+        "delete": set(),
+    },
+    "personseasonstats": {
+        "add": set(),
+        "change": set(),
+        "view": {CORE},
+        "delete": set(),
+    },
 }
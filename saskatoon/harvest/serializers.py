@@ -4,8 +4,9 @@ from typeguard import typechecked
 from typing import Mapping, Any, Optional
 from datetime import timedelta
 from django.utils import timezone as tz
-from django.db.models import Value
-from itertools import chain
+from django.utils.functional import cached_property
+from django.db.models import Case, Prefetch, Q, Value, When
+from django.urls import reverse
 
 from member.models import Actor, Organization
 from member.serializers import (
@@ -32,7 +33,9 @@ from harvest.models import (
     TreeType,
 )
 from harvest.utils import similar_properties, buffer_reservation_time
+from saskatoon.fieldsets import SparseFieldsSerializerMixin
 from saskatoon.settings import DEFAULT_RESERVATION_BUFFER
+from sitebase.cache import BeneficiaryCache
 from sitebase.models import Email, EmailType
 from member.utils import get_available_equipment_points
 from sitebase.templatetags.property import show_property, property_icon_shape, property_status
@@ -126,11 +129,24 @@ class PropertyMapHarvestSerializer(serializers.ModelSerializer[Harvest]):
     date_range = serializers.ReadOnlyField(source='get_date_range')
 
 
-class PropertySerializer(serializers.ModelSerializer[Property]):
+class PropertySerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer[Property]):
     class Meta:
         model = Property
         fields = '__all__'
 
+    select_related_fields = {
+        'neighborhood': ['neighborhood'],
+        'city': ['city'],
+        'state': ['state'],
+        'country': ['country'],
+        'owner': ['owner__person', 'owner__organization__contact_person'],
+        'owner_type': ['owner__person', 'owner__organization'],
+    }
+    prefetch_related_fields = {
+        'trees': ['trees'],
+        'harvests': ['harvests__trees', 'harvests__pick_leader__person'],
+    }
+
     neighborhood = NeighborhoodSerializer(many=False, read_only=True)
     city = CitySerializer(many=False, read_only=True)
     state = StateSerializer(many=False, read_only=True)
@@ -182,7 +198,7 @@ class PropertySerializer(serializers.ModelSerializer[Property]):
         return sent.last().date_sent.strftime("%Y-%m-%d %-I:%M %p")
 
 
-class PropertyMapSerializer(serializers.ModelSerializer[Property]):
+class PropertyMapSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer[Property]):
     class Meta:
         model = Property
         fields = [
@@ -194,6 +210,7 @@ class PropertyMapSerializer(serializers.ModelSerializer[Property]):
             'icon',
             'icon_hover',
             'icon_color',
+            'popup_url',
         ]
 
     address = serializers.ReadOnlyField(source="short_address")
@@ -203,16 +220,24 @@ class PropertyMapSerializer(serializers.ModelSerializer[Property]):
     icon = serializers.SerializerMethodField()
     icon_hover = serializers.SerializerMethodField()
     icon_color = serializers.SerializerMethodField()
+    popup_url = serializers.SerializerMethodField()
+
+    def prepare_queryset(self, queryset):
+        queryset = super().prepare_queryset(queryset)
+        if any(name in self.fields for name in ['icon', 'icon_hover', 'icon_color']):
+            queryset = Property.with_map_state(queryset)
+        return queryset
 
     def icon_shape(self, property, size: str):
-        if show_property(property.nb_harvests, property.status):
+        nb_harvests, next_status, last_status = property.get_map_state()
+        if show_property(nb_harvests, property.status):
             return make_icon(property_icon_shape, size, 'stack')
 
-        if property.next_harvest:
-            return harvest_filter(property.next_harvest.status, size, 'stack')
+        if next_status:
+            return harvest_filter(next_status, size, 'stack')
 
-        if property.last_harvest:
-            return harvest_filter(property.last_harvest.status, size, 'stack')
+        if last_status:
+            return harvest_filter(last_status, size, 'stack')
 
         return make_icon(property_icon_shape, size, 'stack')
 
@@ -223,14 +248,18 @@ class PropertyMapSerializer(serializers.ModelSerializer[Property]):
         return self.icon_shape(obj, 'xl')
 
     def get_icon_color(self, obj):
-        if show_property(obj.nb_harvests, obj.status):
+        nb_harvests, next_status, last_status = obj.get_map_state()
+        if show_property(nb_harvests, obj.status):
             return property_status(obj.status)
 
-        if obj.next_harvest:
-            return color(obj.next_harvest.status)
+        if next_status:
+            return color(next_status)
 
-        if obj.last_harvest:
-            return color(obj.last_harvest.status)
+        if last_status:
+            return color(last_status)
+
+    def get_popup_url(self, obj):
+        return reverse('property-map-marker', args=[obj.id])
 
 
 class PropertyTreeTypeSerializer(TreeTypeSerializer):
@@ -276,6 +305,69 @@ class PropertyEquipmentSerializer(PropertyListSerializer):
         fields = ['id', 'title', 'neighborhood', 'owner']
 
 
+class PropertyMarkerOwnerSerializer(serializers.Serializer[Any]):
+    """Contact of a person or organization owner, or of a pending owner"""
+
+    name = serializers.ReadOnlyField()
+    phone = serializers.CharField(read_only=True)
+    email = serializers.ReadOnlyField()
+
+
+class PropertyMarkerHarvestSerializer(serializers.ModelSerializer[Harvest]):
+    class Meta:
+        model = Harvest
+        fields = ['id', 'status', 'start_date', 'end_date', 'date_range', 'pick_leader', 'trees']
+
+    pick_leader = PickLeaderSerializer(many=False, read_only=True)
+    trees = PropertyTreeTypeSerializer(many=True, read_only=True)
+    start_date = serializers.DateTimeField(source='get_local_start', format=r"%Y-%m-%d")
+    end_date = serializers.DateTimeField(source='get_local_end', format=r"%Y-%m-%d")
+    date_range = serializers.ReadOnlyField(source='get_date_range')
+
+
+class PropertyMarkerSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer[Property]):
+    """Property map pop-up, only the fields displayed by its template"""
+
+    class Meta:
+        model = Property
+        fields = ['id', 'address', 'status', 'neighborhood', 'owner', 'trees', 'harvests']
+
+    select_related_fields = {
+        'neighborhood': ['neighborhood'],
+        'owner': [
+            'owner__person__auth_user',
+            'owner__organization__contact_person__auth_user',
+        ],
+    }
+    prefetch_related_fields = {
+        'trees': ['trees'],
+        'harvests': [
+            Prefetch(
+                'harvests',
+                queryset=Harvest.objects.select_related('pick_leader__person').prefetch_related(
+                    'trees'
+                ),
+            )
+        ],
+    }
+
+    address = serializers.ReadOnlyField(source="short_address")
+    status = serializers.ReadOnlyField()
+    neighborhood = NeighborhoodSerializer(many=False, read_only=True)
+    owner = serializers.SerializerMethodField()
+    trees = PropertyTreeTypeSerializer(many=True, read_only=True)
+    harvests = PropertyMarkerHarvestSerializer(many=True, read_only=True)
+
+    def get_owner(self, obj):
+        if obj.owner:
+            if obj.owner.is_person:
+                return PropertyMarkerOwnerSerializer(obj.owner.person).data
+            elif obj.owner.is_organization:
+                return PropertyMarkerOwnerSerializer(obj.owner.organization).data
+
+        return PendingOwnerPropertySerializer(obj).data
+
+
 class HarvestYieldSerializer(serializers.ModelSerializer[HarvestYield]):
     class Meta:
         model = HarvestYield
@@ -297,11 +389,21 @@ class CommentSerializer(serializers.ModelSerializer[Comment]):
     date_updated = serializers.DateTimeField(format=r'%a %b %-d %Y %-I:%M %p')
 
 
-class HarvestSerializer(serializers.ModelSerializer[Harvest]):
+class HarvestSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer[Harvest]):
     class Meta:
         model = Harvest
         fields = '__all__'
 
+    select_related_fields = {
+        'pick_leader': ['pick_leader__person'],
+        'property': ['property__neighborhood'],
+    }
+    prefetch_related_fields = {
+        'trees': ['trees'],
+        'requests': ['requests__person'],
+        'yields': ['yields__tree', 'yields__recipient'],
+    }
+
     total_distribution = serializers.ReadOnlyField(source='get_total_distribution')
     volunteers_count = serializers.SerializerMethodField()
     is_open_to_requests = serializers.SerializerMethodField()
@@ -321,6 +423,14 @@ class HarvestSerializer(serializers.ModelSerializer[Harvest]):
     pickers = serializers.SerializerMethodField()
     organizations = serializers.SerializerMethodField()
 
+    def prepare_queryset(self, queryset):
+        queryset = super().prepare_queryset(queryset)
+        if 'equipment_point' in self.fields:
+            queryset = Harvest.with_equipment_point(queryset)
+        if 'volunteers' in self.fields or 'volunteers_count' in self.fields:
+            queryset = Harvest.with_volunteers_count(queryset)
+        return queryset
+
     def get_volunteers_count(self, obj):
         return obj.get_volunteers_count(status=RFP.Status.ACCEPTED)
 
@@ -339,8 +449,7 @@ class HarvestSerializer(serializers.ModelSerializer[Harvest]):
         return PickerSerializer(pickers, many=True).data
 
     def get_organizations(self, obj):
-        organizations = Organization.objects.filter(is_beneficiary=True)
-        return OrganizationSerializer(organizations, many=True).data
+        return BeneficiaryCache.get()
 
 
 class HarvestMapPropertySerializer(serializers.ModelSerializer[Property]):
@@ -353,7 +462,7 @@ class HarvestMapPropertySerializer(serializers.ModelSerializer[Property]):
     latitude = serializers.ReadOnlyField()
 
 
-class HarvestMapSerializer(serializers.ModelSerializer[Harvest]):
+class HarvestMapSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer[Harvest]):
     class Meta:
         model = Harvest
         fields = [
@@ -361,13 +470,17 @@ class HarvestMapSerializer(serializers.ModelSerializer[Harvest]):
             'icon',
             'icon_hover',
             'icon_color',
+            'popup_url',
             'property',
         ]
 
+    select_related_fields = {'property': ['property']}
+
     property = HarvestMapPropertySerializer(many=False, read_only=True)
     icon = serializers.SerializerMethodField()
     icon_hover = serializers.SerializerMethodField()
     icon_color = serializers.SerializerMethodField()
+    popup_url = serializers.SerializerMethodField()
 
     def icon_shape(self, harvest, size: str):
         return harvest_filter(harvest.status, size, 'stack')
@@ -381,6 +494,9 @@ class HarvestMapSerializer(serializers.ModelSerializer[Harvest]):
     def get_icon_color(self, obj):
         return color(obj.status)
 
+    def get_popup_url(self, obj):
+        return reverse('harvest-map-marker', args=[obj.id])
+
 
 class HarvestBeneficiarySerializer(serializers.ModelSerializer[Organization]):
     class Meta:
@@ -436,6 +552,12 @@ class HarvestListPropertySerializer(PropertySerializer):
     # mypy says it should be a NeighborhoodSerializer
 
 
+class HarvestListEquipmentPointSerializer(serializers.ModelSerializer[Organization]):
+    class Meta:
+        model = Organization
+        fields = ['actor_id', 'civil_name']
+
+
 class HarvestListSerializer(HarvestSerializer):
     class Meta:
         model = Harvest
@@ -468,19 +590,93 @@ class HarvestListSerializer(HarvestSerializer):
         if point is None:
             return None
 
-        return OrganizationSerializer(point, many=False, read_only=True).data
+        return HarvestListEquipmentPointSerializer(point, many=False, read_only=True).data
+
+
+class HarvestMarkerPropertySerializer(serializers.ModelSerializer[Property]):
+    class Meta:
+        model = Property
+        fields = ['id', 'title', 'neighborhood']
+
+    title = serializers.ReadOnlyField(source="__str__")
+    neighborhood = NeighborhoodSerializer(many=False, read_only=True)
+
+
+class HarvestMarkerSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer[Harvest]):
+    """Harvest map pop-up, only the fields displayed by its template"""
+
+    class Meta:
+        model = Harvest
+        fields = [
+            'id',
+            'start_date',
+            'start_time',
+            'end_time',
+            'date_range',
+            'status',
+            'status_display',
+            'pick_leader',
+            'trees',
+            'property',
+            'equipment_point',
+        ]
+
+    select_related_fields = {
+        'pick_leader': ['pick_leader__person'],
+        'property': [
+            'property__neighborhood',
+            'property__owner__person',
+            'property__owner__organization',
+        ],
+    }
+    prefetch_related_fields = {'trees': ['trees']}
+
+    start_date = serializers.DateTimeField(source='get_local_start', format=r"%a. %b. %-d, %Y")
+    start_time = serializers.DateTimeField(source='get_local_start', format=r"%-I:%M %p")
+    end_time = serializers.DateTimeField(source='get_local_end', format=r"%-I:%M %p")
+    date_range = serializers.ReadOnlyField(source='get_date_range')
+    status: serializers.StringRelatedField[Harvest] = serializers.StringRelatedField(many=False)
+    status_display = serializers.ReadOnlyField(source='get_status_display')
+    pick_leader = PickLeaderSerializer(many=False, read_only=True)
+    trees = PropertyTreeTypeSerializer(many=True, read_only=True)
+    property = HarvestMarkerPropertySerializer(many=False, read_only=True)
+    equipment_point = serializers.SerializerMethodField()
+
+    def prepare_queryset(self, queryset):
+        queryset = super().prepare_queryset(queryset)
+        if 'equipment_point' in self.fields:
+            queryset = Harvest.with_equipment_point(queryset)
+        return queryset
+
+    def get_equipment_point(self, obj: Harvest):
+        point = obj.get_equipment_point()
+        if point is None:
+            return None
+
+        return HarvestListEquipmentPointSerializer(point, many=False, read_only=True).data
 
 
-class EquipmentSerializer(serializers.ModelSerializer[Equipment]):
+class EquipmentSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer[Equipment]):
     class Meta:
         model = Equipment
         fields = '__all__'
 
+    select_related_fields = {
+        'property': [
+            'property__neighborhood',
+            'property__owner__person',
+            'property__owner__organization',
+        ],
+        'type': ['type'],
+    }
+
     property = PropertyEquipmentSerializer(many=False, read_only=True)
     type = EquipmentTypeSerializer(many=False, read_only=True)
 
 
-class OrganizationSerializer(serializers.ModelSerializer[Organization]):
+class OrganizationSerializer(
+    SparseFieldsSerializerMixin, serializers.ModelSerializer[Organization]
+):
     class Meta:
         model = Organization
         fields = [
@@ -503,6 +699,16 @@ class OrganizationSerializer(serializers.ModelSerializer[Organization]):
             'longitude',
         ]
 
+    select_related_fields = {
+        'contact_person': ['contact_person__auth_user'],
+        'address': ['city', 'state'],
+        'neighborhood': ['neighborhood'],
+    }
+    prefetch_related_fields = {
+        'equipment': ['equipment__type', 'equipment__property'],
+        'inventory': ['equipment__type'],
+    }
+
     contact_person = ContactPersonSerializer(many=False, read_only=True)
     neighborhood = NeighborhoodSerializer(many=False, read_only=True)
     equipment = EquipmentSerializer(many=True, read_only=True)
@@ -541,9 +747,35 @@ class HarvestDetailOrganizationSerializer(OrganizationSerializer):
             'status',
         ]
 
+    prefetch_related_fields = {
+        'contact_person': ['contact_person__auth_user__groups'],
+        'equipment': [
+            'equipment__type',
+            'equipment__property__neighborhood',
+            'equipment__property__owner__person__auth_user',
+            'equipment__property__owner__organization__contact_person__auth_user',
+        ],
+        'inventory': ['equipment__type'],
+    }
+
     status = serializers.ReadOnlyField()
 
 
+class HarvestNearbyOrganizationSerializer(serializers.ModelSerializer[Organization]):
+    class Meta:
+        model = Organization
+        fields = [
+            'actor_id',
+            'civil_name',
+            'short_address',
+            'latitude',
+            'longitude',
+            'distance',
+        ]
+
+    distance = serializers.FloatField(read_only=True)
+
+
 @typechecked
 class HarvestDetailSerializer(HarvestSerializer):
     class Meta:
@@ -559,6 +791,19 @@ class HarvestDetailSerializer(HarvestSerializer):
             'equipment_reserved',
         ]
 
+    select_related_fields = {
+        **HarvestSerializer.select_related_fields,
+        'property': [
+            'property__neighborhood',
+            'property__owner__person',
+            'property__owner__organization',
+        ],
+    }
+    prefetch_related_fields = {
+        **HarvestSerializer.prefetch_related_fields,
+        'comments': ['comments__author__person'],
+    }
+
     trees = PropertyTreeTypeSerializer(many=True, read_only=True)
     property = HarvestDetailPropertySerializer(many=False, read_only=True)
     comments = CommentSerializer(many=True, read_only=True)
@@ -569,9 +814,11 @@ class HarvestDetailSerializer(HarvestSerializer):
     reservation_end = serializers.SerializerMethodField()
     equipment_points = serializers.SerializerMethodField()
 
-    def __init__(self, *args, **kwargs):
-        super(HarvestDetailSerializer, self).__init__(*args, **kwargs)
-        self.unserialized_equipment_point = self.instance.get_equipment_point()
+    @cached_property
+    def unserialized_equipment_point(self) -> Optional[Organization]:
+        if self.instance is None:
+            return None
+        return self.instance.get_equipment_point()
 
     def get_about(self, obj):
         return obj.about.html
@@ -604,24 +851,38 @@ class HarvestDetailSerializer(HarvestSerializer):
         return buffer_reservation_time(obj.end_date)
 
     def get_equipment_points(self, obj: Harvest):
-        reserved = Organization.objects.none()
+        """Every equipment point with its status for the harvest, fetched in a
+        single query along with the prefetched related objects it displays"""
+        points = Organization.objects.filter(is_equipment_point=True)
+        statuses = []
         if self.unserialized_equipment_point:
-            reserved = Organization.objects.filter(
-                actor_id=self.unserialized_equipment_point.actor_id
-            ).annotate(status=Value(Organization.EquipmentPointStatus.RESERVED))
+            reserved = self.unserialized_equipment_point.actor_id
+            points = Organization.objects.filter(Q(is_equipment_point=True) | Q(actor_id=reserved))
+            statuses.append(
+                When(actor_id=reserved, then=Value(Organization.EquipmentPointStatus.RESERVED))
+            )
 
-        available = Organization.objects.none()
         if obj.start_date and obj.end_date and obj.status in Harvest.CAN_RESERVE_EQUIPMENT:
-            available = get_available_equipment_points(obj.start_date, obj.end_date).annotate(
-                status=Value(Organization.EquipmentPointStatus.AVAILABLE)
+            available = get_available_equipment_points(obj.start_date, obj.end_date)
+            statuses.append(
+                When(
+                    actor_id__in=available.values('actor_id'),
+                    then=Value(Organization.EquipmentPointStatus.AVAILABLE),
+                )
             )
 
-        not_available = (
-            Organization.objects.filter(is_equipment_point=True)
-            .exclude(actor_id__in=(available | reserved))
-            .annotate(status=Value(Organization.EquipmentPointStatus.UNAVAILABLE))
+        # available points first, then the unavailable and reserved ones
+        ranks = [
+            Organization.EquipmentPointStatus.AVAILABLE,
+            Organization.EquipmentPointStatus.UNAVAILABLE,
+            Organization.EquipmentPointStatus.RESERVED,
+        ]
+        points = points.annotate(
+            status=Case(*statuses, default=Value(Organization.EquipmentPointStatus.UNAVAILABLE))
+        ).order_by(
+            Case(*[When(status=status, then=Value(rank)) for rank, status in enumerate(ranks)]),
+            'civil_name',
         )
 
-        return HarvestDetailOrganizationSerializer(
-            list(chain(available, not_available, reserved)), many=True, read_only=True
-        ).data
+        points = HarvestDetailOrganizationSerializer().prepare_queryset(points)
+        return HarvestDetailOrganizationSerializer(points, many=True, read_only=True).data
@@ -0,0 +1,263 @@
+from django.db.models import Count, Q, QuerySet, Sum
+from typing import Any, Dict, List, Optional, Tuple
+
+from harvest.models import (
+    Harvest,
+    HarvestYield,
+    NeighborhoodSeasonStats,
+    PersonSeasonStats,
+    RecipientSeasonStats,
+    RequestForParticipation as RFP,
+    TreeSeasonStats,
+    TreeType,
+)
+from member.models import Neighborhood, Organization, Person
+
+
+class HarvestStats:
+    """Statistics on a set of harvests and their yields.
+
+    Every table is built from a fixed number of grouped aggregate queries,
+    regardless of the number of persons, organizations, trees or boroughs.
+    """
+
+    def __init__(self, harvest_qs: QuerySet[Harvest]):
+        # harvest_qs may carry filter joins, ordering or distinct(): counting
+        # through a pk subquery keeps the results identical to harvest_qs.count()
+        self.harvests = Harvest.objects.filter(pk__in=harvest_qs.values('pk')).order_by()
+        self.yields = HarvestYield.objects.filter(harvest__in=self.harvests).order_by()
+        self.total_harvests = self.harvests.count()
+        self._recipients: Dict[int, Dict[str, Any]] = {}
+
+    def is_empty(self) -> bool:
+        return self.total_harvests == 0
+
+    def get_recipients(self) -> Dict[int, Dict[str, Any]]:
+        """Yield count and total weight per recipient (actor_id)"""
+        if not self._recipients and not self.is_empty():
+            self._recipients = dict(
+                (r['recipient'], r)
+                for r in self.yields.values('recipient').annotate(
+                    count=Count('id'), total=Sum('total_in_lb')
+                )
+            )
+        return self._recipients
+
+    def get_trees(self) -> Dict[int, Tuple[int, float]]:
+        """Harvest count and total weight per tree type with yields"""
+        weights = dict(
+            (y['tree'], y['total'])
+            for y in self.yields.values('tree').annotate(total=Sum('total_in_lb'))
+        )
+        harvests = dict(
+            (h['treetype'], h['count'])
+            for h in Harvest.trees.through._default_manager.filter(
+                harvest__in=self.harvests, treetype__in=weights.keys()
+            )
+            .values('treetype')
+            .annotate(count=Count('harvest', distinct=True))
+            .order_by()
+        )
+        return dict((tree, (harvests.get(tree, 0), weight)) for tree, weight in weights.items())
+
+    def get_neighborhoods(self) -> Dict[int, Tuple[int, float]]:
+        """Harvest count and total weight per neighborhood with yields"""
+        key = 'harvest__property__neighborhood'
+        weights = dict(
+            (y[key], y['total'])
+            for y in self.yields.filter(**{f"{key}__isnull": False})
+            .values(key)
+            .annotate(total=Sum('total_in_lb'))
+        )
+        harvests = dict(
+            (h['property__neighborhood'], h['count'])
+            for h in self.harvests.values('property__neighborhood').annotate(
+                count=Count('id', distinct=True)
+            )
+        )
+        return dict(
+            (neighborhood, (harvests.get(neighborhood, 0), weight))
+            for neighborhood, weight in weights.items()
+        )
+
+    def get_leaders(self, pickers: QuerySet[Person]) -> Dict[int, int]:
+        """Number of harvests led per picker"""
+        return dict(
+            (h['pick_leader__person'], h['count'])
+            for h in self.harvests.filter(pick_leader__person__in=pickers)
+            .values('pick_leader__person')
+            .annotate(count=Count('id', distinct=True))
+        )
+
+    def get_requests(self, pickers: QuerySet[Person]) -> Dict[int, Dict[str, int]]:
+        """Number of requests for participation (all and accepted) per picker"""
+        return dict(
+            (r['person'], r)
+            for r in RFP.objects.filter(person__in=pickers)
+            .values('person')
+            .annotate(
+                count=Count('id'),
+                accepted=Count('id', filter=Q(status=RFP.Status.ACCEPTED)),
+            )
+            .order_by()
+        )
+
+    def get_highlights(self) -> Dict[str, int]:
+        """Returns general statistics of harvests"""
+        if self.is_empty():
+            return {
+                "total_beneficiaries": 0,
+                "total_pickers": 0,
+                "total_weight": 0,
+                "total_harvests": 0,
+            }
+
+        recipients = self.get_recipients()
+        return {
+            "total_beneficiaries": Organization.objects.filter(
+                actor_id__in=recipients.keys()
+            ).count(),
+            "total_pickers": len(recipients),
+            "total_weight": int(sum(r['total'] for r in recipients.values())),
+            "total_harvests": self.total_harvests,
+        }
+
+    def get_total_weight_harvest_per_fruit(self, lang='fr') -> List[Tuple[str, int, int]]:
+        """Returns total number of harvests and weight per fruit"""
+        if self.is_empty():
+            return []
+
+        trees = self.get_trees()
+        return [
+            (tree.get_fruit_name(lang), trees[tree.id][0], int(trees[tree.id][1]))
+            for tree in TreeType.objects.filter(id__in=trees.keys())
+        ]
+
+    def get_total_weight_harvest_per_neighborhood(self) -> List[Tuple[Neighborhood, int, int]]:
+        """Returns total number of harvests and weight per neighborhood"""
+        if self.is_empty():
+            return []
+
+        neighborhoods = self.get_neighborhoods()
+        return [
+            (
+                neighborhood,
+                neighborhoods[neighborhood.id][0],
+                int(neighborhoods[neighborhood.id][1]),
+            )
+            for neighborhood in Neighborhood.objects.filter(id__in=neighborhoods.keys()).order_by(
+                "name"
+            )
+        ]
+
+    def get_total_weight_harvest_per_beneficiary(self) -> List[Tuple[Organization, int, int]]:
+        """Returns total number of harvests and weight per beneficiary organization"""
+        if self.is_empty():
+            return []
+
+        recipients = self.get_recipients()
+        beneficiaries = Organization.objects.filter(
+            is_beneficiary=True, actor_id__in=recipients.keys()
+        )
+
+        return [
+            (
+                beneficiary,
+                recipients[beneficiary.actor_id]['count'],
+                int(recipients[beneficiary.actor_id]['total']),
+            )
+            for beneficiary in beneficiaries
+        ]
+
+    def get_total_weight_harvest_per_picker(self) -> List[Tuple[Person, int, int, int, int, int]]:
+        """Returns total number of harvests and weight per picker"""
+        if self.is_empty():
+            return []
+
+        recipients = self.get_recipients()
+        pickers = Person.objects.filter(actor_id__in=recipients.keys())
+        leaders = self.get_leaders(pickers)
+        requests = self.get_requests(pickers)
+
+        no_requests = {'count': 0, 'accepted': 0}
+        return [
+            (
+                p,
+                leaders.get(p.actor_id, 0),
+                requests.get(p.actor_id, no_requests)['count'],
+                requests.get(p.actor_id, no_requests)['accepted'],
+                recipients[p.actor_id]['count'],
+                int(recipients[p.actor_id]['total']),
+            )
+            for p in pickers.order_by("first_name")
+        ]
+
+
+class SeasonStats(HarvestStats):
+    """Statistics on the succeeded harvests of one or all seasons,
+    read from the season rollup tables (see harvest.models.SeasonRollup).
+
+    Each table costs one query on the rows to be displayed, however many
+    yields were ever recorded.
+    """
+
+    def __init__(self, season: Optional[int] = None):
+        self.season = season
+        self.total_harvests = (
+            self.rollup(NeighborhoodSeasonStats).aggregate(total=Sum('harvests'))['total'] or 0
+        )
+        self._recipients = {}
+
+    def rollup(self, model) -> QuerySet[Any]:
+        rows = model.objects.order_by()
+        if self.season is not None:
+            rows = rows.filter(season=self.season)
+        return rows
+
+    def get_recipients(self) -> Dict[int, Dict[str, Any]]:
+        if not self._recipients and not self.is_empty():
+            self._recipients = dict(
+                (r['recipient'], r)
+                for r in self.rollup(RecipientSeasonStats)
+                .values('recipient')
+                .annotate(count=Sum('yields'), total=Sum('weight'))
+            )
+        return self._recipients
+
+    def get_trees(self) -> Dict[int, Tuple[int, float]]:
+        return dict(
+            (r['tree'], (r['count'], r['total']))
+            for r in self.rollup(TreeSeasonStats)
+            .values('tree')
+            .annotate(count=Sum('harvests'), n_yields=Sum('yields'), total=Sum('weight'))
+            .filter(n_yields__gt=0)
+        )
+
+    def get_neighborhoods(self) -> Dict[int, Tuple[int, float]]:
+        return dict(
+            (r['neighborhood'], (r['count'], r['total']))
+            for r in self.rollup(NeighborhoodSeasonStats)
+            .filter(neighborhood__isnull=False)
+            .values('neighborhood')
+            .annotate(count=Sum('harvests'), n_yields=Sum('yields'), total=Sum('weight'))
+            .filter(n_yields__gt=0)
+        )
+
+    def get_leaders(self, pickers: QuerySet[Person]) -> Dict[int, int]:
+        return dict(
+            (r['person'], r['count'])
+            for r in self.rollup(PersonSeasonStats)
+            .filter(person__in=pickers, harvests_led__gt=0)
+            .values('person')
+            .annotate(count=Sum('harvests_led'))
+        )
+
+    def get_requests(self, pickers: QuerySet[Person]) -> Dict[int, Dict[str, int]]:
+        # requests are counted over all seasons, as in HarvestStats
+        return dict(
+            (r['person'], r)
+            for r in PersonSeasonStats.objects.filter(person__in=pickers)
+            .values('person')
+            .annotate(count=Sum('requests'), accepted=Sum('requests_accepted'))
+            .order_by()
+        )
@@ -7,12 +7,14 @@ from django.contrib.auth.mixins import (
 from django.contrib.auth.decorators import login_required
 from django.contrib.humanize.templatetags.humanize import ordinal
 from django.contrib.messages.views import SuccessMessageMixin
+from django.core.exceptions import ValidationError
 from django.http import HttpResponseRedirect
 from django.shortcuts import get_object_or_404
 from django.urls import reverse_lazy
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone as tz
 from django.views.generic import CreateView, TemplateView, UpdateView
+from django.views.generic.edit import ModelFormMixin
 from django_stubs_ext import StrOrPromise
 from datetime import datetime
 from logging import getLogger
@@ -162,8 +164,20 @@ class PropertyUpdateView(
         return reverse_lazy('property-detail', kwargs={'pk': self.object.pk})
 
 
+class HarvestReservationMixin(ModelFormMixin[Harvest, HarvestForm]):
+    """Redisplays the harvest form if its equipment point got booked meanwhile"""
+
+    def form_valid(self, form):
+        try:
+            return super().form_valid(form)
+        except ValidationError as error:
+            form.add_error('equipment_point', error)
+            return self.form_invalid(form)
+
+
 class HarvestCreateView(
     PermissionRequiredMixin,
+    HarvestReservationMixin,
     SuccessMessageMixin[HarvestForm],
     CreateView[Harvest, HarvestForm],
 ):
@@ -210,6 +224,7 @@ class HarvestCreateView(
 
 class HarvestUpdateView(
     PermissionRequiredMixin,
+    HarvestReservationMixin,
     SuccessMessageMixin[HarvestForm],
     UpdateView[Harvest, HarvestForm],
 ):
@@ -451,32 +451,28 @@ class OnboardingAdmin(admin.ModelAdmin[Onboarding]):
 
     @admin.action(description="Send registration invite to selected group(s)")
     def send_invite(self, request, queryset):
-        num_sent = 0
+        num_queued = 0
         for o in queryset:
             o.all_sent = True
             o.log += "\n[{}]".format(tz.localtime(tz.now()).strftime("%B %d, %Y @ %-I:%M %p"))
-            for p in o.persons.filter(auth_user__password=''):
-                m = Email.objects.create(recipient=p, type=EmailType.REGISTRATION)
-
-                if m.send(data={'password': reset_password(p.auth_user)}) == 1:
-                    num_sent += 1
-                    o.log += f"\n\t> OK {p.auth_user.email}"
-                else:
-                    p.auth_user.password = ''
-                    p.auth_user.has_temporary_password = False
-                    p.auth_user.save()
-                    o.all_sent = False
-                    o.log += f"\n\t> FAIL {p.auth_user.email}"
-                    messages.error(
-                        request,
-                        f"Could not send Registration Invite to {p.auth_user.email}",
-                    )
-
-            if o.all_sent:
-                messages.success(
-                    request,
-                    f"Successfully sent Registration Invite to {num_sent} users",
+            persons = list(o.persons.filter(auth_user__password='').select_related('auth_user'))
+            emails = [
+                Email(
+                    recipient=p,
+                    type=EmailType.REGISTRATION,
+                    data={'password': reset_password(p.auth_user)},
                 )
+                for p in persons
+            ]
+            num_queued += Email.send_in_background(emails)
+            for p in persons:
+                o.log += f"\n\t> QUEUED {p.auth_user.email}"
             o.save()
 
+        messages.info(
+            request,
+            f"Queued Registration Invite to {num_queued} users, delivered in the "
+            "background: follow their progress in the Emails list.",
+        )
+
     actions = [send_invite]
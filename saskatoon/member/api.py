@@ -1,10 +1,15 @@
+from datetime import datetime, time, timedelta
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django_filters.rest_framework import DjangoFilterBackend
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django.urls import reverse_lazy
 from rest_framework import viewsets, generics
+from rest_framework.exceptions import ValidationError
 from rest_framework.filters import SearchFilter
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
+from typing import List
 
 from harvest.serializers import (
     OrganizationSerializer,
@@ -15,15 +20,22 @@ from member.filters import (
     EquipmentPointFilter,
     OrganizationFilter,
 )
-from member.permissions import IsPickLeaderOrCoreOrAdmin, is_core_or_admin
+from member.permissions import IsCoreOrAdmin, IsPickLeaderOrCoreOrAdmin, is_core_or_admin
 from member.serializers import CommunitySerializer
+from member.utils import get_booked_slots
+from saskatoon.fieldsets import SparseFieldsViewsetMixin
+from saskatoon.maps import MapViewMixin
 from sitebase.utils import (
     get_filter_context,
+    local_today,
+    parse_window_date,
     renderer_format_needs_json_response,
 )
 
 
-class OrganizationViewset(LoginRequiredMixin, viewsets.ModelViewSet[Organization]):
+class OrganizationViewset(
+    LoginRequiredMixin, SparseFieldsViewsetMixin, viewsets.ModelViewSet[Organization]
+):
     """Organization viewset"""
 
     permission_classes = [IsPickLeaderOrCoreOrAdmin]
@@ -67,7 +79,7 @@ class OrganizationViewset(LoginRequiredMixin, viewsets.ModelViewSet[Organization
         )
 
 
-class OrganizationMapView(LoginRequiredMixin, generics.ListAPIView[Organization]):
+class OrganizationMapView(LoginRequiredMixin, MapViewMixin, generics.ListAPIView[Organization]):
     """List view for organizations that are equipment points."""
 
     permission_classes = [IsPickLeaderOrCoreOrAdmin]
@@ -90,7 +102,7 @@ class OrganizationMapView(LoginRequiredMixin, generics.ListAPIView[Organization]
     def list(self, request, *args, **kwargs):
         """Beneficiary map view."""
 
-        response = super().list(request, *args, **kwargs)
+        response = self.map_list(request)
 
         if renderer_format_needs_json_response(request):
             return response
@@ -163,7 +175,88 @@ class EquipmentPointMapView(OrganizationMapView):
     filter_context_string = 'equipment-point'
 
 
-class CommunityViewset(LoginRequiredMixin, viewsets.ModelViewSet[AuthUser]):
+class EquipmentPointAvailabilityView(LoginRequiredMixin, generics.GenericAPIView[Organization]):
+    """Availability of the equipment points over a date range, by day or hour slots.
+
+    Query parameters: `start` and `end` (ISO 8601 dates or datetimes, defaulting
+    to today and `default_days` later) and `slot` (`day` or `hour`). Each
+    equipment point gets an `availability` string holding one character per
+    slot: `1` if the point is available for the whole slot, `0` if it is
+    reserved (including the reservation buffer) at some point of it.
+    """
+
+    permission_classes = [IsCoreOrAdmin]
+    renderer_classes = [JSONRenderer]
+    queryset = Organization.objects.filter(is_equipment_point=True).order_by('civil_name')
+    slot_lengths = {'day': timedelta(days=1), 'hour': timedelta(hours=1)}
+    default_days = 28
+    max_slots = 3000
+
+    def get_boundaries(self, start: datetime, end: datetime, slot: str) -> List[datetime]:
+        """Bounds of the slots covering the range, days starting at local midnight"""
+        if slot == 'day':
+            day = timezone.localtime(start).date()
+            first = timezone.make_aware(datetime.combine(day, time.min))
+        else:
+            first = start.replace(minute=0, second=0, microsecond=0)
+
+        boundaries = [first]
+        while boundaries[-1] < end:
+            if len(boundaries) > self.max_slots:
+                raise ValidationError(
+                    {'end': f"The range cannot hold more than {self.max_slots} slots."}
+                )
+            if slot == 'day':
+                day = day + timedelta(days=1)
+                boundaries.append(timezone.make_aware(datetime.combine(day, time.min)))
+            else:
+                boundaries.append(boundaries[-1] + self.slot_lengths[slot])
+        return boundaries
+
+    def get(self, request, *args, **kwargs):
+        params = request.query_params
+        slot = params.get('slot', 'day')
+        if slot not in self.slot_lengths:
+            raise ValidationError({'slot': f"Choose among {', '.join(self.slot_lengths)}."})
+
+        start = parse_window_date(params.get('start')) or local_today()
+        end = parse_window_date(params.get('end')) or start + timedelta(days=self.default_days)
+        if end <= start:
+            raise ValidationError({'end': "The end must be later than the start."})
+
+        boundaries = self.get_boundaries(start, end, slot)
+        booked = get_booked_slots(boundaries)
+        free = '1' * (len(boundaries) - 1)
+
+        return Response(
+            {
+                'slot': slot,
+                'slots': [
+                    (timezone.localtime(b).date() if slot == 'day' else b).isoformat()
+                    for b in boundaries[:-1]
+                ],
+                'end': boundaries[-1].isoformat(),
+                'equipment_points': [
+                    {
+                        'actor_id': point.actor_id,
+                        'civil_name': point.civil_name,
+                        'availability': (
+                            ''.join('0' if b else '1' for b in booked[point.actor_id])
+                            if point.actor_id in booked
+                            else free
+                        ),
+                    }
+                    for point in self.filter_queryset(self.get_queryset()).only(
+                        'actor_id', 'civil_name'
+                    )
+                ],
+            }
+        )
+
+
+class CommunityViewset(
+    LoginRequiredMixin, SparseFieldsViewsetMixin, viewsets.ModelViewSet[AuthUser]
+):
     """Community viewset"""
 
     permission_classes = [IsPickLeaderOrCoreOrAdmin]
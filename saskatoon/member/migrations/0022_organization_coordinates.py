@@ -0,0 +1,38 @@
+# Generated by Django 4.2.30 on 2026-10-17 17:49
+
+from django.db import migrations, models
+
+
+def backfill_coordinates(apps, _schema_editor):
+    Organization = apps.get_model('member', 'Organization')
+    entries = []
+    for entry in Organization.objects.exclude(geom__isnull=True).only('geom'):
+        if entry.geom and entry.geom.get('type') == 'Point':
+            entry.longitude, entry.latitude = entry.geom['coordinates'][:2]
+            entries.append(entry)
+    Organization.objects.bulk_update(entries, ['latitude', 'longitude'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('member', '0021_alter_person_family_name'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='organization',
+            name='latitude',
+            field=models.FloatField(blank=True, editable=False, null=True, verbose_name='Latitude'),
+        ),
+        migrations.AddField(
+            model_name='organization',
+            name='longitude',
+            field=models.FloatField(blank=True, editable=False, null=True, verbose_name='Longitude'),
+        ),
+        migrations.AddIndex(
+            model_name='organization',
+            index=models.Index(fields=['latitude', 'longitude'], name='member_orga_latitud_a9d022_idx'),
+        ),
+        migrations.RunPython(backfill_coordinates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-17 18:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('member', '0022_organization_coordinates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='person',
+            name='notifications',
+            field=models.CharField(choices=[('immediate', 'One email per event'), ('digest', 'Periodic summary email')], default='immediate', help_text='How new requests and comments on your harvests are emailed', max_length=10, verbose_name='Harvest notifications'),
+        ),
+    ]
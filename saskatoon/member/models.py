@@ -18,7 +18,7 @@ from djgeojson.fields import PointField
 from enum import Enum
 
 from sitebase.validators import validate_is_not_nan
-from sitebase.utils import local_today
+from sitebase.utils import get_point_coordinates, local_today
 from harvest.models import (
     RequestForParticipation as RFP,
     Harvest,
@@ -108,7 +108,10 @@ class AuthUser(AbstractBaseUser, PermissionsMixin):
     @property
     def role_groups(self):
         '''returns user's role groups'''
-        return self.groups.filter(name__in=[t[0] for t in self.GROUPS])
+        names = [t[0] for t in self.GROUPS]
+        if 'groups' in getattr(self, '_prefetched_objects_cache', {}):
+            return [g for g in self.groups.all() if g.name in names]
+        return self.groups.filter(name__in=names)
 
     @property
     def roles(self):
@@ -216,6 +219,10 @@ class Person(Actor):
         FR = 'fr', "Français"
         EN = 'en', "English"
 
+    class Notifications(models.TextChoices):
+        IMMEDIATE = 'immediate', _("One email per event")
+        DIGEST = 'digest', _("Periodic summary email")
+
     language = models.CharField(
         verbose_name=_("Preferred Language"),
         max_length=2,
@@ -223,6 +230,14 @@ class Person(Actor):
         default=Language.FR,
     )
 
+    notifications = models.CharField(
+        verbose_name=_("Harvest notifications"),
+        help_text=_("How new requests and comments on your harvests are emailed"),
+        max_length=10,
+        choices=Notifications.choices,
+        default=Notifications.IMMEDIATE,
+    )
+
     first_name = models.CharField(verbose_name=_("First name"), max_length=30)
 
     family_name = models.CharField(
@@ -400,6 +415,9 @@ class Organization(Actor):
         verbose_name = _("organization")
         verbose_name_plural = _("organizations")
         ordering = ["civil_name"]
+        indexes = [
+            models.Index(fields=['latitude', 'longitude']),
+        ]
 
     class EquipmentPointStatus(models.TextChoices, Enum):
         UNAVAILABLE = 'unavailable', _("Unavailable")
@@ -499,6 +517,13 @@ is currenlty made available'
 
     geom = PointField(null=True, blank=True)
 
+    # copied from geom on save, to filter and sort by location in the database
+    latitude = models.FloatField(verbose_name=_("Latitude"), null=True, blank=True, editable=False)
+
+    longitude = models.FloatField(
+        verbose_name=_("Longitude"), null=True, blank=True, editable=False
+    )
+
     @property
     def short_address(self):
         if self.street_number and self.street and self.complement:
@@ -533,6 +558,13 @@ is currenlty made available'
     def name(self):
         return "%s" % self.civil_name
 
+    def save(self, *args, **kwargs):
+        self.latitude, self.longitude = get_point_coordinates(self.geom)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'geom' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'latitude', 'longitude'}
+        super().save(*args, **kwargs)
+
     @property
     def contact(self):
         return self.contact_person.name if self.contact_person else None
@@ -559,20 +591,6 @@ is currenlty made available'
             .distinct()
         )
 
-    @property
-    def latitude(self):
-        if self.geom is not None and self.geom['type'] == "Point":
-            return self.geom['coordinates'][1]
-
-        return None
-
-    @property
-    def longitude(self):
-        if self.geom is not None and self.geom['type'] == "Point":
-            return self.geom['coordinates'][0]
-
-        return None
-
 
 class Neighborhood(models.Model):
     """Borough model"""
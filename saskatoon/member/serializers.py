@@ -9,6 +9,7 @@ from member.models import (
     State,
 )
 from harvest.models import Harvest, Property
+from saskatoon.fieldsets import SparseFieldsSerializerMixin
 
 
 class NeighborhoodSerializer(serializers.ModelSerializer[Neighborhood]):
@@ -182,11 +183,14 @@ class PickLeaderSerializer(serializers.ModelSerializer[AuthUser]):
         fields = ['id', 'name', 'email']
 
 
-class CommunitySerializer(serializers.ModelSerializer[AuthUser]):
+class CommunitySerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer[AuthUser]):
     class Meta:
         model = AuthUser
         fields = '__all__'
 
+    select_related_fields = {'person': ['person__neighborhood']}
+    prefetch_related_fields = {'person': ['person__properties']}
+
     person = PersonSerializer(many=False, read_only=True)
     roles = serializers.ReadOnlyField()
     role_codes = serializers.SerializerMethodField()
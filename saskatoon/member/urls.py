@@ -14,6 +14,11 @@ urlpatterns = [
         api.EquipmentPointListView.as_view(),
         name='equipment-point-list',
     ),
+    path(
+        'equipment-point/availability/',
+        api.EquipmentPointAvailabilityView.as_view(),
+        name='equipment-point-availability',
+    ),
     # MAP VIEWS
     path(
         'organization/map',
@@ -1,13 +1,16 @@
 import deal
+from bisect import bisect_left, bisect_right
 from logging import getLogger
+from django.db import transaction
 from django.db.models import Q, QuerySet
 from datetime import timedelta, datetime
 from secrets import choice
 from typeguard import typechecked
-from typing import Optional, Union
+from typing import Dict, List, Optional, Sequence, Set, Tuple, Union
 
 from member.models import AuthUser, Organization
-from harvest.models import Equipment, Harvest
+from harvest.models import Equipment, EquipmentReservation, Harvest
+from saskatoon.maps import nearest
 from saskatoon.settings import DEFAULT_RESERVATION_BUFFER
 
 logger = getLogger('saskatoon')
@@ -60,30 +63,89 @@ def get_available_equipment_points(
     """List all available equipment points for a given datetime range"""
 
     # A buffer gives pick leaders a bit of leeway in picking up and returning
-    # the equipment, since some harvest sites can be further away
-    requested_start = start - buffer
-    requested_end = end + buffer
-
+    # the equipment, since some harvest sites can be further away.
     # If another harvest has already reserved the equipment available in the equipment
     # point and its datetime range overlaps, then the equipment point is unavailable.
-    query = Q(status__in=Harvest.CAN_RESERVE_EQUIPMENT)
+    conflicts = EquipmentReservation.objects.filter(
+        EquipmentReservation.overlap_filter(start, end, buffer), equipment_point__isnull=False
+    )
 
     # Dont include itself
     if harvest is not None:
-        query = query & ~Q(pk=harvest.pk)
-
-    start_between = Q(start_date__gte=requested_start, start_date__lte=requested_end)
-    end_between = Q(end_date__gte=requested_start, end_date__lte=requested_end)
-    surround = Q(start_date__lte=requested_start, end_date__gte=requested_end)
-
-    conflicts = Harvest.objects.filter(query & (start_between | end_between | surround))
-    booked_equipment = Equipment.objects.filter(pk__in=conflicts.values('equipment_reserved'))
+        conflicts = conflicts.exclude(harvest=harvest)
 
     return Organization.objects.filter(is_equipment_point=True).exclude(
-        pk__in=booked_equipment.values('owner')
+        pk__in=conflicts.values('equipment_point')
     )
 
 
+@typechecked
+def reserve_equipment_point(harvest: Harvest, equipment_point: Organization) -> Optional[Harvest]:
+    """Reserves all the equipment of the equipment point for the harvest.
+
+    The availability check, a locking read, and the reservation happen in one
+    transaction holding a lock on the equipment point, so that bookings of the same point are
+    serialized while the ones of other points proceed concurrently. Returns the
+    harvest that reserved the point over an overlapping window, in which case
+    nothing is changed, or None once reserved."""
+    start, end = harvest.start_date, harvest.end_date
+    if start is None or end is None:
+        raise ValueError("The harvest must have start and end dates")
+
+    with transaction.atomic():
+        # released when the transaction that records the reservation commits
+        list(Organization.objects.select_for_update().filter(pk=equipment_point.pk))
+
+        # A locking read, unlike a plain one, sees the reservations committed while
+        # waiting for the lock, whatever reads were made earlier in the transaction
+        # (e.g. under MySQL's REPEATABLE READ isolation).
+        conflict = (
+            EquipmentReservation.objects.filter(
+                EquipmentReservation.overlap_filter(start, end),
+                equipment_point=equipment_point.pk,
+            )
+            .exclude(harvest=harvest)
+            .select_related('harvest')
+            .select_for_update(of=('self',))
+            .first()
+        )
+        if conflict is not None:
+            return conflict.harvest
+
+        harvest.equipment_reserved.set(Equipment.objects.filter(owner=equipment_point))
+    return None
+
+
+@typechecked
+def get_booked_equipment_points(
+    windows: Sequence[Tuple[datetime, datetime]],
+    harvest: Optional[Harvest] = None,
+    buffer: timedelta = timedelta(hours=DEFAULT_RESERVATION_BUFFER),
+) -> List[Set[int]]:
+    """Ids of the equipment points booked during each of the (start, end)
+    windows, as found by get_available_equipment_points, in a single query"""
+    if not windows:
+        return []
+
+    query = Q()
+    for start, end in windows:
+        query |= EquipmentReservation.overlap_filter(start, end, buffer)
+
+    conflicts = EquipmentReservation.objects.filter(query, equipment_point__isnull=False)
+    if harvest is not None:
+        conflicts = conflicts.exclude(harvest=harvest)
+
+    delta = buffer - timedelta(hours=DEFAULT_RESERVATION_BUFFER)
+    booked: List[Set[int]] = [set() for _window in windows]
+    for point, reserved_start, reserved_end in conflicts.values_list(
+        'equipment_point', 'start_date', 'end_date'
+    ):
+        for index, (start, end) in enumerate(windows):
+            if reserved_start <= end + delta and reserved_end >= start - delta:
+                booked[index].add(point)
+    return booked
+
+
 @typechecked
 def is_equipment_point_available(
     org: Organization,
@@ -97,3 +159,65 @@ def is_equipment_point_available(
         return False
 
     return get_available_equipment_points(start, end, harvest).filter(pk=org.pk).exists()
+
+
+@typechecked
+def get_booked_slots(boundaries: Sequence[datetime]) -> Dict[int, List[bool]]:
+    """Booked slots of the equipment points having reservations, the slots being
+    delimited by the sorted `boundaries` (one more than the slots). Computed in a
+    single pass over the (buffered) reservations overlapping the whole range."""
+    count = len(boundaries) - 1
+    booked: Dict[int, List[bool]] = {}
+    if count < 1:
+        return booked
+
+    reservations = EquipmentReservation.objects.filter(
+        start_date__lt=boundaries[-1],
+        end_date__gt=boundaries[0],
+        equipment_point__isnull=False,
+    ).values_list('equipment_point', 'start_date', 'end_date')
+
+    for point, start, end in reservations:
+        slots = booked.setdefault(point, [False] * count)
+        # the slots [boundaries[i], boundaries[i + 1]) overlapping (start, end)
+        first = max(0, bisect_right(boundaries, start) - 1)
+        last = min(count, bisect_left(boundaries, end))
+        slots[first:last] = [True] * (last - first)
+    return booked
+
+
+def _get_harvest_location(harvest: Harvest) -> Optional[Tuple[float, float]]:
+    if harvest.property is None:
+        return None
+    latitude, longitude = harvest.property.latitude, harvest.property.longitude
+    if latitude is None or longitude is None:
+        return None
+    return latitude, longitude
+
+
+@typechecked
+def get_nearest_equipment_points(harvest: Harvest, count: int) -> List[Organization]:
+    """The equipment points closest to the harvest's property among the ones
+    available for its dates, annotated with their `distance` in km"""
+    location = _get_harvest_location(harvest)
+    if location is None or harvest.start_date is None or harvest.end_date is None:
+        return []
+    if (
+        harvest.start_date >= harvest.end_date
+        or harvest.status not in Harvest.CAN_RESERVE_EQUIPMENT
+    ):
+        return []
+
+    available = get_available_equipment_points(harvest.start_date, harvest.end_date, harvest)
+    return nearest(available, *location, count)
+
+
+@typechecked
+def get_nearest_beneficiaries(harvest: Harvest, count: int) -> List[Organization]:
+    """The beneficiaries closest to the harvest's property,
+    annotated with their `distance` in km"""
+    location = _get_harvest_location(harvest)
+    if location is None:
+        return []
+
+    return nearest(Organization.objects.filter(is_beneficiary=True), *location, count)
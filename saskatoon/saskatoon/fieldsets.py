@@ -0,0 +1,116 @@
+from rest_framework import serializers
+from typing import Any, Dict, List, Optional
+
+from sitebase.utils import renderer_format_needs_json_response
+
+FIELDS_QUERY_PARAM = 'fields'
+EXPAND_QUERY_PARAM = 'expand'
+
+Fieldset = Dict[str, 'Fieldset']  # field name -> nested fields (all of them if empty)
+
+
+def parse_fieldset(value: str) -> Fieldset:
+    """Parses a comma separated list of field names, nested ones
+    being dotted (e.g. `id,property.title,property.owner`)"""
+    fieldset: Fieldset = {}
+    for name in value.split(','):
+        nested = fieldset
+        for part in name.strip().split('.'):
+            if part:
+                nested = nested.setdefault(part, {})
+    return fieldset
+
+
+def get_nested_serializer(field):
+    nested = getattr(field, 'child', field)
+    if isinstance(nested, serializers.BaseSerializer):
+        return nested
+    return None
+
+
+def collapse_field(field) -> Any:
+    """Replaces a nested serializer by the primary key(s) of the related object(s)"""
+    kwargs: Dict[str, Any] = {'read_only': True}
+    if field.source != field.field_name:
+        kwargs['source'] = field.source
+    if isinstance(field, serializers.ListSerializer):
+        kwargs['many'] = True
+    return serializers.PrimaryKeyRelatedField(**kwargs)
+
+
+def is_collapsed(field) -> bool:
+    """Whether the field only renders primary keys"""
+    return isinstance(getattr(field, 'child_relation', field), serializers.PrimaryKeyRelatedField)
+
+
+def restrict_fields(serializer: Any, fields: Optional[Fieldset], expand: Fieldset) -> None:
+    """Drops the fields of the serializer that are not in `fields` (unless None),
+    and collapses the nested serializers that are neither expanded nor given
+    nested fields to primary keys."""
+    if fields is not None:
+        for name in list(serializer.fields):
+            if name not in fields:
+                serializer.fields.pop(name)
+
+    for name, field in list(serializer.fields.items()):
+        nested = get_nested_serializer(field)
+        if nested is None:
+            continue
+
+        subfields = fields.get(name) if fields is not None else None
+        if name in expand or subfields:
+            restrict_fields(nested, subfields or None, expand.get(name, {}))
+        else:
+            serializer.fields[name] = collapse_field(field)
+
+
+class SparseFieldsSerializerMixin:
+    """Restricts the serialized fields to the ones listed in the `fields` query
+    parameter of JSON requests. Nested serializers are then only expanded when
+    listed in the `expand` query parameter or given nested fields, and are
+    otherwise rendered as primary keys. Dropped fields, method fields included,
+    are never evaluated.
+
+    The related objects to select or prefetch for each field are declared in
+    `select_related_fields` and `prefetch_related_fields`, so that the queryset
+    only fetches what the serialized fields need (see prepare_queryset).
+    """
+
+    select_related_fields: Dict[str, List[str]] = {}
+    prefetch_related_fields: Dict[str, List[Any]] = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or not renderer_format_needs_json_response(request):
+            return
+
+        params = request.query_params
+        if FIELDS_QUERY_PARAM not in params and EXPAND_QUERY_PARAM not in params:
+            return
+
+        fields = (
+            parse_fieldset(params[FIELDS_QUERY_PARAM]) if FIELDS_QUERY_PARAM in params else None
+        )
+        restrict_fields(self, fields, parse_fieldset(params.get(EXPAND_QUERY_PARAM, '')))
+
+    def prepare_queryset(self, queryset):
+        """Selects and prefetches the related objects of the serialized fields"""
+        for name, field in self.fields.items():
+            if name in self.select_related_fields and not is_collapsed(field):
+                queryset = queryset.select_related(*self.select_related_fields[name])
+            if name in self.prefetch_related_fields:
+                queryset = queryset.prefetch_related(*self.prefetch_related_fields[name])
+        return queryset
+
+
+class SparseFieldsViewsetMixin:
+    """Prepares the viewset's queryset for the fields of its serializer,
+    see SparseFieldsSerializerMixin"""
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        serializer = self.get_serializer()
+        if isinstance(serializer, SparseFieldsSerializerMixin):
+            return serializer.prepare_queryset(queryset)
+        return queryset
@@ -0,0 +1,260 @@
+import math
+from collections import Counter
+from django.db.models import Count, F, FloatField, Func, Max, Min, Q, QuerySet, Sum
+from django.db.models.expressions import Combinable
+from django.db.models.functions import (
+    ASin,
+    Cos,
+    Floor,
+    Greatest,
+    Least,
+    Ln,
+    Power,
+    Radians,
+    Sin,
+    Sqrt,
+    Tan,
+)
+from rest_framework import generics
+from rest_framework.response import Response
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from saskatoon.settings import MAP_CLUSTER_CELL_SIZE, MAP_CLUSTER_MAX_ZOOM
+from sitebase.utils import renderer_format_needs_json_response
+
+BBOX_QUERY_PARAM = 'bbox'
+ZOOM_QUERY_PARAM = 'zoom'
+
+TILE_SIZE = 256  # pixels of a web mercator tile
+MAX_LATITUDE = 85.05112878  # web mercator bounds
+EARTH_RADIUS = 6371.0  # km
+NEAREST_SEARCH_RADIUS = 2.0  # km, grown fourfold until enough objects are found
+
+
+class BoundingBox(NamedTuple):
+    west: float
+    south: float
+    east: float
+    north: float
+
+    def as_filter(self, prefix: str = '') -> Q:
+        """Lookups of the objects located inside the box, from their indexed
+        `latitude` and `longitude` fields (or the ones of the related object
+        `prefix` points to, e.g. `property__`)"""
+        latitude = Q(**{f'{prefix}latitude__range': (self.south, self.north)})
+        if self.west <= self.east:
+            return latitude & Q(**{f'{prefix}longitude__range': (self.west, self.east)})
+        # the box crosses the antimeridian
+        return latitude & (
+            Q(**{f'{prefix}longitude__gte': self.west})
+            | Q(**{f'{prefix}longitude__lte': self.east})
+        )
+
+    @classmethod
+    def around(cls, latitude: float, longitude: float, radius: float) -> 'BoundingBox':
+        """Smallest box holding the circle of `radius` km around the point"""
+        angle = radius / EARTH_RADIUS
+        south = max(-90.0, latitude - math.degrees(angle))
+        north = min(90.0, latitude + math.degrees(angle))
+        ratio = math.sin(angle) / max(math.cos(math.radians(latitude)), 1e-12)
+        if angle >= math.pi / 2 or ratio >= 1 or south == -90 or north == 90:
+            # the circle holds a pole
+            return cls(-180.0, south, 180.0, north)
+
+        delta = math.degrees(math.asin(ratio))
+        west = (longitude - delta + 540) % 360 - 180
+        east = (longitude + delta + 540) % 360 - 180
+        return cls(west, south, east, north)
+
+
+def parse_bbox(value: Optional[str]) -> Optional[BoundingBox]:
+    """Parses a `west,south,east,north` bounding box, as given by
+    Leaflet's LatLngBounds.toBBoxString()"""
+    if not value:
+        return None
+    try:
+        west, south, east, north = [float(v) for v in value.split(',')]
+    except ValueError:
+        return None
+    if any(math.isnan(v) for v in (west, south, east, north)) or south > north:
+        return None
+    return BoundingBox(west, south, east, north)
+
+
+def with_distance(
+    queryset: QuerySet[Any], latitude: float, longitude: float, prefix: str = ''
+) -> QuerySet[Any]:
+    """Annotates the (haversine) `distance` in km between the objects and the point"""
+    half_latitude = Radians(F(f'{prefix}latitude') - latitude) / 2
+    half_longitude = Radians(F(f'{prefix}longitude') - longitude) / 2
+    haversine = Power(Sin(half_latitude), 2) + math.cos(math.radians(latitude)) * Cos(
+        Radians(F(f'{prefix}latitude'))
+    ) * Power(Sin(half_longitude), 2)
+    # rounding errors must not take the arcsine out of its domain
+    arc = ASin(Least(Sqrt(haversine), 1.0), output_field=FloatField())
+    return queryset.annotate(distance=arc * (2 * EARTH_RADIUS))
+
+
+def filter_bbox(queryset: QuerySet[Any], bbox: BoundingBox, prefix: str = '') -> QuerySet[Any]:
+    return queryset.filter(bbox.as_filter(prefix))
+
+
+def filter_radius(
+    queryset: QuerySet[Any], latitude: float, longitude: float, radius: float, prefix: str = ''
+) -> QuerySet[Any]:
+    """Objects within `radius` km of the point, annotated with their `distance`.
+    The enclosing box is filtered first, so that the index on the coordinates
+    narrows the rows the distance is computed for."""
+    queryset = filter_bbox(queryset, BoundingBox.around(latitude, longitude, radius), prefix)
+    return with_distance(queryset, latitude, longitude, prefix).filter(distance__lte=radius)
+
+
+def nearest(
+    queryset: QuerySet[Any], latitude: float, longitude: float, count: int, prefix: str = ''
+) -> List[Any]:
+    """The `count` objects closest to the point, ordered by `distance`.
+    Searches growing circles around the point, each one an indexed range scan,
+    and only computes the distance of every located object when the widest
+    ones do not hold enough of them."""
+    radius = NEAREST_SEARCH_RADIUS
+    while radius < math.pi * EARTH_RADIUS / 4:
+        found = filter_radius(queryset, latitude, longitude, radius, prefix)
+        results = list(found.order_by('distance', 'pk')[:count])
+        if len(results) == count:
+            return results
+        radius *= 4
+
+    located = queryset.filter(
+        **{f'{prefix}latitude__isnull': False, f'{prefix}longitude__isnull': False}
+    )
+    found = with_distance(located, latitude, longitude, prefix)
+    return list(found.order_by('distance', 'pk')[:count])
+
+
+def parse_zoom(value: Optional[str]) -> Optional[int]:
+    try:
+        return max(0, int(value)) if value else None
+    except ValueError:
+        return None
+
+
+def get_cell(zoom: int, prefix: str = '') -> Tuple[Func, Func]:
+    """Expressions of the grid cell of the objects at the zoom level, cells being
+    squares of MAP_CLUSTER_CELL_SIZE pixels on the (web mercator) map"""
+    size = TILE_SIZE * 2**zoom / MAP_CLUSTER_CELL_SIZE
+    latitude = Radians(Greatest(Least(F(f'{prefix}latitude'), MAX_LATITUDE), -MAX_LATITUDE))
+    x = (F(f'{prefix}longitude') + 180.0) / 360.0
+    y = (1.0 - Ln(Tan(latitude) + 1.0 / Cos(latitude)) / math.pi) / 2.0
+    return Floor(x * size), Floor(y * size)
+
+
+def cluster_locations(
+    queryset: QuerySet[Any], zoom: int, prefix: str = '', status: Optional[Combinable] = None
+) -> Tuple[List[Dict[str, Any]], QuerySet[Any]]:
+    """Groups the located objects by grid cell, in the database.
+    Returns the aggregates of the cells holding several objects (the dominant
+    `status` among them, if given), and the objects alone in their cell."""
+    cell_x, cell_y = get_cell(zoom, prefix)
+    # numbers the cells row by row, so that the objects alone in theirs are
+    # filtered by one subquery on the same rows, rather than by their ids
+    columns = math.floor(TILE_SIZE * 2**zoom / MAP_CLUSTER_CELL_SIZE) + 1
+    located = queryset.annotate(cell=cell_y * columns + cell_x)
+    single_cells = located.order_by().values('cell').annotate(count=Count('pk')).filter(count=1)
+    singles = located.filter(cell__in=single_cells.values('cell'))
+
+    latitude = F(f'{prefix}latitude')
+    longitude = F(f'{prefix}longitude')
+    groups = ['cell_x', 'cell_y']
+    queryset = queryset.order_by().annotate(cell_x=cell_x, cell_y=cell_y)
+    if status is not None:
+        queryset = queryset.annotate(map_status=status)
+        groups.append('map_status')
+    rows = queryset.values(*groups).annotate(
+        count=Count('pk'),
+        latitude_sum=Sum(latitude),
+        longitude_sum=Sum(longitude),
+        south=Min(latitude),
+        north=Max(latitude),
+        west=Min(longitude),
+        east=Max(longitude),
+    )
+
+    # cells holding objects of several statuses span several rows
+    cells: Dict[Tuple[float, float], List[Dict[str, Any]]] = {}
+    for row in rows:
+        cells.setdefault((row['cell_x'], row['cell_y']), []).append(row)
+
+    clusters = []
+    for cell in cells.values():
+        count = sum(row['count'] for row in cell)
+        if count == 1:
+            continue
+
+        statuses: Counter[str] = Counter()
+        for row in cell:
+            if row.get('map_status') is not None:
+                statuses[row['map_status']] += row['count']
+        clusters.append(
+            {
+                'latitude': sum(row['latitude_sum'] for row in cell) / count,
+                'longitude': sum(row['longitude_sum'] for row in cell) / count,
+                'count': count,
+                'status': statuses.most_common(1)[0][0] if statuses else None,
+                'bbox': [
+                    min(row['west'] for row in cell),
+                    min(row['south'] for row in cell),
+                    max(row['east'] for row in cell),
+                    max(row['north'] for row in cell),
+                ],
+            }
+        )
+    return clusters, singles
+
+
+class MapViewMixin(generics.GenericAPIView[Any]):
+    """Bounding box and zoom aware map listing, for list views whose
+    serializer renders one marker per object.
+
+    Without `bbox` or `zoom` query parameters, or for the server-rendered
+    templates, every object is serialized. Otherwise only the objects inside
+    `bbox` (`west,south,east,north`) are listed, and below MAP_CLUSTER_MAX_ZOOM
+    the ones sharing a grid cell are aggregated by the database into clusters
+    (count and dominant status), which are not serialized: the response then
+    holds `clusters` and `markers`, as fetched by the `src` of <leaflet-map>.
+    """
+
+    # path to the object holding the coordinates, e.g. `property__`
+    map_location_prefix = ''
+
+    def get_map_status(self) -> Optional[Combinable]:
+        """Expression of the status of the objects, shown by their clusters"""
+        return None
+
+    def map_list(self, request) -> Response:
+        queryset = self.filter_queryset(self.get_queryset())
+        bbox = parse_bbox(request.query_params.get(BBOX_QUERY_PARAM))
+        zoom = parse_zoom(request.query_params.get(ZOOM_QUERY_PARAM))
+        # the server-rendered map templates list every marker
+        if (bbox is None and zoom is None) or not renderer_format_needs_json_response(request):
+            return Response(self.get_serializer(queryset, many=True).data)
+
+        prefix = self.map_location_prefix
+        if bbox is not None:
+            queryset = filter_bbox(queryset, bbox, prefix)
+        else:
+            queryset = queryset.filter(
+                **{f'{prefix}latitude__isnull': False, f'{prefix}longitude__isnull': False}
+            )
+
+        clusters: List[Dict[str, Any]] = []
+        markers = queryset
+        if zoom is not None and zoom < MAP_CLUSTER_MAX_ZOOM:
+            clusters, markers = cluster_locations(queryset, zoom, prefix, self.get_map_status())
+
+        return Response(
+            {
+                'zoom': zoom,
+                'clusters': clusters,
+                'markers': self.get_serializer(markers, many=True).data,
+            }
+        )
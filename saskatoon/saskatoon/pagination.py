@@ -1,14 +1,232 @@
+import base64
+import json
 from collections import OrderedDict
-from rest_framework.pagination import PageNumberPagination
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connection
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+from typing import Any, Optional
+
+from saskatoon.settings import COUNT_ESTIMATE_THRESHOLD
+from sitebase.cache import CountCache
+
+
+def estimate_count(model) -> Optional[int]:
+    """Number of rows of the model's table according to the database statistics,
+    None if the database does not keep any"""
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute("SELECT reltuples FROM pg_class WHERE relname = %s", [table])
+        elif connection.vendor == 'mysql':
+            cursor.execute(
+                "SELECT table_rows FROM information_schema.tables "
+                "WHERE table_schema = DATABASE() AND table_name = %s",
+                [table],
+            )
+        else:
+            return None
+        row = cursor.fetchone()
+
+    if row is None or row[0] is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+class CountedPaginator(Paginator[Any]):
+    """Paginator that takes its count from the pagination class"""
+
+    def __init__(self, object_list, per_page, count, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count = count
+
+
+class BasicCursorPagination(BasePagination):
+    """Keyset pagination on the queryset's first ordering field, with the
+    primary key as tiebreaker. Rows with a null key come last. Unlike page
+    numbers, fetching a page costs the same whatever its depth, and the
+    total count is only computed when the `count` query parameter is set."""
+
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self, page_size, get_count):
+        self.page_size = page_size
+        self.get_count = get_count
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.key, self.descending = self.get_key(queryset)
+        self.count = None
+        if request.query_params.get(self.count_query_param, '').lower() in ['1', 'yes', 'true']:
+            self.count = self.get_count(queryset, request)
+
+        position, reverse = self.decode_cursor(request)
+        queryset = queryset.order_by(*self.get_ordering(reverse))
+        if position is not None:
+            try:
+                queryset = queryset.filter(self.get_filter(*position, reverse=reverse))
+            except (TypeError, ValueError, ValidationError):
+                raise NotFound(self.invalid_cursor_message)
+
+        results = list(queryset[: self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[: self.page_size]
+        if reverse:
+            results.reverse()
+            self.has_next, self.has_previous = position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+
+        self.page = results
+        return results
+
+    def get_key(self, queryset):
+        """Returns the ordering field the cursor is keyed on and its direction"""
+        ordering = list(queryset.query.order_by) or list(queryset.model._meta.ordering) or ['-pk']
+        field = ordering[0]
+        descending = field.startswith('-')
+        field = field.lstrip('-')
+        if field == queryset.model._meta.pk.name:
+            field = 'pk'
+        return field, descending
+
+    def get_ordering(self, reverse=False):
+        descending = self.descending != reverse
+        # null keys sort last going forward, first going backward
+        nulls = {'nulls_first': True} if reverse else {'nulls_last': True}
+        ordering = [F(self.key).desc(**nulls) if descending else F(self.key).asc(**nulls)]
+        if self.key != 'pk':
+            ordering.append(F('pk').desc() if descending else F('pk').asc())
+        return ordering
+
+    def get_filter(self, value, pk, reverse=False):
+        """Rows after the (value, pk) position, or before it when reverse"""
+        lookup = 'lt' if self.descending != reverse else 'gt'
+        if self.key == 'pk':
+            return Q(**{f"pk__{lookup}": pk})
+
+        tiebreak = Q(**{f"pk__{lookup}": pk})
+        if value is None:
+            nulls = Q(**{f"{self.key}__isnull": True}) & tiebreak
+            return Q(**{f"{self.key}__isnull": False}) | nulls if reverse else nulls
+
+        after = Q(**{f"{self.key}__{lookup}": value}) | (Q(**{self.key: value}) & tiebreak)
+        return after if reverse else after | Q(**{f"{self.key}__isnull": True})
+
+    def get_position(self, instance):
+        value = None if self.key == 'pk' else getattr(instance, self.key)
+        if hasattr(value, 'isoformat'):
+            value = value.isoformat()
+        return value, instance.pk
+
+    def decode_cursor(self, request):
+        """Returns the ((value, pk), reverse) encoded in the cursor query parameter"""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            value, pk, reverse = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+        except (TypeError, ValueError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        return (value, pk), bool(reverse)
+
+    def encode_cursor(self, instance, reverse):
+        cursor = json.dumps([*self.get_position(instance), reverse])
+        return replace_query_param(
+            self.base_url,
+            self.cursor_query_param,
+            base64.urlsafe_b64encode(cursor.encode('ascii')).decode('ascii'),
+        )
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return replace_query_param(self.base_url, self.cursor_query_param, '')
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response(
+            OrderedDict(
+                [
+                    ('count', self.count),
+                    ('next', self.get_next_link()),
+                    ('previous', self.get_previous_link()),
+                    ('pages_count', None),
+                    ('current_page_number', None),
+                    ('items_per_page', self.page_size),
+                    ('results', data),
+                ]
+            )
+        )
 
 
 class BasicPageNumberPagination(PageNumberPagination):
     page_size = 10
     page_size_query_param = 'page_size'
     max_page_size = 200
+    cursor_query_param = BasicCursorPagination.cursor_query_param
+
+    cursor_pagination = None
+
+    def django_paginator_class(self, queryset, page_size):
+        return CountedPaginator(queryset, page_size, self.get_count(queryset, self.request))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        # the cursor mode is opt-in, with ?cursor= for the first page
+        if self.cursor_query_param not in request.query_params:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.cursor_pagination = BasicCursorPagination(self.get_page_size(request), self.get_count)
+        return self.cursor_pagination.paginate_queryset(queryset, request, view)
+
+    def get_count(self, queryset, request) -> int:
+        """Counts the rows of the list, estimated if it is unfiltered and large enough,
+        or cached per endpoint, filter parameters and user roles"""
+        if COUNT_ESTIMATE_THRESHOLD is not None and not queryset.query.where:
+            estimate = estimate_count(queryset.model)
+            if estimate is not None and estimate >= COUNT_ESTIMATE_THRESHOLD:
+                return estimate
+
+        ignored = [
+            self.page_query_param,
+            self.page_size_query_param,
+            self.cursor_query_param,
+            BasicCursorPagination.count_query_param,
+            'format',
+        ]
+        params = [
+            (name, value)
+            for name, values in request.query_params.lists()
+            for value in values
+            if name not in ignored
+        ]
+        roles = request.user.groups.values_list('name', flat=True)
+        key = CountCache.get_key(queryset.model, request.path, params, roles)
+
+        count = CountCache.get(key)
+        if count is None:
+            count = queryset.count()
+            CountCache.set(key, count)
+        return count
 
     def get_paginated_response(self, data):
+        if self.cursor_pagination is not None:
+            return self.cursor_pagination.get_paginated_response(data)
+
         return Response(
             OrderedDict(
                 [
@@ -224,6 +224,17 @@ DEFAULT_REPLY_TO_EMAIL = os.getenv('SASKATOON_EMAIL_REPLY_TO')
 if not EMAIL_BACKEND:
     del EMAIL_BACKEND
 
+# Outbox mode: emails are queued and delivered by the `run_email_worker` command
+EMAIL_OUTBOX = os.getenv('SASKATOON_EMAIL_OUTBOX', '').lower() in ['yes', 'true']
+# Delivery attempts of a queued email, and delay in seconds before the first retry,
+# doubled on each of the following ones
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv('SASKATOON_EMAIL_OUTBOX_MAX_ATTEMPTS') or 5)
+EMAIL_OUTBOX_RETRY_DELAY = int(os.getenv('SASKATOON_EMAIL_OUTBOX_RETRY_DELAY') or 60)
+# Emails sent over a single SMTP connection by the bulk actions and the email worker
+EMAIL_BULK_CHUNK_SIZE = int(os.getenv('SASKATOON_EMAIL_BULK_CHUNK_SIZE') or 100)
+# Minutes between the notification digests of a pick leader, see send_notification_digests
+EMAIL_DIGEST_INTERVAL = int(os.getenv('SASKATOON_EMAIL_DIGEST_INTERVAL') or 60)
+
 AUTH_USER_MODEL = "member.AuthUser"
 
 
@@ -312,6 +323,46 @@ EMAIL_LIST_OUTPUT = os.path.join(BASE_DIR, 'logs/emaillist.csv')
 # Equipment Point reservation buffer in hours
 DEFAULT_RESERVATION_BUFFER = 1
 
+# Cache: local memory by default, private to each process. Deployments running several
+# web server processes (gunicorn workers) need a shared backend, e.g. file based, or the
+# calendar and list counts invalidated by one process stay stale in the others.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('SASKATOON_CACHE_BACKEND')
+        or 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': os.getenv('SASKATOON_CACHE_LOCATION', ''),
+    }
+}
+
+# Calendar events cache timeout in seconds (0 disables the cache)
+CALENDAR_CACHE_TIMEOUT = int(os.getenv('SASKATOON_CALENDAR_CACHE_TIMEOUT') or 300)
+
+# Paginated list counts cache timeout in seconds (0 disables the cache)
+COUNT_CACHE_TIMEOUT = int(os.getenv('SASKATOON_COUNT_CACHE_TIMEOUT') or 60)
+
+# Beneficiary organizations directory cache timeout in seconds (0 disables the cache)
+BENEFICIARY_CACHE_TIMEOUT = int(os.getenv('SASKATOON_BENEFICIARY_CACHE_TIMEOUT') or 3600)
+
+# Email templates registry version timeout in seconds: bounds how long a process keeps
+# stale email contents when the cache backend is not shared (0 disables the registry)
+EMAIL_TEMPLATE_CACHE_TIMEOUT = int(os.getenv('SASKATOON_EMAIL_TEMPLATE_CACHE_TIMEOUT') or 300)
+
+# Unfiltered lists of at least that many rows, according to the database statistics,
+# show the estimated count instead of counting (always counted if unset)
+COUNT_ESTIMATE_THRESHOLD = (
+    int(os.environ['SASKATOON_COUNT_ESTIMATE_THRESHOLD'])
+    if os.getenv('SASKATOON_COUNT_ESTIMATE_THRESHOLD')
+    else None
+)
+
+# Look-back of the orphan and adopted harvests listed on the calendar whatever the window,
+# in days (current season if unset)
+CALENDAR_LOOKBACK_DAYS = (
+    int(os.environ['SASKATOON_CALENDAR_LOOKBACK_DAYS'])
+    if os.getenv('SASKATOON_CALENDAR_LOOKBACK_DAYS')
+    else None
+)
+
 # Map
 DEFAULT_LEAFLET_TILE = (
     'OSM',
@@ -322,3 +373,7 @@ DEFAULT_LEAFLET_TILE = (
     },
 )
 SASKATOON_USER_AGENT = 'Les Fruits Défendus'
+
+# Map endpoints cluster their markers below that zoom level, in grid cells of that many pixels
+MAP_CLUSTER_MAX_ZOOM = int(os.getenv('SASKATOON_MAP_CLUSTER_MAX_ZOOM') or 15)
+MAP_CLUSTER_CELL_SIZE = int(os.getenv('SASKATOON_MAP_CLUSTER_CELL_SIZE') or 60)
@@ -7,7 +7,15 @@ from typeguard import typechecked
 from typing import Union
 
 from sitebase.admin_filters import EmailIsDuplicateAdminFilter
-from sitebase.models import Email, EmailContent, EmailType, FAQList, FAQItem, PageContent
+from sitebase.models import (
+    Email,
+    EmailContent,
+    EmailType,
+    FAQList,
+    FAQItem,
+    Notification,
+    PageContent,
+)
 from sitebase.serializers import EmailCommentSerializer, EmailRFPSerializer
 from sitebase.tests import get_test_harvest
 from sitebase.utils import maybe
@@ -120,6 +128,11 @@ class EmailContentAdmin(admin.ModelAdmin[EmailContent]):
         test_data = {'password': 'abcdef123456'}
         test_data.update(EmailCommentSerializer(Comment.objects.last()).data)
         test_data.update(EmailRFPSerializer(RequestForParticipation.objects.last()).data)
+        test_notifications = [
+            Notification(recipient=recipient, type=type, harvest=test_harvest, data=test_data)
+            for type in [EmailType.NEW_HARVEST_RFP, EmailType.NEW_HARVEST_COMMENT]
+        ]
+        test_data.update(Notification.get_digest(recipient, test_notifications).data)
 
         for email_content in queryset.exclude(type=EmailType.GENERIC_CLOSING):
             m = Email.objects.create(
@@ -160,6 +173,8 @@ class EmailAdmin(admin.ModelAdmin[Email]):
         'type',
         'hid',
         'id',
+        'attempts',
+        'next_attempt',
     )
 
     readonly_fields = list_display
@@ -185,3 +200,16 @@ class EmailAdmin(admin.ModelAdmin[Email]):
                 )
 
     actions = [resend_emails]
+
+
+@admin.register(Notification)
+class NotificationAdmin(admin.ModelAdmin[Notification]):
+    model = Notification
+    list_display = (
+        '__str__',
+        'recipient',
+        'type',
+        'date_created',
+        'id',
+    )
+    list_filter = ('type',)
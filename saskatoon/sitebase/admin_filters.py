@@ -6,7 +6,7 @@ from sitebase.models import Email
 
 
 class EmailIsDuplicateAdminFilter(SimpleListFilter):
-    """Checks if Email object is identical to previous one"""
+    """Checks if Email object is identical to previous one (see Email.get_duplicates)"""
 
     title = 'Duplicate Filter'
     parameter_name = 'dup'
@@ -20,7 +20,7 @@ class EmailIsDuplicateAdminFilter(SimpleListFilter):
 
     def queryset(self, request, queryset):
         if self.value():
-            duplicates = [e.id for e in queryset if e.is_duplicate]
+            duplicates = Email.get_duplicates().values('id')
             if self.value() == 'yes':
                 return queryset.filter(id__in=duplicates)
             if self.value() == 'no':
@@ -0,0 +1,218 @@
+import hashlib
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.core.cache import cache
+from django.db import models, transaction
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Type
+
+from harvest.models import Harvest
+from member.models import Organization
+from saskatoon.settings import (
+    BENEFICIARY_CACHE_TIMEOUT,
+    CALENDAR_CACHE_TIMEOUT,
+    COUNT_CACHE_TIMEOUT,
+)
+from sitebase.utils import parse_window_date
+
+
+EPSILON = timedelta(microseconds=1)
+
+
+class CalendarCache:
+    """Server-side cache of the JsonCalendar responses.
+
+    Responses only depend on the date window and on the audience of the request.
+    Each key carries the generations of the months spanned by the window, and of
+    the unscheduled harvests listed to logged-in users: a change on a harvest
+    renews the generations of its months, so only the windows overlapping its
+    dates are looked up again. The generations must be shared by the web server
+    processes: with several of them, use a file based (or memcached, redis)
+    cache backend, since the default local memory one is private to each process
+    and would serve stale windows until CALENDAR_CACHE_TIMEOUT.
+    """
+
+    ANONYMOUS = 'anonymous'
+    MEMBER = 'member'
+    PICKLEADER = 'pickleader'
+
+    GENERATION_KEY = 'calendar:generation'
+    UNSCHEDULED_KEY = 'calendar:generation:unscheduled'
+    HITS_KEY = 'calendar:hits'
+    MISSES_KEY = 'calendar:misses'
+
+    # windows spanning more months are not cached
+    MAX_WINDOW_MONTHS = 24
+
+    # harvests listed to logged-in users whatever the window
+    UNSCHEDULED = [Harvest.Status.ORPHAN, Harvest.Status.ADOPTED]
+
+    @classmethod
+    def get_month_keys(cls, start: datetime, end: datetime) -> Optional[List[str]]:
+        """Returns the generation keys of the (UTC) months from start to end, or
+        None if they are more than MAX_WINDOW_MONTHS"""
+        start = start.astimezone(dt_timezone.utc)
+        end = end.astimezone(dt_timezone.utc)
+        if (end.year - start.year) * 12 + end.month - start.month >= cls.MAX_WINDOW_MONTHS:
+            return None
+
+        year, month = start.year, start.month
+        keys = []
+        while (year, month) <= (end.year, end.month):
+            keys.append(f"calendar:generation:{year}-{month:02}")
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        return keys
+
+    @classmethod
+    def get_key(cls, audience: str, start: str, end: str) -> Optional[str]:
+        """Returns the key of a window at the current generations, or None if
+        the window cannot be cached"""
+        window_start = parse_window_date(start)
+        window_end = parse_window_date(end)
+        if window_start is None or window_end is None or window_start > window_end:
+            return None
+
+        # the window end is exclusive
+        keys = cls.get_month_keys(window_start, window_end - EPSILON)
+        if keys is None:
+            return None
+        keys.append(cls.GENERATION_KEY)
+        if audience != cls.ANONYMOUS:
+            keys.append(cls.UNSCHEDULED_KEY)
+
+        generations = cache.get_many(keys)
+        for key in keys:
+            if key not in generations:
+                generations[key] = cache.get_or_set(key, lambda: uuid.uuid4().hex, None)
+
+        digest = hashlib.md5(
+            repr([generations[key] for key in keys]).encode('utf-8'), usedforsecurity=False
+        ).hexdigest()
+        return f"calendar:{audience}:{start}:{end}:{digest}"
+
+    @classmethod
+    def count(cls, key: str) -> None:
+        try:
+            cache.incr(key)
+        except ValueError:  # first count, or evicted
+            if not cache.add(key, 1, None):
+                cache.incr(key)
+
+    @classmethod
+    def get_counters(cls) -> Dict[str, int]:
+        """Returns the number of cache hits and misses"""
+        counters = cache.get_many([cls.HITS_KEY, cls.MISSES_KEY])
+        return {
+            'hits': counters.get(cls.HITS_KEY, 0),
+            'misses': counters.get(cls.MISSES_KEY, 0),
+        }
+
+    @classmethod
+    def get(cls, key: Optional[str]) -> Optional[bytes]:
+        content = cache.get(key) if key is not None else None
+        cls.count(cls.MISSES_KEY if content is None else cls.HITS_KEY)
+        return content
+
+    @classmethod
+    def set(cls, key: Optional[str], content: bytes, timeout: Optional[int] = None) -> None:
+        """Caches the response of a window, under the key returned by get_key
+        before its events were listed"""
+        if key is None:
+            return
+
+        if timeout is None or timeout > CALENDAR_CACHE_TIMEOUT:
+            timeout = CALENDAR_CACHE_TIMEOUT
+        if timeout > 0:
+            cache.set(key, content, timeout)
+
+    @classmethod
+    def invalidate(cls, *harvests: Optional[Harvest]) -> None:
+        """Renews the generations of the windows that may list any of the harvests
+        as they are now, once the current transaction is committed: a window
+        listed in between would otherwise be cached under the new generations
+        with the former events."""
+        keys = set()
+        for harvest in harvests:
+            if harvest is None or harvest.start_date is None or harvest.end_date is None:
+                continue
+            # a harvest starting on the exclusive end of a window is listed in it
+            months = cls.get_month_keys(harvest.start_date - EPSILON, harvest.end_date)
+            # renews every window if the harvest spans too many months
+            keys.update(months if months is not None else [cls.GENERATION_KEY])
+            if harvest.status in cls.UNSCHEDULED:
+                keys.add(cls.UNSCHEDULED_KEY)
+
+        if keys:
+            transaction.on_commit(lambda: cache.delete_many(list(keys)))
+
+    @classmethod
+    def clear(cls) -> None:
+        cache.delete_many([cls.GENERATION_KEY, cls.HITS_KEY, cls.MISSES_KEY])
+
+
+class CountCache:
+    """Short-lived cache of the row counts of the paginated list endpoints.
+
+    Counts are keyed on the endpoint, the filter parameters and the roles of the
+    user. Each key also carries a version of the listed model, which is renewed
+    on every write to that model, so stale counts are never looked up again.
+    """
+
+    @staticmethod
+    def get_version_key(model: Type[models.Model]) -> str:
+        return f"count:{model._meta.label_lower}:version"
+
+    @classmethod
+    def get_version(cls, model: Type[models.Model]) -> str:
+        return str(cache.get_or_set(cls.get_version_key(model), lambda: uuid.uuid4().hex, None))
+
+    @classmethod
+    def get_key(
+        cls,
+        model: Type[models.Model],
+        path: str,
+        params: Iterable[Tuple[str, str]],
+        roles: Iterable[str],
+    ) -> str:
+        digest = hashlib.md5(
+            repr((path, sorted(params), sorted(roles))).encode('utf-8'), usedforsecurity=False
+        ).hexdigest()
+        return f"count:{model._meta.label_lower}:{cls.get_version(model)}:{digest}"
+
+    @classmethod
+    def get(cls, key: str) -> Optional[int]:
+        return cache.get(key)
+
+    @classmethod
+    def set(cls, key: str, count: int) -> None:
+        if COUNT_CACHE_TIMEOUT > 0:
+            cache.set(key, count, COUNT_CACHE_TIMEOUT)
+
+    @classmethod
+    def invalidate(cls, model: Type[models.Model]) -> None:
+        cache.delete(cls.get_version_key(model))
+
+
+class BeneficiaryCache:
+    """Cache of the beneficiary organizations a harvest yield may be given to,
+    as (actor_id, civil_name) entries.
+
+    The directory is shared by every harvest and request, and dropped on any
+    write to an organization. The timeout bounds how long the other processes
+    keep a stale directory when the cache backend is not shared between them.
+    """
+
+    KEY = 'beneficiaries'
+
+    @classmethod
+    def get(cls) -> List[Dict[str, Any]]:
+        directory = cache.get(cls.KEY)
+        if directory is None:
+            beneficiaries = Organization.objects.filter(is_beneficiary=True)
+            directory = list(beneficiaries.values('actor_id', 'civil_name'))
+            if BENEFICIARY_CACHE_TIMEOUT > 0:
+                cache.set(cls.KEY, directory, BENEFICIARY_CACHE_TIMEOUT)
+        return directory
+
+    @classmethod
+    def invalidate(cls) -> None:
+        cache.delete(cls.KEY)
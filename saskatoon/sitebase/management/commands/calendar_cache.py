@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from sitebase.cache import CalendarCache
+
+
+class Command(BaseCommand):
+    help = "Show the hit/miss counters of the calendar events cache"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--clear',
+            action='store_true',
+            help="Drop the cached calendar windows and reset the counters",
+        )
+
+    def handle(self, *args, **options):
+        counters = CalendarCache.get_counters()
+        total = counters['hits'] + counters['misses']
+        ratio = counters['hits'] / total if total else 0
+        self.stdout.write(
+            f"hits: {counters['hits']}, misses: {counters['misses']} ({ratio:.0%} hit ratio)"
+        )
+
+        if options['clear']:
+            CalendarCache.clear()
+            self.stdout.write(self.style.SUCCESS("Calendar cache cleared."))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from sitebase.models import Email
+
+
+class Command(BaseCommand):
+    help = "Mark the duplicate emails (see Email.get_duplicates), and optionally delete them"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--since',
+            type=int,
+            default=None,
+            help="Only look for duplicates among the emails from this id on",
+        )
+        parser.add_argument(
+            '--delete',
+            action='store_true',
+            help="Delete the duplicates instead of marking them",
+        )
+
+    def handle(self, *args, **options):
+        if options['delete']:
+            duplicates = Email.get_duplicates(options['since']).values('id')
+            count, _deleted = Email.objects.filter(id__in=duplicates).delete()
+            self.stdout.write(self.style.SUCCESS(f"Deleted {count} duplicate emails."))
+        else:
+            count = Email.mark_duplicates(options['since'])
+            self.stdout.write(self.style.SUCCESS(f"Marked {count} duplicate emails."))
@@ -0,0 +1,51 @@
+import time
+from django.core.management.base import BaseCommand
+
+from sitebase.models import Email
+
+
+class Command(BaseCommand):
+    help = "Deliver the emails queued in outbox mode (see SASKATOON_EMAIL_OUTBOX)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=4,
+            help="Number of SMTP connections delivering emails at the same time",
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help="Number of queued emails claimed at once",
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5,
+            help="Seconds to wait before looking for new emails when the queue is empty",
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help="Exit once no email is due for delivery, instead of waiting for new ones",
+        )
+
+    def handle(self, *args, **options):
+        sent = failed = 0
+        try:
+            while True:
+                results = Email.deliver_pending(options['batch_size'], options['concurrency'])
+                sent += results.count(True)
+                failed += results.count(False)
+                if results:
+                    self.stdout.write(f"Delivered {sent} emails, {failed} failed attempts")
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(f"Sent {sent} emails, {failed} failed attempts."))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from saskatoon.settings import EMAIL_DIGEST_INTERVAL
+from sitebase.models import Notification
+
+
+class Command(BaseCommand):
+    help = "Send the digests of the pending harvest notifications, meant to be scheduled"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=EMAIL_DIGEST_INTERVAL,
+            help="Minutes a notification waits before being sent in a digest",
+        )
+
+    def handle(self, *args, **options):
+        results = Notification.send_digests(options['interval'])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Sent {results.count(True)} digests, {results.count(False)} failed."
+            )
+        )
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-17 18:18
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sitebase', '0008_alter_pagecontent_type'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='email',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='Delivery attempts'),
+        ),
+        migrations.AddField(
+            model_name='email',
+            name='data',
+            field=models.JSONField(blank=True, default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder),
+        ),
+        migrations.AddField(
+            model_name='email',
+            name='next_attempt',
+            field=models.DateTimeField(blank=True, db_index=True, null=True, verbose_name='Next delivery attempt'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.30 on 2026-10-17 18:32
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sitebase', '0009_email_outbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='email',
+            name='duplicate_of',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='duplicates', to='sitebase.email', verbose_name='Duplicate of'),
+        ),
+    ]
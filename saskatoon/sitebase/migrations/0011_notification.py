@@ -0,0 +1,43 @@
+# Generated by Django 4.2.30 on 2026-10-17 18:38
+
+import django.core.serializers.json
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('member', '0023_person_notifications'),
+        ('harvest', '0028_equipment_reservations'),
+        ('sitebase', '0010_email_duplicate_of'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='email',
+            name='type',
+            field=models.CharField(choices=[('closing', 'Closing (common)'), ('registration', 'Pickleader Registration Invite'), ('password_reset', 'Password Reset'), ('new_rfp', 'New Request For Participation'), ('new_comment', 'New Harvest Comment'), ('digest', 'Notification Digest'), ('property_registered', 'Property was registered'), ('season_authorization', 'Seasonal property authorization'), ('unselected_pickers', 'Unselected pickers'), ('selected_picker', 'Selected picker'), ('rejected_picker', 'Rejected picker')], max_length=20, verbose_name='Email type'),
+        ),
+        migrations.AlterField(
+            model_name='emailcontent',
+            name='type',
+            field=models.CharField(blank=True, choices=[('closing', 'Closing (common)'), ('registration', 'Pickleader Registration Invite'), ('password_reset', 'Password Reset'), ('new_rfp', 'New Request For Participation'), ('new_comment', 'New Harvest Comment'), ('digest', 'Notification Digest'), ('property_registered', 'Property was registered'), ('season_authorization', 'Seasonal property authorization'), ('unselected_pickers', 'Unselected pickers'), ('selected_picker', 'Selected picker'), ('rejected_picker', 'Rejected picker')], default=None, max_length=20, null=True, unique=True, verbose_name='Email type'),
+        ),
+        migrations.CreateModel(
+            name='Notification',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type', models.CharField(choices=[('closing', 'Closing (common)'), ('registration', 'Pickleader Registration Invite'), ('password_reset', 'Password Reset'), ('new_rfp', 'New Request For Participation'), ('new_comment', 'New Harvest Comment'), ('digest', 'Notification Digest'), ('property_registered', 'Property was registered'), ('season_authorization', 'Seasonal property authorization'), ('unselected_pickers', 'Unselected pickers'), ('selected_picker', 'Selected picker'), ('rejected_picker', 'Rejected picker')], max_length=20, verbose_name='Email type')),
+                ('data', models.JSONField(blank=True, default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('date_created', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Date')),
+                ('harvest', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='harvest.harvest', verbose_name='Harvest')),
+                ('recipient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pending_notifications', to='member.person', verbose_name='Recipient')),
+            ],
+            options={
+                'verbose_name': 'Notification',
+                'verbose_name_plural': 'Notifications',
+                'ordering': ['id'],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-17 18:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sitebase', '0011_notification'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='claimed_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -1,20 +1,36 @@
-from django.core.mail import EmailMessage
-from django.db import models
+import math
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import timedelta
+from django.core.cache import cache
+from django.core.mail import EmailMessage, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, models, transaction
+from django.db.models import F, Max, Min, Q, QuerySet, Window
+from django.db.models.functions import Coalesce, Lag
 from django.dispatch import receiver
 from django_quill.fields import QuillField
 from django.utils import timezone as tz
 from django.utils.translation import gettext_lazy as _
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
 from logging import getLogger
 from sortedm2m.fields import SortedManyToManyField
-from typing import Dict, Any
+from threading import Thread
+from typing import Dict, Any, Iterator, List, NamedTuple, Optional, Sequence
 
-from member.models import Person
+from member.models import AuthUser, Organization, Person
 from harvest.models import (
     Comment,
+    Equipment,
+    Harvest,
+    HarvestYield,
     Property,
     RequestForParticipation as RFP,
 )
+from sitebase.cache import BeneficiaryCache, CalendarCache, CountCache
 from sitebase.serializers import (
     EmailCommentSerializer,
     EmailHarvestSerializer,
@@ -24,7 +40,13 @@ from sitebase.serializers import (
     EmailRecipientSerializer,
 )
 from saskatoon.settings import (
+    EMAIL_BULK_CHUNK_SIZE,
+    EMAIL_DIGEST_INTERVAL,
     EMAIL_HOST,
+    EMAIL_OUTBOX,
+    EMAIL_OUTBOX_MAX_ATTEMPTS,
+    EMAIL_OUTBOX_RETRY_DELAY,
+    EMAIL_TEMPLATE_CACHE_TIMEOUT,
     DEFAULT_FROM_EMAIL,
     DEFAULT_REPLY_TO_EMAIL,
 )
@@ -200,6 +222,7 @@ class EmailType(models.TextChoices):
     PASSWORD_RESET = 'password_reset', _("Password Reset")
     NEW_HARVEST_RFP = 'new_rfp', _("New Request For Participation")
     NEW_HARVEST_COMMENT = 'new_comment', _("New Harvest Comment")
+    NOTIFICATION_DIGEST = 'digest', _("Notification Digest")
 
     # Owner
     PROPERTY_REGISTERED = 'property_registered', _("Property was registered")
@@ -277,6 +300,72 @@ class EmailContent(models.Model):
         return obj
 
 
+class EmailTemplate(NamedTuple):
+    subject: str
+    body: str
+    message: str
+
+
+class EmailTemplates:
+    """In-process registry of the email contents, with the subject, the body and the
+    message (body and generic closing) of each type pre-rendered per language.
+
+    All contents are loaded at once on first use, and reloaded after an
+    EmailContent is saved or deleted. The registry version is kept in the cache
+    backend, so that other processes sharing it reload theirs as well. It expires
+    after EMAIL_TEMPLATE_CACHE_TIMEOUT, which bounds how long the other processes
+    (web workers, email worker) keep stale contents when the backend is not shared.
+    """
+
+    VERSION_KEY = 'email_templates:version'
+    LANGUAGES = ['en', 'fr']
+
+    _version: Optional[str] = None
+    _templates: Dict[str, Dict[str, EmailTemplate]] = {}
+
+    @staticmethod
+    def render(content: EmailContent, closing: str, lang: str) -> EmailTemplate:
+        return EmailTemplate(
+            subject=content.subject(lang),
+            body=content.body(lang),
+            message="{}\n\n\n{}".format(content.body(lang), closing),
+        )
+
+    @classmethod
+    def load(cls) -> Dict[str, Dict[str, EmailTemplate]]:
+        contents = dict((c.type, c) for c in EmailContent.objects.exclude(type=None))
+        if EmailType.GENERIC_CLOSING not in contents:
+            contents[EmailType.GENERIC_CLOSING] = EmailContent.get(EmailType.GENERIC_CLOSING)
+        closing = contents[EmailType.GENERIC_CLOSING]
+
+        templates: Dict[str, Dict[str, EmailTemplate]] = {}
+        for type, content in contents.items():
+            templates[str(type)] = dict(
+                (lang, cls.render(content, closing.body(lang), lang)) for lang in cls.LANGUAGES
+            )
+        return templates
+
+    @classmethod
+    def get(cls, type: str, lang: str) -> EmailTemplate:
+        version = str(
+            cache.get_or_set(
+                cls.VERSION_KEY, lambda: uuid.uuid4().hex, EMAIL_TEMPLATE_CACHE_TIMEOUT
+            )
+        )
+        if version != cls._version:
+            cls._templates, cls._version = cls.load(), version
+
+        if type not in cls._templates:
+            # contents are created empty on first use, see EmailContent.get
+            EmailContent.get(type)
+            cls._templates = cls.load()
+        return cls._templates[type][lang]
+
+    @classmethod
+    def invalidate(cls) -> None:
+        cache.delete(cls.VERSION_KEY)
+
+
 class Email(models.Model):
     """Email model"""
 
@@ -321,6 +410,38 @@ class Email(models.Model):
         null=True,
     )
 
+    # outbox: data the queued email is rendered with, and its delivery schedule
+    data = models.JSONField(
+        encoder=DjangoJSONEncoder,
+        blank=True,
+        default=dict,
+    )
+
+    attempts = models.PositiveSmallIntegerField(
+        verbose_name=_("Delivery attempts"),
+        default=0,
+    )
+
+    next_attempt = models.DateTimeField(
+        verbose_name=_("Next delivery attempt"),
+        blank=True,
+        null=True,
+        db_index=True,
+    )
+
+    # previous email (by id) this one repeats, see mark_duplicates
+    duplicate_of = models.ForeignKey(
+        'self',
+        related_name='duplicates',
+        verbose_name=_("Duplicate of"),
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+    )
+
+    # time a worker has to deliver a claimed email before another one may claim it
+    CLAIM_TIMEOUT = timedelta(minutes=10)
+
     def __str__(self):
         return "<{type}> {mailto}".format(type=self.type, mailto=self.recipient.email)
 
@@ -359,21 +480,58 @@ class Email(models.Model):
         return [self.harvest.pick_leader.email]
 
     @property
-    def is_duplicate(self):
-        try:
-            prev = Email.objects.get(id=self.id - 1)
-            return (
-                prev.recipient == self.recipient
-                and prev.type == prev.type
-                and prev.harvest == self.harvest
-                and prev.body == self.body
-                and (self.date_sent - prev.date_sent).total_seconds() < 1
-            )
-        except Email.DoesNotExist:
-            return False
+    def is_duplicate(self) -> bool:
+        return Email.get_duplicates(self.id, self.id).exists()
+
+    @staticmethod
+    def get_duplicates(
+        first: Optional[int] = None, last: Optional[int] = None
+    ) -> 'QuerySet[Email]':
+        """Emails identical to the one right before them by id (same recipient,
+        type, harvest and body) and sent less than a second after it, annotated
+        with the id of that one as `previous`. Computed in a single window query,
+        over the emails from id `first` to id `last` if given."""
+        emails = Email.objects.all()
+        if first is not None:
+            start = Email.objects.filter(id__lt=first).aggregate(start=Max('id'))['start']
+            emails = emails.filter(id__gte=first if start is None else start)
+        if last is not None:
+            emails = emails.filter(id__lte=last)
+
+        def previous(expression) -> Window:
+            return Window(Lag(expression), order_by=F('id').asc())
+
+        # emails without harvest are compared on harvest 0
+        harvest = Coalesce('harvest_id', 0)
+        return emails.annotate(
+            harvest_key=harvest,
+            previous=previous('id'),
+            previous_recipient=previous('recipient_id'),
+            previous_type=previous('type'),
+            previous_harvest=previous(harvest),
+            previous_body=previous('body'),
+            previous_date_sent=previous('date_sent'),
+        ).filter(
+            recipient_id=F('previous_recipient'),
+            type=F('previous_type'),
+            harvest_key=F('previous_harvest'),
+            body=F('previous_body'),
+            date_sent__lt=F('previous_date_sent') + timedelta(seconds=1),
+        )
+
+    @staticmethod
+    def mark_duplicates(first: Optional[int] = None, last: Optional[int] = None) -> int:
+        """Sets duplicate_of on the duplicates among the emails from id `first` to
+        id `last`. Returns the number of duplicates."""
+        duplicates = [
+            Email(id=id, duplicate_of_id=previous)
+            for id, previous in Email.get_duplicates(first, last).values_list('id', F('previous'))
+        ]
+        Email.objects.bulk_update(duplicates, ['duplicate_of'], EMAIL_BULK_CHUNK_SIZE)
+        return len(duplicates)
 
     def get_subject(self, data: Dict[str, str]) -> str:
-        subject = self.content.subject(self.recipient.language)
+        subject = EmailTemplates.get(self.type, self.recipient.language).subject
         return subject.format(**data)
 
     def get_intro(self, lang):
@@ -389,35 +547,142 @@ class Email(models.Model):
             msg = "* * Version française plus bas * *\n\n{en}\n\n{sep}\n\n{fr}"
 
         msg = msg.format(
-            fr=self.get_intro('fr') + self.content.message('fr'),
-            en=self.get_intro('en') + self.content.message('en'),
+            fr=self.get_intro('fr') + EmailTemplates.get(self.type, 'fr').message,
+            en=self.get_intro('en') + EmailTemplates.get(self.type, 'en').message,
             sep="___________________________________",
         )
 
         return msg.format(**data)
 
-    def record_sent(self, success: bool, body: str, log: str) -> bool:
+    def record_sent(self, success: bool, body: str, log: str, commit: bool = True) -> bool:
         self.date_sent = tz.now()
         self.sent = success
         self.body = body
         self.log += log
-        self.save()
+        if commit:
+            self.save()
+            Email.mark_duplicates(self.id, self.id)
         return success
 
-    def record_success(self, body: str) -> bool:
+    def record_success(self, body: str, commit: bool = True) -> bool:
         log = f"Successfully sent email {self}."
         logger.info(log)
-        return self.record_sent(True, body, log)
+        return self.record_sent(True, body, log, commit)
 
-    def record_failure(self, body: str, error_msg: str) -> bool:
+    def record_failure(self, body: str, error_msg: str, commit: bool = True) -> bool:
         log = f"Could not send email {self}. {error_msg}."
         logger.error(log)
-        return self.record_sent(False, body, log)
+        return self.record_sent(False, body, log, commit)
+
+    # fields set by a delivery attempt, see record_many
+    RECORDED_FIELDS = ['sent', 'date_sent', 'body', 'log', 'attempts', 'next_attempt']
+
+    @staticmethod
+    def record_many(emails: Sequence['Email']) -> None:
+        """Saves the delivery attempts of existing emails in bulk, and marks the duplicates"""
+        Email.objects.bulk_update(emails, Email.RECORDED_FIELDS, EMAIL_BULK_CHUNK_SIZE)
+        ids = [e.id for e in emails]
+        if ids:
+            Email.mark_duplicates(min(ids), max(ids))
+
+    @staticmethod
+    def queue_many(emails: Sequence['Email']) -> int:
+        """Queues new emails, rendered with their `data`, in bulk (see deliver_pending)"""
+        now = tz.now()
+        for email in emails:
+            email.next_attempt = now
+        # ids are not returned by every backend, they are not needed here
+        Email.objects.bulk_create(emails, EMAIL_BULK_CHUNK_SIZE)
+        return len(emails)
+
+    @staticmethod
+    @contextmanager
+    def backend_connection() -> Iterator[BaseEmailBackend]:
+        """Connection to the email backend, shared by the emails delivered within"""
+        backend = get_connection()
+        if EMAIL_HOST:
+            try:
+                backend.open()
+            except Exception as e:
+                # each delivery attempt then reports the error
+                logger.error(f"Could not connect to the SMTP server. {type(e)}: {str(e)}.")
+        try:
+            yield backend
+        finally:
+            backend.close()
 
     def send(self, message=None, data: Dict[str, str] = {}) -> bool:
+        """Sends the email, or only queues it in outbox mode (see deliver_pending)"""
+        if EMAIL_OUTBOX:
+            return self.enqueue(message, data)
+        return self.deliver(message, data)
+
+    @classmethod
+    def send_many(cls, emails: Sequence['Email']) -> List[bool]:
+        """Sends new emails, rendered with their `data`, opening a single backend
+        connection per EMAIL_BULK_CHUNK_SIZE emails, and records them in bulk.
+        In outbox mode they are only queued, in bulk as well.
+        Returns whether each one was sent (or queued)."""
+        if EMAIL_OUTBOX:
+            cls.queue_many(emails)
+            return [True for _email in emails]
+
+        with transaction.atomic():
+            for email in emails:
+                email.save()
+
+        results: List[bool] = []
+        for start in range(0, len(emails), EMAIL_BULK_CHUNK_SIZE):
+            chunk = emails[start : start + EMAIL_BULK_CHUNK_SIZE]
+            with cls.backend_connection() as backend:
+                results += [
+                    e.deliver(e.body or None, e.data, backend, commit=False) for e in chunk
+                ]
+            cls.record_many(chunk)
+        return results
+
+    @classmethod
+    def send_in_background(cls, emails: Sequence['Email']) -> int:
+        """Queues new emails, delivered by the email worker in outbox mode, or else
+        by a thread of this process once the current transaction is committed,
+        which also retries the failed ones (see deliver_in_background).
+        Their progress shows in the emails list. Returns the number of emails."""
+        count = cls.queue_many(emails)
+        if not EMAIL_OUTBOX:
+            transaction.on_commit(
+                lambda: Thread(target=cls.deliver_in_background, daemon=True).start()
+            )
+        return count
+
+    def reset_delivery(self) -> None:
+        """Clears the record of previous delivery attempts, e.g. on a copy"""
+        self.sent = False
+        self.date_sent = None
+        self.attempts = 0
+        self.next_attempt = None
+        self.duplicate_of = None
+
+    def enqueue(self, message=None, data: Dict[str, str] = {}) -> bool:
+        self.reset_delivery()
+        self.body = message or ""
+        self.data = dict(data)
+        self.next_attempt = tz.now()
+        self.save()
+        return True
+
+    def deliver(
+        self,
+        message=None,
+        data: Dict[str, str] = {},
+        backend: Optional[BaseEmailBackend] = None,
+        commit: bool = True,
+    ) -> bool:
         if self.recipient.email is None:
-            return self.record_failure(message, "Person <self.recipient> has no email address.")
+            return self.record_failure(
+                message or "", "Person <self.recipient> has no email address.", commit
+            )
 
+        data = dict(data)
         data.update(self.harvest_data)
         data.update(self.recipient_data)
 
@@ -425,7 +690,7 @@ class Email(models.Model):
             message = self.get_default_message(data)
 
         if not EMAIL_HOST:
-            return self.record_failure(message, "SMTP server not configured")
+            return self.record_failure(message, "SMTP server not configured", commit)
 
         m = EmailMessage(
             subject=self.get_subject(data),
@@ -435,22 +700,282 @@ class Email(models.Model):
             cc=self.cc_list,
             bcc=self.bcc_list,
             reply_to=self.reply_to_list,
+            connection=backend,
         )
 
         try:
             if m.send() == 1:
-                return self.record_success(message)
+                return self.record_success(message, commit)
         except Exception as e:
-            return self.record_failure(message, f"{type(e)}: {str(e)}")
+            return self.record_failure(message, f"{type(e)}: {str(e)}", commit)
 
-        return self.record_failure(message, "Something went wrong.")
+        return self.record_failure(message, "Something went wrong.", commit)
 
     def resend(self) -> bool:
         m = self
         m.pk = None
+        m.reset_delivery()
         m.save()
         return m.send(message=self.body)
 
+    def deliver_queued(
+        self, backend: Optional[BaseEmailBackend] = None, commit: bool = True
+    ) -> bool:
+        """Delivery attempt of a queued email. Failed ones are attempted again after
+        EMAIL_OUTBOX_RETRY_DELAY seconds, doubled on each retry, until
+        EMAIL_OUTBOX_MAX_ATTEMPTS is reached."""
+        self.attempts += 1
+        self.next_attempt = None
+        try:
+            if self.deliver(self.body or None, self.data, backend, commit=False):
+                return self.save_delivery(True, commit)
+        except Exception as e:
+            self.record_failure(self.body, f"{type(e)}: {str(e)}", commit=False)
+
+        if self.attempts < EMAIL_OUTBOX_MAX_ATTEMPTS:
+            delay = EMAIL_OUTBOX_RETRY_DELAY * 2 ** (self.attempts - 1)
+            self.next_attempt = tz.now() + timedelta(seconds=delay)
+        return self.save_delivery(False, commit)
+
+    def save_delivery(self, success: bool, commit: bool) -> bool:
+        if commit:
+            self.save(update_fields=self.RECORDED_FIELDS)
+            Email.mark_duplicates(self.id, self.id)
+        return success
+
+    # emails delivered between two extensions of their claim, see deliver_pending
+    CLAIM_BATCH_SIZE = 10
+
+    @classmethod
+    def claim_pending(cls, limit: int) -> List['Email']:
+        """Queued emails due for delivery, at most `limit` of them. Each one is
+        claimed by pushing its next attempt CLAIM_TIMEOUT ahead, only if no other
+        worker did in between, so that concurrent workers never deliver an email
+        twice while a crashed one does not hold it forever."""
+        now = tz.now()
+        claimed: List[Email] = []
+        due = cls.objects.filter(next_attempt__lte=now).order_by('next_attempt', 'id')
+        for email in due.select_related('recipient', 'harvest')[:limit]:
+            if cls.objects.filter(id=email.id, next_attempt=email.next_attempt).update(
+                next_attempt=now + cls.CLAIM_TIMEOUT
+            ):
+                email.next_attempt = now + cls.CLAIM_TIMEOUT
+                claimed.append(email)
+        return claimed
+
+    @classmethod
+    def extend_claim(cls, emails: List['Email']) -> List['Email']:
+        """Pushes the claim of emails CLAIM_TIMEOUT ahead. Returns those still held,
+        the others were claimed again by another worker after their claim expired."""
+        claim = tz.now() + cls.CLAIM_TIMEOUT
+        for claimed_until in set(email.next_attempt for email in emails):
+            cls.objects.filter(
+                id__in=[e.id for e in emails if e.next_attempt == claimed_until],
+                next_attempt=claimed_until,
+            ).update(next_attempt=claim)
+        held = set(
+            cls.objects.filter(id__in=[e.id for e in emails], next_attempt=claim).values_list(
+                'id', flat=True
+            )
+        )
+        for email in emails:
+            email.next_attempt = claim
+        return [email for email in emails if email.id in held]
+
+    @classmethod
+    def deliver_pending(cls, limit: int = 100, concurrency: int = 1) -> List[bool]:
+        """Delivers the queued emails due for delivery, split in `concurrency`
+        chunks of at most EMAIL_BULK_CHUNK_SIZE emails, each chunk delivered over
+        its own backend connection. Each email is recorded as soon as it is sent,
+        and the claim of the rest of the chunk is extended every CLAIM_BATCH_SIZE
+        emails, so that a slow or crashed worker never gets an email sent twice.
+        Returns whether each one was sent."""
+        emails = cls.claim_pending(limit)
+        size = max(1, min(EMAIL_BULK_CHUNK_SIZE, math.ceil(len(emails) / max(1, concurrency))))
+        chunks = [emails[start : start + size] for start in range(0, len(emails), size)]
+
+        def deliver(chunk: List['Email']) -> List[bool]:
+            results: List[bool] = []
+            with cls.backend_connection() as backend:
+                for start in range(0, len(chunk), cls.CLAIM_BATCH_SIZE):
+                    batch = cls.extend_claim(chunk[start : start + cls.CLAIM_BATCH_SIZE])
+                    results += [email.deliver_queued(backend) for email in batch]
+            logger.info(
+                f"Delivered {results.count(True)} queued emails, "
+                f"{results.count(False)} failed attempts."
+            )
+            return results
+
+        if concurrency <= 1 or len(chunks) <= 1:
+            return [sent for chunk in chunks for sent in deliver(chunk)]
+
+        def deliver_in_thread(chunk: List['Email']) -> List[bool]:
+            try:
+                return deliver(chunk)
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            return [
+                sent for results in executor.map(deliver_in_thread, chunks) for sent in results
+            ]
+
+    @classmethod
+    def deliver_in_background(cls) -> None:
+        """Delivers the queued emails, then waits for the next attempt of the failed
+        ones, until none is left to retry (see send_in_background). The retries
+        stop with the process, e.g. when the web server recycles its worker: the
+        email worker (`manage.py run_email_worker`) is the reliable way to get them
+        delivered."""
+        try:
+            while True:
+                while cls.deliver_pending():
+                    pass
+
+                next_attempt = cls.objects.filter(
+                    sent=False, next_attempt__isnull=False
+                ).aggregate(next=Min('next_attempt'))['next']
+                if next_attempt is None:
+                    return
+                time.sleep(max(0.0, (next_attempt - tz.now()).total_seconds()))
+        finally:
+            connection.close()
+
+
+class Notification(models.Model):
+    """Harvest event waiting for the next notification digest of its recipient"""
+
+    class Meta:
+        verbose_name = _("Notification")
+        verbose_name_plural = _("Notifications")
+        ordering = ['id']
+
+    recipient = models.ForeignKey(
+        'member.Person',
+        related_name='pending_notifications',
+        verbose_name=_("Recipient"),
+        on_delete=models.CASCADE,
+    )
+
+    type = models.CharField(
+        verbose_name=_("Email type"),
+        max_length=20,
+        choices=EmailType.choices,
+    )
+
+    harvest = models.ForeignKey(
+        'harvest.Harvest',
+        verbose_name=_("Harvest"),
+        on_delete=models.CASCADE,
+    )
+
+    data = models.JSONField(
+        encoder=DjangoJSONEncoder,
+        blank=True,
+        default=dict,
+    )
+
+    date_created = models.DateTimeField(
+        verbose_name=_("Date"),
+        auto_now_add=True,
+        db_index=True,
+    )
+
+    # time until which a send_digests run holds the notification, see claim_due
+    claimed_until = models.DateTimeField(
+        blank=True,
+        null=True,
+    )
+
+    # time a send_digests run has to send a digest before another one may claim it
+    CLAIM_TIMEOUT = timedelta(minutes=10)
+
+    def __str__(self):
+        return "<{type}> {harvest}".format(type=self.type, harvest=self.harvest_id)
+
+    def get_message(self, lang: str) -> str:
+        """Body of the email the event would have been sent in"""
+        email = Email(recipient=self.recipient, type=self.type, harvest=self.harvest)
+        data = dict(self.data)
+        data.update(email.harvest_data)
+        data.update(email.recipient_data)
+        return EmailTemplates.get(self.type, lang).body.format(**data)
+
+    @staticmethod
+    def notify(recipient: Person, type: str, harvest: Harvest, data: Dict[str, Any]) -> bool:
+        """Emails a harvest event to its recipient right away, or records it for
+        their next digest, according to their notification preference"""
+        if recipient.notifications == Person.Notifications.DIGEST:
+            Notification.objects.create(recipient=recipient, type=type, harvest=harvest, data=data)
+            return True
+        return Email.objects.create(recipient=recipient, type=type, harvest=harvest).send(
+            data=data
+        )
+
+    @staticmethod
+    def get_digest(recipient: Person, notifications: List['Notification']) -> Email:
+        separator = "\n\n- - -\n\n"
+        return Email(
+            recipient=recipient,
+            type=EmailType.NOTIFICATION_DIGEST,
+            data={
+                'digest_count': len(notifications),
+                'digest_en': separator.join(n.get_message('en') for n in notifications),
+                'digest_fr': separator.join(n.get_message('fr') for n in notifications),
+            },
+        )
+
+    @staticmethod
+    def claim_due(interval: int) -> Dict[Person, List['Notification']]:
+        """Pending notifications of the recipients whose oldest one was recorded
+        more than `interval` minutes ago, by recipient. They are claimed until
+        CLAIM_TIMEOUT, only if no other run did in between, so that overlapping
+        runs never send the same digest twice."""
+        now = tz.now()
+        claim = now + Notification.CLAIM_TIMEOUT
+        unclaimed = Q(claimed_until=None) | Q(claimed_until__lt=now)
+        due = list(
+            Notification.objects.filter(unclaimed)
+            .values('recipient')
+            .annotate(oldest=Min('date_created'))
+            .filter(oldest__lte=now - timedelta(minutes=interval))
+            .values_list('recipient', flat=True)
+        )
+        Notification.objects.filter(unclaimed, recipient__in=due).update(claimed_until=claim)
+
+        claimed = Notification.objects.filter(claimed_until=claim).select_related(
+            'recipient__auth_user',
+            'harvest__pick_leader__person',
+            'harvest__property__owner__person',
+            'harvest__property__owner__organization',
+        )
+        notifications: Dict[Person, List[Notification]] = {}
+        for notification in claimed.order_by('recipient', 'id'):
+            notifications.setdefault(notification.recipient, []).append(notification)
+        return notifications
+
+    @staticmethod
+    def send_digests(interval: int = EMAIL_DIGEST_INTERVAL) -> List[bool]:
+        """Sends one digest email to each recipient whose oldest pending
+        notification was recorded more than `interval` minutes ago, summarizing
+        all their pending notifications. Those of the digests sent are deleted,
+        the others are kept for the next run.
+        Returns whether each digest was sent (or queued, in outbox mode)."""
+        notifications = Notification.claim_due(interval)
+        digests = [
+            Notification.get_digest(recipient, events)
+            for recipient, events in notifications.items()
+        ]
+        results = Email.send_many(digests)
+
+        sent: List[int] = []
+        failed: List[int] = []
+        for events, success in zip(notifications.values(), results):
+            (sent if success else failed).extend(n.id for n in events)
+        Notification.objects.filter(id__in=sent).delete()
+        Notification.objects.filter(id__in=failed).update(claimed_until=None)
+        return results
+
 
 @receiver(pre_save, sender=Property)
 def notify_property_validated(sender, instance, **kwargs):
@@ -523,11 +1048,12 @@ def notify_new_request_for_participation(sender, instance, created, **kwargs):
         if pick_leader is None or pick_leader.person == instance.person:
             return
 
-        Email.objects.create(
-            recipient=pick_leader.person,
-            type=EmailType.NEW_HARVEST_RFP,
-            harvest=instance.harvest,
-        ).send(data=dict(EmailRFPSerializer(instance).data))
+        Notification.notify(
+            pick_leader.person,
+            EmailType.NEW_HARVEST_RFP,
+            instance.harvest,
+            dict(EmailRFPSerializer(instance).data),
+        )
 
 
 @receiver(post_save, sender=Comment)
@@ -536,8 +1062,78 @@ def notify_new_harvest_comment(sender, instance, **kwargs):
     if pick_leader is None or pick_leader == instance.author:
         return
 
-    Email.objects.create(
-        recipient=pick_leader.person,
-        type=EmailType.NEW_HARVEST_COMMENT,
-        harvest=instance.harvest,
-    ).send(data=dict(EmailCommentSerializer(instance).data))
+    Notification.notify(
+        pick_leader.person,
+        EmailType.NEW_HARVEST_COMMENT,
+        instance.harvest,
+        dict(EmailCommentSerializer(instance).data),
+    )
+
+
+@receiver(pre_save, sender=Harvest)
+def calendar_harvest_changing(sender, instance, **kwargs):
+    if instance.id is not None:
+        CalendarCache.invalidate(sender.objects.filter(id=instance.id).first())
+
+
+@receiver(post_save, sender=Harvest)
+@receiver(post_delete, sender=Harvest)
+def calendar_harvest_changed(sender, instance, **kwargs):
+    CalendarCache.invalidate(instance)
+
+
+@receiver(m2m_changed, sender=Harvest.trees.through)
+def calendar_harvest_trees_changed(sender, instance, action, reverse, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear') and not reverse:
+        CalendarCache.invalidate(instance)
+
+
+@receiver(post_save, sender=RFP)
+@receiver(post_delete, sender=RFP)
+@receiver(post_save, sender=HarvestYield)
+@receiver(post_delete, sender=HarvestYield)
+def calendar_harvest_related_changed(sender, instance, **kwargs):
+    CalendarCache.invalidate(Harvest.objects.filter(id=instance.harvest_id).first())
+
+
+@receiver(post_save, sender=Harvest)
+@receiver(post_delete, sender=Harvest)
+@receiver(post_save, sender=Property)
+@receiver(post_delete, sender=Property)
+@receiver(post_save, sender=Equipment)
+@receiver(post_delete, sender=Equipment)
+@receiver(post_save, sender=RFP)
+@receiver(post_delete, sender=RFP)
+@receiver(post_save, sender=Organization)
+@receiver(post_delete, sender=Organization)
+@receiver(post_save, sender=AuthUser)
+@receiver(post_delete, sender=AuthUser)
+def list_count_changed(sender, instance, update_fields=None, **kwargs):
+    if not is_login_update(update_fields):
+        CountCache.invalidate(sender)
+
+
+@receiver(post_save, sender=Person)
+@receiver(post_delete, sender=Person)
+def community_count_changed(sender, instance, update_fields=None, **kwargs):
+    # the community list only shows users with a person
+    if not is_login_update(update_fields):
+        CountCache.invalidate(AuthUser)
+
+
+def is_login_update(update_fields) -> bool:
+    """Whether a save only records a login (see update_last_login), which the
+    counted lists do not depend on"""
+    return update_fields is not None and set(update_fields) == {'last_login'}
+
+
+@receiver(post_save, sender=Organization)
+@receiver(post_delete, sender=Organization)
+def beneficiaries_changed(sender, instance, **kwargs):
+    BeneficiaryCache.invalidate()
+
+
+@receiver(post_save, sender=EmailContent)
+@receiver(post_delete, sender=EmailContent)
+def email_content_changed(sender, instance, **kwargs):
+    EmailTemplates.invalidate()
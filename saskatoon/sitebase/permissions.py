@@ -30,4 +30,9 @@ PERMISSIONS: Permissions = {
         "change": set(),
         "delete": set(),
     },
+    "notification": {
+        "add": set(),
+        "change": set(),
+        "delete": set(),
+    },
 }
@@ -99,6 +99,47 @@ class LeafletMap extends HTMLElement {
 			}
 		});
 
+		// markers listed by the server within the visible bounds, clustered
+		// below its MAP_CLUSTER_MAX_ZOOM
+		const src = getAttributeValue(this, "src", null);
+		if (src !== null) {
+			const fetchedLayer = L.layerGroup().addTo(map);
+			let controller = null;
+
+			const fetchMarkers = () => {
+				const url = new URL(src, window.location.href);
+				url.searchParams.set("format", "json");
+				url.searchParams.set("bbox", map.getBounds().toBBoxString());
+				url.searchParams.set("zoom", map.getZoom());
+
+				// only the latest bounds matter
+				if (controller !== null) {
+					controller.abort();
+				}
+				controller = new AbortController();
+
+				fetch(url, { signal: controller.signal })
+					.then((response) => response.json())
+					.then((data) => {
+						fetchedLayer.clearLayers();
+						for (const cluster of data.clusters) {
+							fetchedLayer.addLayer(this.makeCluster(map, cluster));
+						}
+						for (const marker of data.markers) {
+							fetchedLayer.addLayer(this.makeMarker(marker));
+						}
+					})
+					.catch((e) => {
+						if (e.name !== "AbortError") {
+							console.error(e);
+						}
+					});
+			};
+
+			map.on("moveend", fetchMarkers);
+			fetchMarkers();
+		}
+
 		// Make sure the map resizes correctly on css changes
 		const resizeObserver = new ResizeObserver(() => {
 			map.invalidateSize();
@@ -107,6 +148,85 @@ class LeafletMap extends HTMLElement {
 		resizeObserver.observe(mapRoot);
 	}
 
+	makeCluster(map, cluster) {
+		const size =
+			cluster.count < 10 ? "small" : cluster.count < 100 ? "medium" : "large";
+		const marker = L.marker([cluster.latitude, cluster.longitude], {
+			icon: L.divIcon({
+				html: `<div><span>${cluster.count}</span></div>`,
+				className: `marker-cluster marker-cluster-${size}`,
+				iconSize: L.point(40, 40),
+			}),
+		});
+
+		const [west, south, east, north] = cluster.bbox;
+		marker.addEventListener("click", (_) => {
+			map.fitBounds([
+				[south, west],
+				[north, east],
+			]);
+		});
+
+		return marker;
+	}
+
+	makeMarker(data) {
+		// harvests are located at their property
+		const location = "latitude" in data ? data : data.property;
+		const makeIcon = (html, className, iconAnchor, popupAnchor) =>
+			L.divIcon({
+				html: `<span class="${className}">${html}</span>`,
+				className: "saskatoon-map-div-icon",
+				iconAnchor,
+				popupAnchor,
+			});
+		const icon = makeIcon(data.icon, data.icon_color, [20, -10], [9, -10]);
+		const iconHover = makeIcon(
+			data.icon_hover,
+			`leaflet-hover-icon ${data.icon_color}`,
+			[22, -5],
+			[0, 0],
+		);
+
+		const marker = L.marker([location.latitude, location.longitude], { icon });
+
+		const tooltip = document.createElement("span");
+		tooltip.textContent = location.address;
+		marker.bindTooltip(tooltip, { direction: "top" });
+
+		// the popup details are only fetched when it is first opened
+		const popup = document.createElement("div");
+		popup.className = "saskatoon-map-spinner";
+		popup.style.height = "320px";
+		popup.innerHTML = '<i class="fa-solid fa-circle-notch fa-spin"></i>';
+		marker.bindPopup(popup, { className: "saskatoon-map-popup" });
+		marker.once("popupopen", (_) => {
+			fetch(data.popup_url)
+				.then((response) => response.text())
+				.then((html) => marker.setPopupContent(html))
+				.catch((e) => console.error(e));
+		});
+
+		marker.addEventListener("tooltipopen", (_) => {
+			if (marker.isPopupOpen()) {
+				marker.closeTooltip();
+			}
+		});
+		marker.addEventListener("mouseover", (_) => {
+			marker.setIcon(iconHover);
+		});
+		marker.addEventListener("mouseout", (_) => {
+			if (!marker.isPopupOpen()) {
+				marker.setIcon(icon);
+			}
+		});
+		marker.addEventListener("popupclose", (_) => {
+			marker.setIcon(icon);
+		});
+
+		return marker;
+	}
+
 	makeScriptNode(src) {
 		const js = document.createElement("script");
 		js.src = src;
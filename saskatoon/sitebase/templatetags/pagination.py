@@ -1,4 +1,5 @@
 from django import template
+from urllib.parse import parse_qs, urlsplit
 from rest_framework.utils.urls import remove_query_param, replace_query_param
 from saskatoon.pagination import BasicPageNumberPagination
 from typing import List
@@ -6,6 +7,7 @@ from typing import List
 register = template.Library()
 page_query_param = BasicPageNumberPagination.page_query_param
 page_size_query_param = BasicPageNumberPagination.page_size_query_param
+cursor_query_param = BasicPageNumberPagination.cursor_query_param
 
 
 @register.filter
@@ -24,9 +26,12 @@ def add_page_size_param(url: str) -> str:
 
 
 def _clean_url(url: str) -> str:
-    """Removes the page and page_size query parameters"""
+    """Removes the page and page_size query parameters, and restarts
+    cursor pagination from the first page"""
     url = remove_query_param(url, page_query_param)
     url = remove_query_param(url, page_size_query_param)
+    if cursor_query_param in parse_qs(urlsplit(url).query, keep_blank_values=True):
+        url = replace_query_param(url, cursor_query_param, '')
     return url
 
 
@@ -1,8 +1,9 @@
 import re
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 from django.urls import reverse
 from django.utils import timezone
-from typing import Optional, Any, Callable
+from django.utils.dateparse import parse_date, parse_datetime
+from typing import Optional, Any, Callable, Dict, Tuple
 from typeguard import typechecked
 from django.conf import settings
 
@@ -70,6 +71,43 @@ def parse_naive_datetime(
         return None
 
 
+def parse_window_date(value: Optional[str]) -> Optional[datetime]:
+    """Parses a FullCalendar start/end parameter (ISO 8601 date or datetime)"""
+    if not value:
+        return None
+
+    try:
+        dt = parse_datetime(value)
+        if dt is None:
+            day = parse_date(value)
+            dt = datetime.combine(day, datetime.min.time()) if day is not None else None
+    except ValueError:
+        return None
+
+    if dt is not None and timezone.is_naive(dt):
+        dt = timezone.make_aware(dt)
+    return dt
+
+
+@typechecked
+def calendar_lookback_start() -> datetime:
+    """Oldest start date of the orphan and adopted harvests listed on the calendar
+    whatever its window: start of the current season, or CALENDAR_LOOKBACK_DAYS ago"""
+    if settings.CALENDAR_LOOKBACK_DAYS is not None:
+        return local_today() - timedelta(days=settings.CALENDAR_LOOKBACK_DAYS)
+    return local_today().replace(month=1, day=1)
+
+
+def get_point_coordinates(
+    geom: Optional[Dict[str, Any]],
+) -> Tuple[Optional[float], Optional[float]]:
+    """(latitude, longitude) of a GeoJSON point, (None, None) for any other geometry"""
+    if geom is not None and geom.get('type') == "Point":
+        longitude, latitude = geom['coordinates'][:2]
+        return latitude, longitude
+    return None, None
+
+
 def is_quill_html_empty(html: str) -> bool:
     return not len(re.sub(HTML_TAGS_REGEX, '', html))
 
@@ -1,17 +1,21 @@
+from datetime import datetime
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.core.exceptions import PermissionDenied
-from django.db.models import Q
+from django.db.models import OuterRef, Q, Subquery, Sum
 from django.http import JsonResponse, HttpResponse
 from django.shortcuts import redirect, render
 from django.urls import reverse_lazy
 from django.utils.decorators import method_decorator
+from django.utils import timezone as tz
 from django.views.generic import View, TemplateView
-from harvest.models import Harvest
+from harvest.models import Harvest, HarvestYield, RequestForParticipation
 from member.permissions import is_pickleader_or_core_or_admin
 from saskatoon.settings import VOLUNTEER_WAIVER_PDF_PATH
+from sitebase.cache import CalendarCache
 from sitebase.models import PageContent, FAQList
-from typing import List
+from sitebase.utils import calendar_lookback_start, parse_window_date
+from typing import Any, Dict, List, Optional, Tuple
 
 
 class Index(TemplateView):
@@ -178,38 +182,108 @@ class Calendar(TemplateView):
 class JsonCalendar(View):
     """Calendar events"""
 
-    def get(self, request, *args, **kwargs):
-        start_date = request.GET.get('start')
-        end_date = request.GET.get('end')
+    COLORS = {
+        Harvest.Status.SCHEDULED: "#e8ad2bcc",  # btn-warning
+        Harvest.Status.READY: "#2da4f0cc",  # btn-info
+        Harvest.Status.SUCCEEDED: "#8bc34acc",  # btn-success
+        Harvest.Status.CANCELLED: "#ff2079cc",  # btn-danger
+        Harvest.Status.ADOPTED: "#440bd466",  # btn-primary
+        Harvest.Status.ORPHAN: "#cccccccc",
+    }
+
+    def get_queryset(self, start_date, end_date):
+        """Harvests of the calendar window, along with everything their events need,
+        so that the number of queries does not depend on the number of events"""
         harvests = Harvest.objects.filter(
             start_date__isnull=False,
             end_date__isnull=False,
         )
 
-        if request.user.is_authenticated:
+        if self.request.user.is_authenticated:
+            # orphan and adopted harvests are listed whatever the window, but only
+            # back to the current season (or look-back), so that both sides of the
+            # OR are start_date ranges and the list does not grow with the years
+            since = calendar_lookback_start()
+            window_start = parse_window_date(start_date)
+            if window_start is not None:
+                harvests = harvests.filter(start_date__gte=min(since, window_start))
+
             q1 = Q(start_date__gte=start_date, end_date__lte=end_date)
-            q2 = Q(status__in=[Harvest.Status.ORPHAN, Harvest.Status.ADOPTED])
-            harvests = harvests.filter(q1 | q2).distinct()
+            q2 = Q(
+                status__in=[Harvest.Status.ORPHAN, Harvest.Status.ADOPTED], start_date__gte=since
+            )
+            harvests = harvests.filter(q1 | q2)
         else:
             harvests = harvests.filter(start_date__gte=start_date, end_date__lte=end_date)
 
+        return (
+            harvests.select_related('property__neighborhood')
+            .prefetch_related('trees')
+            .annotate(
+                nb_requests=Subquery(
+                    RequestForParticipation.objects.filter(harvest=OuterRef('pk'))
+                    .values('harvest')
+                    .annotate(total=Sum('number_of_pickers'))
+                    .values('total')
+                ),
+                total_harvested=Subquery(
+                    HarvestYield.objects.filter(harvest=OuterRef('pk'))
+                    .values('harvest')
+                    .annotate(total=Sum('total_in_lb'))
+                    .values('total')
+                ),
+            )
+        )
+
+    def get_audience(self) -> str:
+        if not self.request.user.is_authenticated:
+            return CalendarCache.ANONYMOUS
+        if is_pickleader_or_core_or_admin(self.request.user):
+            return CalendarCache.PICKLEADER
+        return CalendarCache.MEMBER
+
+    def get(self, request, *args, **kwargs):
+        start_date = request.GET.get('start')
+        end_date = request.GET.get('end')
+        audience = self.get_audience()
+
+        key = CalendarCache.get_key(audience, start_date, end_date)
+        content = CalendarCache.get(key)
+        if content is None:
+            events, expires = self.get_events(start_date, end_date, audience)
+            content = JsonResponse(events, safe=False).content
+            timeout = int((expires - tz.now()).total_seconds()) if expires else None
+            CalendarCache.set(key, content, timeout)
+
+        return HttpResponse(content, content_type='application/json')
+
+    def get_events(
+        self, start_date, end_date, audience
+    ) -> Tuple[List[Dict[str, Any]], Optional[datetime]]:
+        """Returns the events of a window, and the next publication date hidden from
+        the audience, after which they would change"""
+        show_all = audience == CalendarCache.PICKLEADER
+        now = tz.now()
+        expires = None
+
         events = []
-        for harvest in harvests:
-            if is_pickleader_or_core_or_admin(self.request.user) or harvest.is_publishable():
+        for harvest in self.get_queryset(start_date, end_date):
+            publication_date = harvest.publication_date
+            if (
+                not show_all
+                and harvest.status in Harvest.PUBLISHABLE_STATUSES
+                and publication_date is not None
+                and publication_date > now
+            ):
+                expires = min(expires or publication_date, publication_date)
+
+            if show_all or harvest.is_publishable():
                 # https://fullcalendar.io/docs/event-object
-                event = dict()
+                event: Dict[str, Any] = dict()
 
                 event['url'] = reverse_lazy('rfp-create', kwargs={'hid': harvest.id})
-                colors = {
-                    Harvest.Status.SCHEDULED: "#e8ad2bcc",  # btn-warning
-                    Harvest.Status.READY: "#2da4f0cc",  # btn-info
-                    Harvest.Status.SUCCEEDED: "#8bc34acc",  # btn-success
-                    Harvest.Status.CANCELLED: "#ff2079cc",  # btn-danger
-                    Harvest.Status.ADOPTED: "#440bd466",  # btn-primary
-                    Harvest.Status.ORPHAN: "#cccccccc",
-                }
                 event['display'] = "block"
-                event['backgroundColor'] = colors.get(harvest.status, "#d4c7f9")
+                event['backgroundColor'] = self.COLORS.get(harvest.status, "#d4c7f9")
                 event['borderColor'] = event['backgroundColor']
                 event['textColor'] = "#000"
                 event['title'] = harvest.get_public_title()
@@ -228,15 +302,17 @@ class JsonCalendar(View):
                     'description': harvest.about.html,
                     'status': harvest.status,
                     'nb_required_pickers': harvest.nb_required_pickers,
-                    'nb_requests': harvest.get_volunteers_count(None),
+                    'nb_requests': harvest.nb_requests or 0,
                     'trees': harvest.get_fruits(),
-                    'total_harvested': harvest.get_total_distribution(),
+                    'total_harvested': (
+                        harvest.total_harvested if harvest.total_harvested is not None else 0
+                    ),
                 }
 
                 events.append(event)
                 del event
 
-        return JsonResponse(events, safe=False)
+        return events, expires
 
 
 def handler400(request, exception):
@@ -1,5 +1,6 @@
 import pytest
 from pathlib import Path
+from django.core.cache import cache
 from django.core.management import call_command
 from django.contrib.auth import get_user_model
 
@@ -37,6 +38,12 @@ def django_db_setup_with_fixtures(django_db_setup, django_db_blocker):
             call_command('loaddata', FIXTURE_PATH.joinpath(f"{fixture_name}.json"))
 
 
+@pytest.fixture(autouse=True)
+def clear_cache():
+    # cached responses would otherwise leak from one test database to the next
+    cache.clear()
+
+
 @pytest.fixture
 def client_core_user(client):
     # Revisit after we have 10 tests: whether it is necessary to reuse user from django fixtures
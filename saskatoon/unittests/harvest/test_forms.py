@@ -1,4 +1,5 @@
 import pytest
+from django.core import mail
 
 from harvest.forms import (
     RFPForm,
@@ -10,6 +11,13 @@ from harvest.forms import (
     HarvestYieldForm,
     EquipmentForm,
 )
+from harvest.models import Harvest, Property
+from member.models import AuthUser, Person
+from sitebase.models import Notification
+
+# ruff tries to erase it because the weird way pytest applies
+# fixtures is not recognised.
+from unittests.member.fixtures import location  # noqa: F401
 
 """ I had to remove RFPManageForm from the list of classes
     since it needs more setup for a successful initialization and
@@ -51,3 +59,41 @@ def test_Form_empty_is_invalid(Form):
        I ran into issues with the harvest fixture and quill fields,
        so I decided to push back testing till I have a better handle of them
 """
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("notifications", Person.Notifications.values)
+def test_RFPForm_notifies_pick_leader(location, monkeypatch, notifications):  # noqa: F811
+    """Test that the pick leader is notified once, according to their preference"""
+
+    monkeypatch.setattr('sitebase.models.EMAIL_HOST', "smtp.test")
+    leader = AuthUser.objects.create_user(email="leader@test.com", password="password1234")
+    leader.person = Person.objects.create(
+        first_name="Leader", notifications=notifications, **location
+    )
+    leader.save()
+    harvest = Harvest.objects.create(
+        status=Harvest.Status.SCHEDULED,
+        pick_leader=leader,
+        property=Property.objects.create(neighborhood=location['neighborhood']),
+    )
+
+    form = RFPForm(
+        {
+            'first_name': "Picker",
+            'last_name': "Test",
+            'email': "picker@test.com",
+            'phone_0': "514-555-0199",
+            'number_of_pickers': 2,
+        },
+        harvest=harvest,
+    )
+    assert form.is_valid(), form.errors
+    form.save()
+
+    if notifications == Person.Notifications.DIGEST:
+        assert len(mail.outbox) == 0
+        assert Notification.objects.count() == 1
+    else:
+        assert [m.to for m in mail.outbox] == [["leader@test.com"]]
+        assert Notification.objects.count() == 0
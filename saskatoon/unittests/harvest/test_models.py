@@ -9,6 +9,7 @@ from harvest.models import (
     Harvest,
     HarvestYield,
     Equipment,
+    EquipmentReservation,
     EquipmentType,
     TreeType,
 )
@@ -52,6 +53,20 @@ class TestProperty(TestCase):
         if property.is_active and not property.pending and property.authorized:
             assert property.status == Property.Status.AUTHORIZED
 
+    @given(property=harvest_st.property, harvests=st.lists(harvest_st.harvest, max_size=3))
+    def test_map_state_annotations(self, property, harvests):
+        """Annotated map state matches the one queried per property"""
+        for harvest in harvests:
+            harvest.property = property
+            harvest.save()
+
+        properties = Property.objects.filter(id=property.id)
+        annotated = Property.with_map_state(properties).get()
+
+        with self.assertNumQueries(0):
+            state = annotated.get_map_state()
+        assert state == properties.get().get_map_state()
+
 
 class TestEquipmentType(TestCase):
     @given(equipment_type=from_model(EquipmentType))
@@ -117,6 +132,50 @@ class TestHarvest(TestCase):
         assert point.actor_id == organization.actor_id
         assert isinstance(organization, Organization)
 
+    @given(
+        harvest=harvest_st.harvest,
+        equipment=harvest_st.equipment,
+        organization=member_st.organization,
+    )
+    def test_harvest_get_prefetched_equipment_point(self, harvest, equipment, organization):
+        """Test that the prefetched equipment point is resolved without further queries"""
+        equipment.owner = organization
+        equipment.save()
+        harvest.equipment_reserved.set([equipment])
+        harvest.status = Harvest.Status.SCHEDULED
+        harvest.save()
+
+        prefetched = Harvest.with_equipment_point(Harvest.objects.filter(id=harvest.id)).get()
+
+        with self.assertNumQueries(0):
+            point = prefetched.get_equipment_point()
+
+        assert point.actor_id == organization.actor_id
+
+    @given(
+        harvest=harvest_st.harvest,
+        equipment=harvest_st.equipment,
+        organization=member_st.organization,
+        status=st.sampled_from(Harvest.Status),
+    )
+    def test_equipment_reservations(self, harvest, equipment, organization, status):
+        """Test that the reservations follow the harvests and their reserved equipment"""
+        harvest.status = Harvest.Status.SCHEDULED
+        harvest.save()
+        harvest.equipment_reserved.set([equipment])
+        assert EquipmentReservation.verify() == []
+
+        equipment.owner = organization
+        equipment.save()
+        assert EquipmentReservation.verify() == []
+
+        harvest.status = status
+        harvest.save()
+        assert EquipmentReservation.verify() == []
+
+        equipment.harvest_set.clear()
+        assert not EquipmentReservation.objects.exists()
+
 
 class TestComment(TestCase):
     @given(comment=harvest_st.comment)
@@ -135,6 +194,17 @@ class TestRequestForParticipation(TestCase):
     def test_can_be_created(self, request):
         assert isinstance(request, RequestForParticipation)
 
+    @given(request=harvest_st.request_for_participation)
+    def test_volunteers_count_annotations(self, request):
+        """Annotated counts match the counts queried per harvest"""
+        harvests = Harvest.objects.filter(id=request.harvest_id)
+        annotated = Harvest.with_volunteers_count(harvests).get()
+
+        for status in [None, *RequestForParticipation.Status]:
+            assert annotated.get_volunteers_count(status) == harvests.get().get_volunteers_count(
+                status
+            )
+
 
 # not sure how to generate images yet
 # class TestHarvestImage(TestCase):
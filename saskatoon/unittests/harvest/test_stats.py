@@ -0,0 +1,136 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from django.db import IntegrityError
+
+from harvest.models import (
+    SEASON_ROLLUPS,
+    Harvest,
+    HarvestYield,
+    Property,
+    RequestForParticipation as RFP,
+    TreeSeasonStats,
+    TreeType,
+)
+from harvest.stats import HarvestStats, SeasonStats
+from member.models import Organization, Person
+
+# ruff tries to erase it because the weird way pytest applies
+# fixtures is not recognised.
+from unittests.member.fixtures import location  # noqa: F401
+
+
+def get_tables(stats: HarvestStats):
+    return (
+        stats.get_highlights(),
+        stats.get_total_weight_harvest_per_fruit(),
+        stats.get_total_weight_harvest_per_neighborhood(),
+        stats.get_total_weight_harvest_per_beneficiary(),
+        stats.get_total_weight_harvest_per_picker(),
+    )
+
+
+def assert_rollups_match(season: int) -> None:
+    for rollup in SEASON_ROLLUPS:
+        assert rollup.verify() == []
+
+    succeeded = Harvest.objects.filter(status=Harvest.Status.SUCCEEDED)
+    assert get_tables(SeasonStats()) == get_tables(HarvestStats(succeeded))
+    assert get_tables(SeasonStats(season)) == get_tables(
+        HarvestStats(succeeded.filter(start_date__year=season))
+    )
+
+
+@pytest.mark.django_db
+def test_season_stats_follow_changes(
+    db,
+    location,
+    django_capture_on_commit_callbacks,  # noqa: F811
+) -> None:
+    start = datetime(2024, 8, 1, 12, tzinfo=timezone.utc)
+    apple = TreeType.objects.create(name_en="Apple", fruit_name_en="Apple")
+    pear = TreeType.objects.create(name_en="Pear", fruit_name_en="Pear")
+    picker = Person.objects.create(first_name="Picker", **location)
+    org = Organization.objects.create(civil_name="Food bank", is_beneficiary=True, **location)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        property = Property.objects.create(neighborhood=location['neighborhood'])
+        harvest = Harvest.objects.create(
+            property=property, start_date=start, end_date=start + timedelta(hours=2)
+        )
+        harvest.trees.set([apple, pear])
+        RFP.objects.create(harvest=harvest, person=picker, status=RFP.Status.ACCEPTED)
+        HarvestYield.objects.create(harvest=harvest, tree=apple, total_in_lb=12.5, recipient=org)
+        picker_yield = HarvestYield.objects.create(
+            harvest=harvest, tree=pear, total_in_lb=3, recipient=picker
+        )
+
+    # yields of harvests that did not succeed are not counted
+    assert SeasonStats(2024).is_empty()
+    assert_rollups_match(2024)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        harvest.status = Harvest.Status.SUCCEEDED
+        harvest.save()
+
+    assert SeasonStats(2024).get_highlights() == {
+        "total_beneficiaries": 1,
+        "total_pickers": 2,
+        "total_weight": 15,
+        "total_harvests": 1,
+    }
+    assert_rollups_match(2024)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        picker_yield.tree = apple
+        picker_yield.total_in_lb = 4
+        picker_yield.save()
+        harvest.trees.remove(pear)
+        RFP.objects.create(harvest=harvest, person=picker)
+
+    assert SeasonStats(2024).get_total_weight_harvest_per_fruit('en') == [("Apple", 1, 16)]
+    assert_rollups_match(2024)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        harvest.start_date = start.replace(year=2023)
+        harvest.save()
+
+    assert SeasonStats(2024).is_empty()
+    assert_rollups_match(2023)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        harvest.delete()
+
+    assert SeasonStats().is_empty()
+    assert_rollups_match(2023)
+
+
+@pytest.mark.django_db
+def test_season_stats_concurrent_refresh(location, monkeypatch) -> None:  # noqa: F811
+    start = datetime(2024, 8, 1, 12, tzinfo=timezone.utc)
+    apple = TreeType.objects.create(name_en="Apple", fruit_name_en="Apple")
+    harvest = Harvest.objects.create(
+        property=Property.objects.create(neighborhood=location['neighborhood']),
+        status=Harvest.Status.SUCCEEDED,
+        start_date=start,
+        end_date=start + timedelta(hours=2),
+    )
+    harvest.trees.set([apple])
+
+    manager = TreeSeasonStats._default_manager
+    bulk_create = manager.bulk_create
+    failures = [IntegrityError("unique_tree_season_stats")]
+
+    def concurrent_bulk_create(*args, **kwargs):
+        # another refresh inserted the same rows in between
+        if failures:
+            raise failures.pop()
+        return bulk_create(*args, **kwargs)
+
+    monkeypatch.setattr(manager, 'bulk_create', concurrent_bulk_create)
+    TreeSeasonStats.refresh(2024, {apple.id})
+    assert TreeSeasonStats.objects.get(season=2024, tree=apple).harvests == 1
+
+    # the change triggering the refresh never fails with it
+    failures.extend(IntegrityError("unique_tree_season_stats") for _ in range(3))
+    TreeSeasonStats.refresh(2024, {apple.id})
+    assert TreeSeasonStats.objects.filter(season=2024, tree=apple).exists()
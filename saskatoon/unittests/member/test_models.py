@@ -138,3 +138,15 @@ def test_organization_latitude(location):  # noqa: F811
     )
 
     assert org.latitude == lat
+
+
+@pytest.mark.django_db
+def test_organization_coordinates_update_fields(location):  # noqa: F811
+    org = Organization.objects.create(civil_name="Test org coordinates", **location)
+    assert org.latitude is None
+
+    org.geom = {"type": "Point", "coordinates": [-73.575174, 45.516465]}
+    org.save(update_fields=['geom'])
+
+    org.refresh_from_db()
+    assert (org.latitude, org.longitude) == (45.516465, -73.575174)
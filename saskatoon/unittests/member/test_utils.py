@@ -1,13 +1,22 @@
+import json
 import pytest
 import deal
 from datetime import timedelta, datetime, timezone
 import hypothesis.strategies as st
 
 from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from sitebase.utils import parse_naive_datetime
-from member.utils import is_equipment_point_available, get_available_equipment_points
+from member.utils import (
+    get_available_equipment_points,
+    get_booked_equipment_points,
+    get_booked_slots,
+    is_equipment_point_available,
+    reserve_equipment_point,
+)
 from harvest.models import Harvest, Equipment, EquipmentType
-from member.models import Organization, Country, State, City, Neighborhood
+from member.models import AuthUser, Organization, Person, Country, State, City, Neighborhood
 
 TZINFO = timezone(timedelta(hours=-5))
 HARVEST_START = datetime(2025, 3, 2, hour=12, tzinfo=TZINFO)
@@ -363,3 +372,173 @@ def test_is_equipment_point_available_date_change_after_reservation(
         assert available_after_change is False
     else:
         assert available_after_change is True
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("harvest", [Harvest.Status.SCHEDULED], indirect=True)
+def test_get_booked_equipment_points(db, harvest, equipment) -> None:
+    """Each window gets the equipment points that get_available_equipment_points excludes"""
+    harvest.equipment_reserved.set([equipment])
+    windows = [
+        (HARVEST_START, HARVEST_END),
+        (HARVEST_END + timedelta(hours=1), HARVEST_END + timedelta(hours=3)),
+        (HARVEST_END + timedelta(hours=2, minutes=1), HARVEST_END + timedelta(hours=3)),
+        (HARVEST_START.replace(day=1), HARVEST_END.replace(day=1)),
+    ]
+
+    booked = get_booked_equipment_points(windows)
+    point = equipment.owner.pk
+    assert booked == [{point}, {point}, set(), set()]
+    for (start, end), points in zip(windows, booked):
+        available = get_available_equipment_points(start, end)
+        assert available.filter(pk=point).exists() == (point not in points)
+
+    assert get_booked_equipment_points(windows, harvest) == [set()] * 4
+    assert get_booked_equipment_points(windows[2:], buffer=timedelta(hours=3)) == [{point}, set()]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("harvest", [Harvest.Status.READY], indirect=True)
+def test_get_booked_slots(db, harvest, equipment) -> None:
+    """Slots overlapping the buffered reservation are booked"""
+    harvest.equipment_reserved.set([equipment])
+    boundaries = [HARVEST_START.replace(hour=hour) for hour in range(9, 23, 2)]
+
+    booked = get_booked_slots(boundaries)
+    # reserved from 11:00 to 19:00 with the buffer
+    assert booked == {equipment.owner.pk: [False, True, True, True, True, False]}
+    assert get_booked_slots(boundaries[:3]) == {equipment.owner.pk: [False, True]}
+    assert get_booked_slots(boundaries[:2]) == {}
+    assert get_booked_slots(boundaries[:1]) == {}
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("harvest", [Harvest.Status.SCHEDULED], indirect=True)
+def test_equipment_point_availability(client_core_user, harvest, equipment) -> None:
+    harvest.equipment_reserved.set([equipment])
+    Organization.objects.create(
+        is_equipment_point=True, civil_name="Free", city=equipment.owner.organization.city
+    )
+
+    def get_availability(params: str):
+        response = client_core_user.get(f"/equipment-point/availability/?{params}")
+        assert response.status_code == 200
+        return json.loads(response.content)
+
+    data = get_availability("start=2025-03-01&end=2025-03-04")
+    assert data['slots'] == ['2025-03-01', '2025-03-02', '2025-03-03']
+    assert [(p['civil_name'], p['availability']) for p in data['equipment_points']] == [
+        (" Test Equipment Point", '101'),
+        ("Free", '111'),
+    ]
+
+    hours = get_availability(
+        "start=2025-03-02T10:00:00-05:00&end=2025-03-02T20:00:00-05:00&slot=hour"
+    )
+    assert len(hours['slots']) == 10
+    assert hours['equipment_points'][0]['availability'] == '1' + '0' * 8 + '1'
+
+    response = client_core_user.get("/equipment-point/availability/?slot=week")
+    assert response.status_code == 400
+    response = client_core_user.get(
+        "/equipment-point/availability/?start=2025-01-01&end=2026-01-01&slot=hour"
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("harvest", [Harvest.Status.SCHEDULED], indirect=True)
+@pytest.mark.parametrize("second_harvest", [Harvest.Status.READY], indirect=True)
+def test_reserve_equipment_point(db, harvest, second_harvest, equipment) -> None:
+    """Overlapping bookings of an equipment point get the conflicting harvest back"""
+    point = equipment.owner.organization
+    assert reserve_equipment_point(harvest, point) is None
+    assert harvest.equipment_reserved.count() == 2
+
+    assert reserve_equipment_point(second_harvest, point) == harvest
+    assert second_harvest.equipment_reserved.count() == 0
+
+    # rebooking its own equipment point is not a conflict
+    assert reserve_equipment_point(harvest, point) is None
+
+    second_harvest.start_date = HARVEST_START.replace(day=3)
+    second_harvest.end_date = HARVEST_END.replace(day=3)
+    second_harvest.save()
+    assert reserve_equipment_point(second_harvest, point) is None
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("harvest", [Harvest.Status.SCHEDULED], indirect=True)
+@pytest.mark.parametrize("second_harvest", [Harvest.Status.SCHEDULED], indirect=True)
+def test_make_reservation(client_core_user, harvest, second_harvest, equipment) -> None:
+    point = equipment.owner.pk
+    response = client_core_user.post(f"/harvest/{harvest.id}/make_reservation/", {'org': point})
+    assert response.status_code == 302
+    assert harvest.get_equipment_point().pk == point
+
+    response = client_core_user.post(
+        f"/harvest/{second_harvest.id}/make_reservation/", {'org': point}, follow=True
+    )
+    assert "no longer available" in response.content.decode()
+    assert second_harvest.get_equipment_point() is None
+
+    second_harvest.start_date = second_harvest.end_date = None
+    second_harvest.save()
+    response = client_core_user.post(
+        f"/harvest/{second_harvest.id}/make_reservation/", {'org': point}, follow=True
+    )
+    assert "set the harvest start and end dates" in response.content.decode()
+    assert second_harvest.get_equipment_point() is None
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("harvest", [Harvest.Status.SCHEDULED], indirect=True)
+@pytest.mark.parametrize("second_harvest", [Harvest.Status.SCHEDULED], indirect=True)
+def test_harvest_detail_equipment_points(
+    client_core_user, harvest, second_harvest, equipment
+) -> None:
+    reserve_equipment_point(harvest, equipment.owner.organization)
+
+    def get_equipment_points(harvest: Harvest):
+        with CaptureQueriesContext(connection) as queries:
+            response = client_core_user.get(f"/harvest/{harvest.id}/?format=json")
+        data = json.loads(response.content)
+        points = [
+            (p['civil_name'], p['status'], p['inventory']['fr']) for p in data['equipment_points']
+        ]
+        return points, len(queries)
+
+    def add_equipment_point(name: str) -> None:
+        contact = Person.objects.create(first_name=name)
+        user = AuthUser.objects.create_user(email=f"{name.replace(' ', '.')}@point.org")
+        user.person = contact
+        user.save()
+        org = Organization.objects.create(
+            is_equipment_point=True,
+            civil_name=name,
+            contact_person=contact,
+            neighborhood=equipment.owner.organization.neighborhood,
+            city=equipment.owner.organization.city,
+        )
+        Equipment.objects.create(type=equipment.type, owner=org, shared=True)
+
+    inventory = "1 Type d'Equipement Test&;1 Type d'Equipement Test"
+    points = get_equipment_points(second_harvest)[0]
+    assert points == [(" Test Equipment Point", 'unavailable', inventory)]
+    assert get_equipment_points(harvest)[0] == [(" Test Equipment Point", 'reserved', inventory)]
+
+    add_equipment_point("Another Point")
+    count = get_equipment_points(second_harvest)[1]
+
+    # the cost of the section does not grow with the number of equipment points
+    for name in ["Yet Another Point", "One More Point"]:
+        add_equipment_point(name)
+
+    points, more_points_count = get_equipment_points(second_harvest)
+    assert [(p[0], p[1]) for p in points] == [
+        ("Another Point", 'available'),
+        ("One More Point", 'available'),
+        ("Yet Another Point", 'available'),
+        (" Test Equipment Point", 'unavailable'),
+    ]
+    assert more_points_count == count
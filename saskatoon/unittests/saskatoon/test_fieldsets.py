@@ -0,0 +1,61 @@
+import json
+import pytest
+
+from harvest.models import Harvest, Property, TreeType
+from saskatoon.fieldsets import parse_fieldset
+
+# ruff tries to erase it because the weird way pytest applies
+# fixtures is not recognised.
+from unittests.member.fixtures import location  # noqa: F401
+
+
+def test_parse_fieldset() -> None:
+    assert parse_fieldset('id, property.title,property.owner,,trees.') == {
+        'id': {},
+        'property': {'title': {}, 'owner': {}},
+        'trees': {},
+    }
+
+
+@pytest.mark.django_db
+def test_harvest_sparse_fields(client_core_user, location) -> None:  # noqa: F811
+    property = Property.objects.create(neighborhood=location['neighborhood'])
+    harvest = Harvest.objects.create(property=property, status=Harvest.Status.SCHEDULED)
+    harvest.trees.set([TreeType.objects.create(name_en="Apple", name_fr="Pommier")])
+
+    def get_harvest(params: str):
+        response = client_core_user.get(f"/harvest/?format=json&{params}")
+        assert response.status_code == 200
+        return json.loads(response.content)['results'][0]
+
+    assert get_harvest('fields=id,status') == {'id': harvest.id, 'status': 'scheduled'}
+
+    # nested serializers are rendered as primary keys unless expanded
+    assert get_harvest('fields=id,property,trees')['property'] == property.id
+    assert get_harvest('fields=id,property,trees')['trees'] == [harvest.trees.get().id]
+    assert get_harvest('fields=id,property&expand=property')['property']['id'] == property.id
+    assert get_harvest('fields=property.id')['property'] == {'id': property.id}
+    assert get_harvest('expand=trees')['trees'][0]['name_en'] == "Apple"
+    assert get_harvest('expand=trees')['property'] == property.id
+
+    # the templates always get every field
+    response = client_core_user.get("/harvest/?fields=id")
+    assert response.status_code == 200
+    assert response.data['data'][0]['property']['id'] == property.id
+
+
+@pytest.mark.django_db
+def test_unrequested_fields_are_not_evaluated(
+    client_core_user,
+    location,  # noqa: F811
+    monkeypatch,
+) -> None:
+    def fail(*args, **kwargs):
+        raise AssertionError("evaluated")
+
+    monkeypatch.setattr('harvest.serializers.similar_properties', fail)
+    property = Property.objects.create(neighborhood=location['neighborhood'])
+
+    response = client_core_user.get(f"/property/{property.id}/?format=json&fields=id,title")
+    assert response.status_code == 200
+    assert json.loads(response.content) == {'id': property.id, 'title': str(property)}
@@ -0,0 +1,291 @@
+import json
+import pytest
+from datetime import datetime, timedelta, timezone
+from django.db.models import F
+
+from harvest.models import Equipment, EquipmentType, Harvest, Property, TreeType
+from member.models import AuthUser, Organization, Person
+from saskatoon.maps import (
+    BoundingBox,
+    cluster_locations,
+    filter_bbox,
+    filter_radius,
+    nearest,
+    parse_bbox,
+)
+
+# ruff tries to erase it because the weird way pytest applies
+# fixtures is not recognised.
+from unittests.member.fixtures import location  # noqa: F401
+
+
+def test_parse_bbox() -> None:
+    assert parse_bbox("-73.7,45.4,-73.5,45.6") == BoundingBox(-73.7, 45.4, -73.5, 45.6)
+    assert parse_bbox("") is None
+    assert parse_bbox("-73.7,45.4,-73.5") is None
+    assert parse_bbox("-73.7,45.6,-73.5,45.4") is None
+    assert parse_bbox("west,south,east,north") is None
+
+
+def test_bbox_around() -> None:
+    bbox = BoundingBox.around(45.5, -73.6, 10)
+    assert bbox.south == pytest.approx(45.41, abs=0.01)
+    assert bbox.north == pytest.approx(45.59, abs=0.01)
+    assert bbox.west == pytest.approx(-73.73, abs=0.01)
+    assert bbox.east == pytest.approx(-73.47, abs=0.01)
+
+    # the box crosses the antimeridian
+    bbox = BoundingBox.around(0, 179.95, 20)
+    assert bbox.west > 0 > bbox.east
+
+    assert BoundingBox.around(89.99, 0, 10)[::2] == (-180, 180)
+
+
+@pytest.mark.django_db
+def test_cluster_locations(location) -> None:  # noqa: F811
+    points = [
+        (45.5, -73.6, True),
+        (45.5001, -73.6001, False),
+        (45.5002, -73.6002, True),
+        (46.8, -71.2, False),
+    ]
+    properties = [
+        Property.objects.create(
+            neighborhood=location['neighborhood'],
+            pending=False,
+            authorized=authorized,
+            geom={'type': 'Point', 'coordinates': [longitude, latitude]},
+        )
+        for latitude, longitude, authorized in points
+    ]
+
+    located = Property.objects.all()
+    clusters, singles = cluster_locations(located, 10, status=Property.status_expression())
+    assert list(singles) == [properties[3]]
+    assert len(clusters) == 1
+    assert clusters[0]['count'] == 3
+    assert clusters[0]['status'] == Property.Status.AUTHORIZED
+    assert clusters[0]['bbox'] == pytest.approx([-73.6002, 45.5, -73.6, 45.5002])
+    assert clusters[0]['latitude'] == pytest.approx(45.5001)
+
+    # the cells shrink as the map zooms in
+    clusters, singles = cluster_locations(located, 20)
+    assert clusters == [] and sorted(p.id for p in singles) == [p.id for p in properties]
+
+    # harvests are located at their property
+    for property in properties[:2]:
+        Harvest.objects.create(property=property, status=Harvest.Status.ORPHAN)
+    clusters, singles = cluster_locations(Harvest.objects.all(), 10, 'property__', F('status'))
+    assert not singles.exists()
+    assert [(c['count'], c['status']) for c in clusters] == [(2, Harvest.Status.ORPHAN)]
+
+
+@pytest.mark.django_db
+def test_property_map_bbox(client_core_user, location) -> None:  # noqa: F811
+    for longitude, latitude in [(-73.6, 45.5), (-73.6001, 45.5001), (-71.2, 46.8)]:
+        Property.objects.create(
+            neighborhood=location['neighborhood'],
+            geom={'type': 'Point', 'coordinates': [longitude, latitude]},
+        )
+    Property.objects.create(neighborhood=location['neighborhood'])
+
+    def get_map(params: str):
+        response = client_core_user.get(f"/property/map?format=json&{params}")
+        assert response.status_code == 200
+        return json.loads(response.content)
+
+    assert len(get_map('')) == 4
+
+    montreal = get_map('bbox=-74,45,-73,46&zoom=18')
+    assert montreal['clusters'] == []
+    assert len(montreal['markers']) == 2
+    assert 'icon' in montreal['markers'][0]
+
+    province = get_map('bbox=-80,44,-70,50&zoom=8')
+    assert [cluster['count'] for cluster in province['clusters']] == [2]
+    assert len(province['markers']) == 1
+
+    # the template fetches the markers of the visible bounds
+    response = client_core_user.get("/property/map?pending=false")
+    assert response.status_code == 200
+    assert b'src="/property/map?pending=false"' in response.content
+    assert montreal['markers'][0]['popup_url'].startswith("/property/map/")
+
+
+@pytest.mark.django_db
+def test_coordinates_follow_geom(location) -> None:  # noqa: F811
+    property = Property.objects.create(
+        neighborhood=location['neighborhood'],
+        geom={'type': 'Point', 'coordinates': [-73.6, 45.5]},
+    )
+    assert (property.latitude, property.longitude) == (45.5, -73.6)
+
+    property.geom = None
+    property.save()
+    property.refresh_from_db()
+    assert (property.latitude, property.longitude) == (None, None)
+
+
+@pytest.mark.django_db
+def test_filter_location(location) -> None:  # noqa: F811
+    points = {
+        'mile-end': (45.5236, -73.6004),
+        'plateau': (45.5225, -73.5824),
+        'longueuil': (45.5369, -73.5107),
+        'quebec': (46.8139, -71.2080),
+    }
+    for name, (latitude, longitude) in points.items():
+        Organization.objects.create(
+            civil_name=name,
+            is_equipment_point=True,
+            geom={'type': 'Point', 'coordinates': [longitude, latitude]},
+            **location,
+        )
+    Organization.objects.create(civil_name="nowhere", is_beneficiary=True, **location)
+
+    equipment_points = Organization.objects.filter(is_equipment_point=True)
+    nearby = filter_radius(equipment_points, 45.5236, -73.6004, 2).order_by('distance')
+    assert [(o.civil_name, round(o.distance, 1)) for o in nearby] == [
+        ('mile-end', 0.0),
+        ('plateau', 1.4),
+    ]
+    assert filter_radius(Organization.objects.all(), 45.5236, -73.6004, 10).count() == 3
+
+    montreal = BoundingBox(-73.7, 45.4, -73.59, 45.6)
+    assert [o.civil_name for o in filter_bbox(Organization.objects.all(), montreal)] == [
+        'mile-end',
+    ]
+
+    property = Property.objects.create(
+        neighborhood=location['neighborhood'],
+        geom={'type': 'Point', 'coordinates': [-71.2, 46.8]},
+    )
+    harvest = Harvest.objects.create(property=property)
+    quebec = BoundingBox(-72, 46, -71, 47)
+    assert list(filter_bbox(Property.objects.all(), quebec)) == [property]
+    assert list(filter_bbox(Harvest.objects.all(), quebec, 'property__')) == [harvest]
+    assert not filter_bbox(Harvest.objects.all(), montreal, 'property__').exists()
+
+
+def create_organization(location, name, latitude, longitude, **kwargs) -> Organization:
+    return Organization.objects.create(
+        civil_name=name,
+        geom={'type': 'Point', 'coordinates': [longitude, latitude]},
+        **location,
+        **kwargs,
+    )
+
+
+@pytest.mark.django_db
+def test_nearest(location) -> None:  # noqa: F811
+    create_organization(location, 'mile-end', 45.5236, -73.6004)
+    create_organization(location, 'plateau', 45.5225, -73.5824)
+    create_organization(location, 'quebec', 46.8139, -71.2080)
+    create_organization(location, 'paris', 48.8566, 2.3522)
+    Organization.objects.create(civil_name="nowhere", **location)
+
+    organizations = Organization.objects.all()
+    names = [o.civil_name for o in nearest(organizations, 45.5, -73.6, 3)]
+    assert names == ['mile-end', 'plateau', 'quebec']
+
+    # farther than the widest search circle
+    found = nearest(organizations, 45.5, -73.6, 10)
+    assert [o.civil_name for o in found] == ['mile-end', 'plateau', 'quebec', 'paris']
+    assert found[-1].distance == pytest.approx(5510, abs=10)
+
+
+@pytest.mark.django_db
+def test_harvest_nearest_organizations(client_core_user, location) -> None:  # noqa: F811
+    start = datetime(2025, 7, 1, 10, tzinfo=timezone.utc)
+    property = Property.objects.create(
+        neighborhood=location['neighborhood'],
+        geom={'type': 'Point', 'coordinates': [-73.6, 45.5]},
+    )
+    harvest = Harvest.objects.create(
+        property=property,
+        status=Harvest.Status.SCHEDULED,
+        start_date=start,
+        end_date=start + timedelta(hours=3),
+    )
+
+    reserved = create_organization(location, 'reserved', 45.501, -73.6, is_equipment_point=True)
+    create_organization(location, 'available', 45.51, -73.6, is_equipment_point=True)
+    create_organization(location, 'far', 46.8, -71.2, is_equipment_point=True)
+    create_organization(location, 'food bank', 45.52, -73.6, is_beneficiary=True)
+
+    other = Harvest.objects.create(
+        property=property,
+        status=Harvest.Status.READY,
+        start_date=start,
+        end_date=start + timedelta(hours=2),
+    )
+    equipment_type = EquipmentType.objects.create(name_fr="Échelle")
+    other.equipment_reserved.set(
+        [Equipment.objects.create(type=equipment_type, owner=reserved, shared=True)]
+    )
+
+    response = client_core_user.get(f"/harvest/{harvest.id}/nearest_organizations/?limit=1")
+    assert response.status_code == 200
+    data = json.loads(response.content)
+    assert [o['civil_name'] for o in data['equipment_points']] == ['available']
+    assert data['equipment_points'][0]['distance'] == pytest.approx(1.11, abs=0.01)
+    assert [o['civil_name'] for o in data['beneficiaries']] == ['food bank']
+
+
+@pytest.mark.django_db
+def test_marker_popups(
+    client_core_user,
+    location,  # noqa: F811
+    django_assert_max_num_queries,
+) -> None:
+    start = datetime(2025, 7, 1, 10, tzinfo=timezone.utc)
+    tree = TreeType.objects.create(name_en="Apple", fruit_name_en="Apple", fruit_name_fr="Pomme")
+    owner = Person.objects.create(first_name="Owner", phone="514-555-1234", **location)
+    leader = AuthUser.objects.create_user(email="leader@user.com", password="password1234")
+    leader.person = Person.objects.create(first_name="Leader", **location)
+    leader.save()
+    property = Property.objects.create(owner=owner, neighborhood=location['neighborhood'])
+    property.trees.set([tree])
+
+    point = create_organization(location, 'point', 45.5, -73.6, is_equipment_point=True)
+    equipment_type = EquipmentType.objects.create(name_fr="Échelle")
+    equipment = Equipment.objects.create(type=equipment_type, owner=point, shared=True)
+
+    def add_harvest(day: int) -> Harvest:
+        harvest = Harvest.objects.create(
+            property=property,
+            pick_leader=leader,
+            status=Harvest.Status.SCHEDULED,
+            start_date=start + timedelta(days=day),
+            end_date=start + timedelta(days=day, hours=3),
+        )
+        harvest.trees.set([tree])
+        harvest.equipment_reserved.set([equipment])
+        return harvest
+
+    harvest = add_harvest(0)
+    response = client_core_user.get(f"/harvest/map/{harvest.id}?format=json")
+    data = json.loads(response.content)
+    assert data['pick_leader']['name'] == "Leader"
+    assert data['property']['neighborhood']['name'] == location['neighborhood'].name
+    assert data['equipment_point'] == {'actor_id': point.actor_id, 'civil_name': 'point'}
+
+    response = client_core_user.get(f"/property/map/{property.id}")
+    assert response.status_code == 200
+    assert b"Equipment" not in response.content
+
+    # the cost of a pop-up does not grow with the harvests of the property
+    for day in range(1, 6):
+        add_harvest(day)
+
+    with django_assert_max_num_queries(8):
+        response = client_core_user.get(f"/property/map/{property.id}?format=json")
+    data = json.loads(response.content)
+    assert data['owner'] == {'name': "Owner", 'phone': "(514) 555-1234", 'email': None}
+    assert len(data['harvests']) == 6
+    assert data['harvests'][0]['trees'] == data['trees']
+
+    with django_assert_max_num_queries(8):
+        response = client_core_user.get(f"/harvest/map/{harvest.id}")
+    assert response.status_code == 200
+    assert b"Equipment Point Reservation" in response.content
@@ -0,0 +1,132 @@
+import json
+import pytest
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from harvest.models import Harvest, Property
+from member.models import AuthUser
+from saskatoon import pagination
+from sitebase.cache import CountCache
+
+# ruff tries to erase it because the weird way pytest applies
+# fixtures is not recognised.
+from unittests.member.fixtures import location  # noqa: F401
+
+
+def get_page(client, url: str) -> Dict[str, Any]:
+    response = client.get(url)
+    assert response.status_code == 200
+    return json.loads(response.content)
+
+
+def walk(client, url: str, link: str) -> List[List[int]]:
+    pages = []
+    next_url: Optional[str] = url
+    while next_url is not None:
+        page = get_page(client, next_url)
+        pages.append([harvest['id'] for harvest in page['results']])
+        next_url = page[link]
+    return pages
+
+
+@pytest.mark.django_db
+def test_harvest_cursor_pagination(client_core_user, location) -> None:  # noqa: F811
+    start = datetime(2024, 7, 1, 10, tzinfo=timezone.utc)
+    property = Property.objects.create(neighborhood=location['neighborhood'])
+    # ties and unscheduled harvests are ordered by the id tiebreaker
+    for days in [0, 0, 0, 1, 2, 2, 3, None, None, 4]:
+        Harvest.objects.create(
+            property=property,
+            start_date=None if days is None else start + timedelta(days=days),
+        )
+
+    expected = list(
+        Harvest.objects.order_by('-start_date', '-id')
+        .exclude(start_date=None)
+        .values_list('id', flat=True)
+    ) + list(Harvest.objects.filter(start_date=None).order_by('-id').values_list('id', flat=True))
+
+    first = get_page(client_core_user, "/harvest/?format=json&cursor=&page_size=3&count=true")
+    assert first['count'] == 10
+    assert first['previous'] is None
+    assert first['pages_count'] is None
+
+    pages = walk(client_core_user, "/harvest/?format=json&cursor=&page_size=3", 'next')
+    assert [len(page) for page in pages] == [3, 3, 3, 1]
+    assert sum(pages, []) == expected
+
+    last = get_page(client_core_user, "/harvest/?format=json&cursor=&page_size=3")
+    while last['next'] is not None:
+        last = get_page(client_core_user, last['next'])
+    assert last['count'] is None
+
+    back = walk(client_core_user, last['previous'], 'previous')
+    assert sum(reversed(back), []) + [h['id'] for h in last['results']] == expected
+
+    response = client_core_user.get("/harvest/?cursor=&page_size=3")
+    assert response.status_code == 200
+    assert 'id="next-button"' in response.content.decode()
+
+
+@pytest.mark.parametrize("endpoint", ['property', 'community', 'equipment', 'participation'])
+@pytest.mark.django_db
+def test_cursor_pagination_endpoints(client_core_user, endpoint) -> None:
+    page = get_page(client_core_user, f"/{endpoint}/?format=json&cursor=&count=true")
+    assert page['count'] == len(page['results'])
+    assert page['next'] is None
+
+
+@pytest.mark.django_db
+def test_invalid_cursor(client_core_user) -> None:
+    response = client_core_user.get("/harvest/?format=json&cursor=notacursor")
+    assert response.status_code == 404
+
+
+@pytest.mark.django_db
+def test_cached_count(client_core_user, location) -> None:  # noqa: F811
+    property = Property.objects.create(neighborhood=location['neighborhood'])
+    for _ in range(3):
+        Harvest.objects.create(property=property, status=Harvest.Status.SCHEDULED)
+
+    assert get_page(client_core_user, "/harvest/?format=json")['count'] == 3
+    assert get_page(client_core_user, "/harvest/?format=json&status=orphan")['count'] == 0
+
+    # bulk inserts do not send signals: the cached counts are kept until the next write
+    Harvest.objects.bulk_create([Harvest(property=property, status=Harvest.Status.ORPHAN)])
+    assert get_page(client_core_user, "/harvest/?format=json&page=1")['count'] == 3
+    assert get_page(client_core_user, "/harvest/?format=json&status=orphan")['count'] == 0
+
+    Harvest.objects.create(property=property, status=Harvest.Status.ORPHAN)
+    assert get_page(client_core_user, "/harvest/?format=json")['count'] == 5
+    assert get_page(client_core_user, "/harvest/?format=json&status=orphan")['count'] == 2
+
+
+@pytest.mark.django_db
+def test_cached_count_kept_on_login(client_core_user) -> None:
+    get_page(client_core_user, "/community/?format=json")
+    version = CountCache.get_version(AuthUser)
+
+    # logins only save last_login
+    client_core_user.force_login(AuthUser.objects.get())
+    assert CountCache.get_version(AuthUser) == version
+
+    AuthUser.objects.create_user(email="new@user.com", password="password1234")
+    assert CountCache.get_version(AuthUser) != version
+
+
+@pytest.mark.django_db
+def test_estimated_count(client_core_user, location, monkeypatch) -> None:  # noqa: F811
+    monkeypatch.setattr(pagination, 'COUNT_ESTIMATE_THRESHOLD', 1000)
+    monkeypatch.setattr(pagination, 'estimate_count', lambda model: 1234)
+    Property.objects.create(neighborhood=location['neighborhood'])
+
+    page = get_page(client_core_user, "/property/?format=json")
+    assert page['count'] == 1234
+    assert page['pages_count'] == 124
+    assert page['items_per_page'] == 10
+
+    # filtered lists are always counted
+    page = get_page(
+        client_core_user, f"/property/?format=json&neighborhood={location['neighborhood'].id}"
+    )
+    assert page['count'] == 1
@@ -0,0 +1,451 @@
+import pytest
+import time
+from datetime import timedelta
+from django.core import mail
+from django.core.management import call_command
+from django.db.models import QuerySet
+from django.utils import timezone as tz
+from typing import List
+
+from harvest.models import Comment, Harvest, Property, RequestForParticipation
+from member.models import AuthUser, Person
+from sitebase.models import Email, EmailContent, EmailType, Notification
+
+# ruff tries to erase it because the weird way pytest applies
+# fixtures is not recognised.
+from unittests.member.fixtures import location  # noqa: F401
+
+
+@pytest.fixture
+def outbox(monkeypatch) -> None:
+    monkeypatch.setattr('sitebase.models.EMAIL_OUTBOX', True)
+    monkeypatch.setattr('sitebase.models.EMAIL_HOST', "smtp.test")
+
+
+def create_email(location) -> Email:  # noqa: F811
+    user = AuthUser.objects.create_user(email="leader@test.com", password="password1234")
+    user.person = Person.objects.create(first_name="Leader", **location)
+    user.save()
+    return Email.objects.create(recipient=user.person, type=EmailType.NEW_HARVEST_COMMENT)
+
+
+@pytest.mark.django_db
+def test_email_outbox(outbox, location) -> None:  # noqa: F811
+    email = create_email(location)
+    assert email.send(data={'comment': "Ripe!"})
+    assert len(mail.outbox) == 0
+
+    email.refresh_from_db()
+    assert not email.sent and email.next_attempt is not None
+    assert email.data == {'comment': "Ripe!"}
+
+    assert Email.deliver_pending() == [True]
+    assert len(mail.outbox) == 1
+    assert mail.outbox[0].to == ["leader@test.com"]
+
+    delivered = Email.objects.get(id=email.id)
+    assert delivered.sent and delivered.attempts == 1 and delivered.next_attempt is None
+    assert Email.deliver_pending() == []
+
+
+@pytest.mark.django_db
+def test_email_outbox_retries(outbox, location, monkeypatch) -> None:  # noqa: F811
+    def fail(*args, **kwargs):
+        raise ConnectionError("SMTP server unavailable")
+
+    monkeypatch.setattr('sitebase.models.EMAIL_OUTBOX_MAX_ATTEMPTS', 3)
+    monkeypatch.setattr('sitebase.models.EmailMessage.send', fail)
+    email = create_email(location)
+    email.send()
+
+    delays = []
+    for _attempt in range(3):
+        before = tz.now()
+        assert Email.deliver_pending() == [False]
+        # not due before the backoff delay
+        assert Email.deliver_pending() == []
+
+        email.refresh_from_db()
+        if email.next_attempt is not None:
+            delays.append(round((email.next_attempt - before).total_seconds() / 60))
+            Email.objects.filter(id=email.id).update(next_attempt=tz.now())
+
+    assert delays == [1, 2]
+    assert email.attempts == 3 and not email.sent
+    assert "SMTP server unavailable" in email.log
+
+
+@pytest.mark.django_db
+def test_email_resend_outbox(outbox, location) -> None:  # noqa: F811
+    email = create_email(location)
+    email.send(message="Ripe!")
+    Email.deliver_pending()
+    email.refresh_from_db()
+    assert email.sent and email.attempts == 1
+
+    # the copy is queued afresh, not as an already delivered email
+    original_id = email.id
+    assert email.resend()
+    copy = Email.objects.latest('id')
+    assert copy.id != original_id
+    assert not copy.sent and copy.date_sent is None and copy.attempts == 0
+    assert copy.duplicate_of is None and copy.next_attempt is not None
+
+    assert Email.deliver_pending() == [True]
+    assert len(mail.outbox) == 2
+
+
+@pytest.mark.django_db
+def test_claimed_emails_are_not_delivered_twice(outbox, location) -> None:  # noqa: F811
+    create_email(location).send()
+    assert len(Email.claim_pending(10)) == 1
+    assert Email.claim_pending(10) == []
+
+    # unless the worker that claimed them did not deliver them in time
+    Email.objects.update(next_attempt=tz.now() - timedelta(seconds=1))
+    assert len(Email.claim_pending(10)) == 1
+
+
+@pytest.mark.django_db
+def test_run_email_worker(outbox, location) -> None:  # noqa: F811
+    create_email(location).send()
+    call_command('run_email_worker', '--once', '--concurrency', '1')
+    assert len(mail.outbox) == 1
+    assert Email.objects.get().sent
+
+
+def create_emails(location, count: int) -> List[Email]:  # noqa: F811
+    emails = []
+    for i in range(count):
+        user = AuthUser.objects.create_user(email=f"owner{i}@test.com", password="password1234")
+        user.person = Person.objects.create(first_name=f"Owner {i}", **location)
+        user.save()
+        emails.append(Email(recipient=user.person, type=EmailType.SEASON_AUTHORIZATION))
+    return emails
+
+
+@pytest.mark.django_db
+def test_send_many(location, monkeypatch) -> None:  # noqa: F811
+    connections = []
+    get_connection = mail.get_connection
+
+    def count_connections(*args, **kwargs):
+        connections.append(get_connection(*args, **kwargs))
+        return connections[-1]
+
+    original_send = mail.EmailMessage.send
+
+    def fail_once(message, *args, **kwargs):
+        if message.to == ["owner2@test.com"]:
+            raise ConnectionError("Mailbox unavailable")
+        return original_send(message, *args, **kwargs)
+
+    monkeypatch.setattr('sitebase.models.EMAIL_HOST', "smtp.test")
+    monkeypatch.setattr('sitebase.models.EMAIL_BULK_CHUNK_SIZE', 3)
+    monkeypatch.setattr('sitebase.models.get_connection', count_connections)
+    monkeypatch.setattr('sitebase.models.EmailMessage.send', fail_once)
+
+    emails = create_emails(location, 5)
+    assert Email.send_many(emails) == [True, True, False, True, True]
+    assert len(connections) == 2
+    assert sorted(m.to[0] for m in mail.outbox) == [f"owner{i}@test.com" for i in (0, 1, 3, 4)]
+    assert Email.objects.filter(sent=True).count() == 4
+    failed = Email.objects.get(sent=False)
+    assert failed.recipient.email == "owner2@test.com"
+    assert "Mailbox unavailable" in failed.log
+
+
+@pytest.mark.django_db
+def test_send_many_outbox(outbox, location, monkeypatch) -> None:  # noqa: F811
+    monkeypatch.setattr('sitebase.models.EMAIL_BULK_CHUNK_SIZE', 2)
+    assert Email.send_many(create_emails(location, 3)) == [True] * 3
+    assert len(mail.outbox) == 0
+
+    assert Email.deliver_pending() == [True] * 3
+    assert len(mail.outbox) == 3
+    assert Email.objects.filter(sent=True, attempts=1, next_attempt=None).count() == 3
+
+
+@pytest.fixture
+def no_bulk_insert_ids(monkeypatch) -> None:
+    """Bulk inserts do not return the ids on every database backend (MySQL)"""
+    bulk_create = QuerySet.bulk_create
+
+    def bulk_create_without_ids(self, objs, *args, **kwargs):
+        created = bulk_create(self, objs, *args, **kwargs)
+        for obj in created:
+            obj.pk = None
+        return created
+
+    monkeypatch.setattr(QuerySet, 'bulk_create', bulk_create_without_ids)
+
+
+@pytest.mark.django_db
+def test_send_many_without_bulk_insert_ids(location, monkeypatch, no_bulk_insert_ids) -> None:  # noqa: F811
+    monkeypatch.setattr('sitebase.models.EMAIL_HOST', "smtp.test")
+    emails = create_emails(location, 3)
+    assert Email.send_many(emails) == [True] * 3
+    assert Email.objects.filter(sent=True).count() == 3
+
+    monkeypatch.setattr('sitebase.models.EMAIL_OUTBOX', True)
+    again = [Email(recipient=e.recipient, type=e.type) for e in emails[:2]]
+    assert Email.send_many(again) == [True] * 2
+    assert Email.deliver_pending() == [True] * 2
+    assert len(mail.outbox) == 5
+
+
+@pytest.mark.django_db
+def test_send_in_background(
+    location, monkeypatch, no_bulk_insert_ids, django_capture_on_commit_callbacks
+) -> None:  # noqa: F811
+    class Thread:
+        def __init__(self, target, daemon):
+            self.target = target
+
+        def start(self):
+            self.target()
+
+    monkeypatch.setattr('sitebase.models.EMAIL_HOST', "smtp.test")
+    monkeypatch.setattr('sitebase.models.Thread', Thread)
+    with django_capture_on_commit_callbacks(execute=True):
+        assert Email.send_in_background(create_emails(location, 3)) == 3
+        # delivered once the transaction is committed
+        assert len(mail.outbox) == 0
+
+    assert len(mail.outbox) == 3
+    assert Email.objects.filter(sent=True, attempts=1, next_attempt=None).count() == 3
+
+
+@pytest.mark.django_db
+def test_deliver_in_background_retries(location, monkeypatch) -> None:  # noqa: F811
+    original_send = mail.EmailMessage.send
+    failures: List[str] = []
+
+    def fail_once(message, *args, **kwargs):
+        if message.to == ["owner1@test.com"] and not failures:
+            failures.append(message.to[0])
+            raise ConnectionError("Mailbox unavailable")
+        return original_send(message, *args, **kwargs)
+
+    delays = []
+
+    def sleep(seconds):
+        # wakes up once the failed email is due again
+        delays.append(seconds)
+        Email.objects.filter(sent=False).update(next_attempt=tz.now())
+
+    monkeypatch.setattr('sitebase.models.EMAIL_HOST', "smtp.test")
+    monkeypatch.setattr('sitebase.models.EmailMessage.send', fail_once)
+    monkeypatch.setattr('sitebase.models.time.sleep', sleep)
+    Email.queue_many(create_emails(location, 3))
+
+    Email.deliver_in_background()
+    assert len(delays) == 1 and 0 < delays[0] <= 60
+    assert len(mail.outbox) == 3
+    assert Email.objects.filter(sent=True, next_attempt=None).count() == 3
+
+
+@pytest.mark.django_db
+def test_deliver_pending_records_each_email(outbox, location, monkeypatch) -> None:  # noqa: F811
+    original_send = mail.EmailMessage.send
+
+    def crash_on_third(message, *args, **kwargs):
+        if len(mail.outbox) == 2:
+            raise SystemExit("worker killed")
+        return original_send(message, *args, **kwargs)
+
+    monkeypatch.setattr('sitebase.models.EmailMessage.send', crash_on_third)
+    Email.send_many(create_emails(location, 4))
+    with pytest.raises(SystemExit):
+        Email.deliver_pending()
+
+    # the emails sent before the crash are not sent again
+    assert Email.objects.filter(sent=True, next_attempt=None).count() == 2
+
+
+@pytest.mark.django_db
+def test_extend_claim(outbox, location) -> None:  # noqa: F811
+    Email.send_many(create_emails(location, 3))
+    claimed = Email.claim_pending(10)
+
+    # the claim of the last one expired and another worker claimed it again
+    Email.objects.filter(id=claimed[2].id).update(next_attempt=tz.now() + timedelta(hours=1))
+    assert Email.extend_claim(claimed) == claimed[:2]
+    assert Email.objects.filter(next_attempt__gt=tz.now() + timedelta(minutes=9)).count() == 3
+
+
+@pytest.mark.django_db
+def test_email_templates(location, django_assert_num_queries) -> None:  # noqa: F811
+    EmailContent.objects.create(type=EmailType.GENERIC_CLOSING, body_en="Cheers", body_fr="Merci")
+    EmailContent.objects.create(
+        type=EmailType.SEASON_AUTHORIZATION,
+        subject_en="Harvest at {property_address}",
+        subject_fr="Récolte au {property_address}",
+        body_en="Season {year}",
+        body_fr="Saison {year}",
+    )
+    emails = create_emails(location, 3)
+    emails[0].get_subject({'property_address': ""})
+
+    # contents are only loaded once
+    with django_assert_num_queries(0):
+        for email in emails:
+            assert email.get_subject({'property_address': "1 Main"}) == (
+                "[Les Fruits Défendus] Récolte au 1 Main"
+            )
+            message = email.get_default_message({'year': "2026"})
+            assert "Season 2026\n\n\nCheers" in message
+            assert "Saison 2026\n\n\nMerci" in message
+
+    # and reloaded when one changes
+    EmailContent.objects.filter(type=EmailType.GENERIC_CLOSING).get().delete()
+    closing = EmailContent.get(EmailType.GENERIC_CLOSING)
+    closing.body_en = "Bye"
+    closing.save()
+    assert "Season 2026\n\n\nBye" in emails[0].get_default_message({'year': "2026"})
+
+
+@pytest.mark.django_db
+def test_email_templates_expire(location, monkeypatch) -> None:  # noqa: F811
+    monkeypatch.setattr('sitebase.models.EMAIL_TEMPLATE_CACHE_TIMEOUT', 1)
+    EmailContent.objects.create(type=EmailType.GENERIC_CLOSING)
+    EmailContent.objects.create(type=EmailType.SEASON_AUTHORIZATION, subject_fr="Saison")
+    email = create_emails(location, 1)[0]
+    assert email.get_subject({}) == "[Les Fruits Défendus] Saison"
+
+    # edited by another process, whose cache backend is not shared
+    EmailContent.objects.filter(type=EmailType.SEASON_AUTHORIZATION).update(subject_fr="Récolte")
+    assert email.get_subject({}) == "[Les Fruits Défendus] Saison"
+
+    # reloaded once the registry version expires
+    time.sleep(1.1)
+    assert email.get_subject({}) == "[Les Fruits Défendus] Récolte"
+
+
+@pytest.mark.django_db
+def test_duplicate_emails(location) -> None:  # noqa: F811
+    now = tz.now()
+    emails = create_emails(location, 2)
+    first, other = (e.recipient for e in emails)
+    Email.objects.bulk_create(
+        [
+            Email(recipient=first, type=EmailType.REGISTRATION, body="Hi", date_sent=now),
+            # same email again
+            Email(recipient=first, type=EmailType.REGISTRATION, body="Hi", date_sent=now),
+            Email(recipient=first, type=EmailType.REGISTRATION, body="Hi", date_sent=now),
+            # another recipient, body or a second later
+            Email(recipient=other, type=EmailType.REGISTRATION, body="Hi", date_sent=now),
+            Email(recipient=other, type=EmailType.REGISTRATION, body="Yo", date_sent=now),
+            Email(
+                recipient=other,
+                type=EmailType.REGISTRATION,
+                body="Yo",
+                date_sent=now + timedelta(seconds=1),
+            ),
+        ]
+    )
+    ids = list(Email.objects.order_by('id').values_list('id', flat=True))
+    assert [e.id for e in Email.get_duplicates()] == ids[1:3]
+    assert [e.id for e in Email.get_duplicates(ids[2])] == ids[2:3]
+    assert [Email.objects.get(id=id).is_duplicate for id in ids] == [
+        False,
+        True,
+        True,
+        False,
+        False,
+        False,
+    ]
+
+    call_command('clean_duplicate_emails')
+    assert dict(Email.objects.exclude(duplicate_of=None).values_list('id', 'duplicate_of')) == {
+        ids[1]: ids[0],
+        ids[2]: ids[1],
+    }
+
+    call_command('clean_duplicate_emails', '--delete')
+    assert not Email.objects.filter(id__in=ids[1:3]).exists()
+    assert Email.objects.count() == 4
+
+
+@pytest.mark.django_db
+def test_duplicates_marked_when_sent(location) -> None:  # noqa: F811
+    recipient = create_emails(location, 1)[0].recipient
+    emails = [Email(recipient=recipient, type=EmailType.REGISTRATION) for _i in range(2)]
+    Email.send_many(emails)
+    assert [e.duplicate_of for e in Email.objects.order_by('id')] == [None, emails[0]]
+
+
+@pytest.mark.django_db
+def test_notification_digest(location, monkeypatch) -> None:  # noqa: F811
+    monkeypatch.setattr('sitebase.models.EMAIL_HOST', "smtp.test")
+    for type, body in [
+        (EmailType.NEW_HARVEST_RFP, "{rfp_name} wants to pick #{harvest_id}"),
+        (EmailType.NEW_HARVEST_COMMENT, "{comment_author} says {comment_content}"),
+        (EmailType.NOTIFICATION_DIGEST, "{digest_count} events:\n{digest_fr}"),
+    ]:
+        EmailContent.objects.create(type=type, subject_fr="{recipient_name}", body_fr=body)
+
+    leader = AuthUser.objects.create_user(email="leader@test.com", password="password1234")
+    leader.person = Person.objects.create(
+        first_name="Leader", notifications=Person.Notifications.DIGEST, **location
+    )
+    leader.save()
+    picker = Person.objects.create(first_name="Picker", **location)
+    harvest = Harvest.objects.create(
+        status=Harvest.Status.SCHEDULED,
+        pick_leader=leader,
+        property=Property.objects.create(neighborhood=location['neighborhood']),
+    )
+
+    RequestForParticipation.objects.create(harvest=harvest, person=picker, number_of_pickers=2)
+    Comment.objects.create(
+        harvest=harvest, author=create_emails(location, 1)[0].recipient.auth_user, content="Ripe!"
+    )
+    assert len(mail.outbox) == 0
+    assert Notification.objects.count() == 2
+
+    # not before the digest interval
+    assert Notification.send_digests(60) == []
+    Notification.objects.update(date_created=tz.now() - timedelta(minutes=61))
+    assert Notification.send_digests(60) == [True]
+    assert Notification.objects.count() == 0
+
+    assert len(mail.outbox) == 1
+    assert mail.outbox[0].to == ["leader@test.com"]
+    assert mail.outbox[0].body.startswith(
+        f"* * English version follows * *\n\nBonjour Leader,\n\n2 events:\n"
+        f"Picker wants to pick #{harvest.id}\n\n- - -\n\nOwner 0 says Ripe!"
+    )
+
+    # immediate notifications remain the default
+    leader.person.notifications = Person.Notifications.IMMEDIATE
+    leader.person.save()
+    RequestForParticipation.objects.create(harvest=harvest, person=picker, number_of_pickers=1)
+    assert len(mail.outbox) == 2
+    assert Notification.objects.count() == 0
+
+
+@pytest.mark.django_db
+def test_notification_digest_retried(location, monkeypatch) -> None:  # noqa: F811
+    recipient = create_emails(location, 1)[0].recipient
+    harvest = Harvest.objects.create(
+        property=Property.objects.create(neighborhood=location['neighborhood'])
+    )
+    Notification.objects.create(
+        recipient=recipient, type=EmailType.NEW_HARVEST_COMMENT, harvest=harvest
+    )
+    Notification.objects.update(date_created=tz.now() - timedelta(minutes=61))
+
+    # claimed by an overlapping run
+    assert list(Notification.claim_due(60)) == [recipient]
+    assert Notification.claim_due(60) == {}
+    Notification.objects.update(claimed_until=None)
+
+    # kept when the digest could not be sent
+    assert Notification.send_digests(60) == [False]
+    assert Notification.objects.get().claimed_until is None
+
+    monkeypatch.setattr('sitebase.models.EMAIL_HOST', "smtp.test")
+    assert Notification.send_digests(60) == [True]
+    assert Notification.objects.count() == 0
+    assert len(mail.outbox) == 1
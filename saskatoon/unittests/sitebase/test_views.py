@@ -0,0 +1,147 @@
+import json
+import pytest
+from datetime import datetime, timedelta, timezone
+from django.urls import reverse
+
+from harvest.models import Harvest, HarvestYield, Property, RequestForParticipation, TreeType
+from member.models import Organization, Person
+from sitebase.cache import BeneficiaryCache, CalendarCache
+from sitebase.utils import calendar_lookback_start
+
+# ruff tries to erase it because the weird way pytest applies
+# fixtures is not recognised.
+from unittests.member.fixtures import location  # noqa: F401
+
+
+def create_harvest(location, tree: TreeType, start: datetime) -> Harvest:  # noqa: F811
+    harvest = Harvest.objects.create(
+        status=Harvest.Status.SCHEDULED,
+        property=Property.objects.create(neighborhood=location['neighborhood']),
+        start_date=start,
+        end_date=start + timedelta(hours=2),
+    )
+    harvest.trees.set([tree])
+    return harvest
+
+
+@pytest.mark.django_db
+def test_json_calendar_query_count(
+    client,
+    location,
+    django_assert_num_queries,
+    django_capture_on_commit_callbacks,  # noqa: F811
+) -> None:
+    start = datetime(2024, 7, 1, 14, tzinfo=timezone.utc)
+    window = {'start': "2024-06-01T00:00:00Z", 'end': "2024-08-01T00:00:00Z"}
+    tree = TreeType.objects.create(name_en="Apple", fruit_name_en="Apple", fruit_name_fr="Pomme")
+    person = Person.objects.create(first_name="Picker", **location)
+
+    harvest = create_harvest(location, tree, start)
+    RequestForParticipation.objects.create(harvest=harvest, person=person, number_of_pickers=2)
+    RequestForParticipation.objects.create(harvest=harvest, person=person, number_of_pickers=3)
+    HarvestYield.objects.create(harvest=harvest, tree=tree, total_in_lb=4.5, recipient=person)
+    HarvestYield.objects.create(harvest=harvest, tree=tree, total_in_lb=2, recipient=person)
+
+    # harvests, trees
+    with django_assert_num_queries(2):
+        events = json.loads(client.get(reverse('calendarJSON'), window).content)
+
+    assert events[0]['title'] == "Pomme / Apple — Test Hood"
+    assert events[0]['extendedProps']['nb_requests'] == 5
+    assert events[0]['extendedProps']['total_harvested'] == 6.5
+
+    with django_capture_on_commit_callbacks(execute=True):
+        for day in range(1, 5):
+            create_harvest(location, tree, start + timedelta(days=day))
+
+    with django_assert_num_queries(2):
+        events = json.loads(client.get(reverse('calendarJSON'), window).content)
+
+    assert len(events) == 5
+    assert [e['extendedProps']['nb_requests'] for e in events[:4]] == [0, 0, 0, 0]
+    assert [e['extendedProps']['total_harvested'] for e in events[:4]] == [0, 0, 0, 0]
+
+
+@pytest.mark.django_db
+def test_json_calendar_cache(
+    client,
+    location,
+    django_assert_num_queries,
+    django_capture_on_commit_callbacks,  # noqa: F811
+) -> None:
+    start = datetime(2024, 7, 1, 14, tzinfo=timezone.utc)
+    june = {'start': "2024-06-01T00:00:00Z", 'end': "2024-07-01T00:00:00Z"}
+    july = {'start': "2024-07-01T00:00:00Z", 'end': "2024-08-01T00:00:00Z"}
+    tree = TreeType.objects.create(name_en="Apple", fruit_name_en="Apple", fruit_name_fr="Pomme")
+    harvest = create_harvest(location, tree, start)
+
+    assert client.get(reverse('calendarJSON'), june).content == b"[]"
+    content = client.get(reverse('calendarJSON'), july).content
+
+    with django_assert_num_queries(0):
+        assert client.get(reverse('calendarJSON'), july).content == content
+    assert CalendarCache.get_counters() == {'hits': 1, 'misses': 2}
+
+    # only the window overlapping the harvest is invalidated, once committed
+    with django_capture_on_commit_callbacks(execute=True):
+        harvest.nb_required_pickers = 5
+        harvest.save()
+        with django_assert_num_queries(0):
+            assert client.get(reverse('calendarJSON'), july).content == content
+
+    with django_assert_num_queries(0):
+        assert client.get(reverse('calendarJSON'), june).content == b"[]"
+
+    events = json.loads(client.get(reverse('calendarJSON'), july).content)
+    assert events[0]['extendedProps']['nb_required_pickers'] == 5
+    assert CalendarCache.get_counters() == {'hits': 3, 'misses': 3}
+
+
+@pytest.mark.django_db
+def test_json_calendar_unscheduled_harvests(
+    client_core_user,
+    location,
+    django_capture_on_commit_callbacks,  # noqa: F811
+) -> None:
+    tree = TreeType.objects.create(name_en="Apple", fruit_name_en="Apple", fruit_name_fr="Pomme")
+    window = {'start': "2001-06-01T00:00:00Z", 'end': "2001-07-01T00:00:00Z"}
+    season_start = calendar_lookback_start()
+
+    current = create_harvest(location, tree, season_start + timedelta(days=1))
+    previous = create_harvest(location, tree, season_start - timedelta(days=30))
+    Harvest.objects.filter(id__in=[current.id, previous.id]).update(status=Harvest.Status.ORPHAN)
+
+    events = json.loads(client_core_user.get(reverse('calendarJSON'), window).content)
+    assert [e['extendedProps']['harvest_id'] for e in events] == [current.id]
+
+    # a change on an unscheduled harvest renews every window of the logged-in users
+    previous.refresh_from_db()
+    previous.start_date = season_start + timedelta(days=2)
+    previous.end_date = season_start + timedelta(days=3)
+    with django_capture_on_commit_callbacks(execute=True):
+        previous.save()
+
+    events = json.loads(client_core_user.get(reverse('calendarJSON'), window).content)
+    assert {e['extendedProps']['harvest_id'] for e in events} == {current.id, previous.id}
+
+
+@pytest.mark.django_db
+def test_beneficiary_cache(location, django_assert_num_queries) -> None:  # noqa: F811
+    food_bank = Organization.objects.create(
+        civil_name="Food Bank", is_beneficiary=True, **location
+    )
+    Organization.objects.create(civil_name="Equipment", is_equipment_point=True, **location)
+
+    expected = [{'actor_id': food_bank.actor_id, 'civil_name': "Food Bank"}]
+    assert BeneficiaryCache.get() == expected
+    with django_assert_num_queries(0):
+        assert BeneficiaryCache.get() == expected
+
+    # any change on an organization drops the directory
+    kitchen = Organization.objects.create(civil_name="Kitchen", is_beneficiary=True, **location)
+    assert [o['civil_name'] for o in BeneficiaryCache.get()] == ["Food Bank", "Kitchen"]
+
+    kitchen.delete()
+    food_bank.civil_name = "Community Fridge"
+    food_bank.save()
+    assert [o['civil_name'] for o in BeneficiaryCache.get()] == ["Community Fridge"]